@@ -0,0 +1,202 @@
+# --- START OF FILE benchmarks.py ---
+"""
+Microbenchmarks for the per-frame hot paths: BlackjackLogic hand/strategy/dealer code,
+CardDetector post-processing and tracking, and HUD drawing. Everything runs on synthetic
+shoes, hands and frames with a stub model, so no weights, camera or API key are needed.
+
+    python benchmarks.py                      # Compare with BENCHMARK_BASELINE_PATH
+    python benchmarks.py --save-baseline      # Record this machine's numbers as the baseline
+    python benchmarks.py --filter logic --tolerance 0.1
+
+Each benchmark reports ops/s (median of BENCHMARK_REPEATS runs) and the peak memory
+allocated per call (tracemalloc). Comparisons use ops/s relative to a fixed ~1 ms calibration
+workload timed alternately with each benchmark run (median of the per-run ratios), so a
+baseline recorded on one machine (or under other background load) stays meaningful. A
+benchmark more than the tolerance below the baseline is flagged and the exit code is 1.
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+from config import (BENCHMARK_BASELINE_PATH, BENCHMARK_TOLERANCE, BENCHMARK_MIN_TIME, BENCHMARK_REPEATS,
+                    CARD_RANKS, CARD_SUITS, NUM_DECKS)
+from blackjack_logic import BlackjackLogic
+from card_detector import CardDetector, annotate_boxes
+from main import CasinoAI
+from utils import draw_bounding_box
+
+CARD_LABELS = [rank + suit for rank in CARD_RANKS for suit in CARD_SUITS]
+
+class _Array:
+    def __init__(self, array): self.array = array
+    def cpu(self): return self
+    def numpy(self): return self.array
+
+class _Boxes:
+    def __init__(self, data): self.data = _Array(data)
+    def __len__(self): return len(self.data.array)
+
+class _Result:
+    def __init__(self, data): self.boxes = _Boxes(data)
+
+class StubModel:
+    """Stands in for ultralytics.YOLO: returns the same `cards` random card boxes for every image."""
+    names = dict(enumerate(CARD_LABELS))
+
+    def __init__(self, cards=12, frame_shape=(720, 1280), seed=0):
+        rng = np.random.default_rng(seed); height, width = frame_shape
+        x1 = rng.uniform(0, width - 80, cards); y1 = rng.uniform(0, height - 110, cards)
+        self.data = np.stack([x1, y1, x1 + 70, y1 + 100, rng.uniform(0.5, 1.0, cards), rng.integers(0, len(CARD_LABELS), cards)], axis=1).astype(np.float32)
+
+    def __call__(self, images, **kwargs):
+        return [_Result(self.data.copy()) for _ in (images if isinstance(images, list) else [images])]
+
+def synthetic_frame(shape=(720, 1280), seed=0):
+    """Felt-green frame with light card-sized rectangles, so tracking has corners to follow."""
+    rng = np.random.default_rng(seed)
+    frame = np.empty(shape + (3,), dtype=np.uint8); frame[:] = (40, 110, 30)
+    for x, y in zip(rng.integers(0, shape[1] - 80, 12), rng.integers(0, shape[0] - 110, 12)):
+        frame[y:y + 100, x:x + 70] = 230; frame[y + 10:y + 30, x + 8:x + 25] = 20
+    return frame
+
+def synthetic_logic(cards_seen=30, seed=0):
+    """BlackjackLogic with a shoe part-way through: `cards_seen` random cards removed."""
+    logic = BlackjackLogic(num_decks=NUM_DECKS)
+    deck = [label for label in CARD_LABELS for _ in range(NUM_DECKS)]
+    for label in random.Random(seed).sample(deck, cards_seen): logic.remove_card_from_shoe(label)
+    return logic
+
+def _loop_count(fn, target_time):
+    """Calls per timing batch so one batch takes at least `target_time` seconds."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops): fn()
+        if time.perf_counter() - start >= target_time or loops >= 1 << 20: return loops
+        loops *= 2
+
+def _time_batch(fn, loops):
+    start = time.perf_counter()
+    for _ in range(loops): fn()
+    return time.perf_counter() - start
+
+def _peak_kib(fn):
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory(); tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return max(peak - baseline, 0) / 1024.0
+
+def measure(fn, min_time=BENCHMARK_MIN_TIME, repeats=BENCHMARK_REPEATS):
+    """
+    Returns (ops/s, ops/s relative to the calibration workload, peak KiB allocated per call)
+    for a no-argument callable. Every repeat times a batch of `fn` and then a batch of the
+    calibration workload, so both see the same machine load; the medians over the repeats are reported.
+    """
+    fn(); _calibration_workload()  # Warm caches and lazy imports
+    batch_time = min_time / (2 * repeats)
+    loops = _loop_count(fn, batch_time); calibration_loops = _loop_count(_calibration_workload, batch_time)
+    ops = []; ratios = []
+    for _ in range(repeats):
+        fn_ops = loops / _time_batch(fn, loops)
+        calibration_ops = calibration_loops / _time_batch(_calibration_workload, calibration_loops)
+        ops.append(fn_ops); ratios.append(fn_ops / calibration_ops)
+    return float(np.median(ops)), float(np.median(ratios)), _peak_kib(fn)
+
+_CALIBRATION_DATA = np.arange(200000, dtype=np.float64)
+
+def _calibration_workload():
+    # Fixed mix of interpreter, dict/list and numpy work, the same kind the hot paths do (~1 ms)
+    total = 0; counts = {}
+    for i in range(3000): total += i * i; counts[i & 15] = counts.get(i & 15, 0) + 1
+    return total + len(sorted(counts)) + int(np.sqrt(_CALIBRATION_DATA).sum())
+
+def build_benchmarks():
+    """Name -> no-argument callable. Setup (shoes, frames, detector, HUD) happens here, outside the timing."""
+    logic = synthetic_logic()
+    frame = synthetic_frame()
+    detector = CardDetector(model=StubModel(frame_shape=frame.shape[:2]))
+    boxes = detector._infer(frame)
+    ai = CasinoAI(card_detector=detector, gemini_integration=object(), open_camera=False)
+    ai.blackjack_logic = logic; ai.frame_height, ai.frame_width = frame.shape[:2]
+    ai.all_player_hands = [['TD', '6C']]; ai.dealer_hand = ['9H']
+    hud_state = {"player_hand": ['TD', '6C'], "dealer_card": '9H', "player_total": 16, "dealer_total": 9,
+                 "recommended_move": 'H', "bet_recommendation": 2, "bust_probability": logic.calculate_bust_probability(['TD', '6C']),
+                 "override_reason": "", "action_evs": logic.get_action_evs(['TD', '6C'], '9H')[1], "status_message": "Benchmark",
+                 "dealer_anomaly": "", "dealer_outcomes": logic.get_dealer_outcome_probabilities(['9H'])}
+    tracked = CardDetector(model=StubModel(frame_shape=frame.shape[:2])); tracked.detect_boxes(frame)
+    shifted = np.roll(frame, 2, axis=1)
+    # Whole per-frame path at 1080p: detection (tracked between inferences), boxes and HUD into the output frame
+    frame_1080 = synthetic_frame((1080, 1920))
+    ai_1080 = CasinoAI(card_detector=CardDetector(model=StubModel(frame_shape=frame_1080.shape[:2])), gemini_integration=object(), open_camera=False)
+    ai_1080.scene_gate = None
+
+    def detect_tracked():
+        # Alternate two frames so every call after the first takes the tracking path
+        tracked.frames_since_inference = 0; tracked.detect_boxes(shifted); tracked.detect_boxes(frame)
+
+    return {
+        'logic.get_hand_value': lambda: logic.get_hand_value(['AS', '7D', '3C']),
+        'logic.calculate_bust_probability': lambda: logic.calculate_bust_probability(['TD', '6C']),
+        'logic.get_basic_strategy_move': lambda: logic.get_basic_strategy_move(['TD', '6C'], '9H'),
+        'logic.simulate_dealer_turn': lambda: logic.simulate_dealer_turn(['6H']),
+        'detector.infer_postprocess': lambda: detector._infer(frame),
+        'detector.detect_tracked_x2': detect_tracked,
+        'detector.annotate_boxes': lambda: annotate_boxes(frame.copy(), boxes),
+        'utils.draw_bounding_box': lambda: draw_bounding_box(frame, [100, 100, 170, 200], 'AS', (255, 0, 0)),
+        'hud.display_hud': lambda: ai.display_hud(frame.copy(), hud_state),
+        'main.detect_render_1080p': lambda: ai_1080.step(ai_1080.detect_frame(frame_1080)[0], True, 255, 0.0),
+    }
+
+def run(name_filter=None):
+    results = {}
+    for name, fn in build_benchmarks().items():
+        if name_filter and name_filter not in name: continue
+        ops, relative, peak_kib = measure(fn)
+        results[name] = {'ops_per_sec': round(ops, 1), 'relative': round(relative, 6), 'peak_kib': round(peak_kib, 2)}
+        print(f"{name:<36} {ops:>12,.1f} ops/s {1e6 / ops:>10.1f} us/op {peak_kib:>9.1f} KiB peak")
+    return results
+
+def compare(results, baseline, tolerance=BENCHMARK_TOLERANCE):
+    """Returns the names whose calibrated ops/s fell more than `tolerance` (fraction) below the baseline."""
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get(name)
+        if not reference or 'relative' not in stats: continue
+        change = stats['relative'] / reference['relative'] - 1.0
+        flag = "REGRESSION" if change < -tolerance else ""
+        if flag: regressions.append(name)
+        print(f"{name:<36} {change:>+8.1%} vs baseline {flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hot-path microbenchmarks with baseline comparison")
+    parser.add_argument('--filter', help="Only run benchmarks whose name contains this")
+    parser.add_argument('--baseline', default=BENCHMARK_BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=BENCHMARK_TOLERANCE, help="Allowed ops/s drop as a fraction, e.g. 0.25")
+    parser.add_argument('--save-baseline', action='store_true', help="Write these results as the new baseline")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)  # Per-call INFO/DEBUG logs would dominate the timings
+    results = run(args.filter)
+    if args.save_baseline:
+        try:
+            with open(args.baseline) as f: baseline = json.load(f)
+        except (OSError, ValueError): baseline = {}
+        baseline.update(results)  # Keep entries of benchmarks that were filtered out
+        with open(args.baseline, 'w') as f: json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        sys.exit(0)
+    try:
+        with open(args.baseline) as f: baseline = json.load(f)
+    except (OSError, ValueError):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first."); sys.exit(0)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions: print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}"); sys.exit(1)
+    print("No regressions.")
+
+# --- END OF FILE benchmarks.py ---
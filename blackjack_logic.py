@@ -1,19 +1,31 @@
+import copy
 import math
 import random
 import logging
 from collections import defaultdict, deque
-from copy import deepcopy
+from contextlib import contextmanager
 from config import (NUM_DECKS, CARD_RANKS, BASIC_STRATEGY, COUNTING_SYSTEM, INDEX_PLAYS,
                     EXPECTED_DEALER_BUST_RATES_S17_SINGLE_DECK, DEALER_HISTORY_MIN_SAMPLES,
-                    DEALER_BUST_RATE_THRESHOLD_MULTIPLIER, MAX_DEALER_OUTCOME_HISTORY)
+                    DEALER_BUST_RATE_THRESHOLD_MULTIPLIER, MAX_DEALER_OUTCOME_HISTORY,
+                    USE_LIVE_DEALER_BUST_RATES)
+from dealer_engine import dealer_outcome_probabilities, dealer_hand_probabilities
+from ev_engine import compute_action_evs, best_move
+from shoe import Shoe, SLOT_KEYS, parse_card_label
+from monte_carlo import simulate_dealer_batch
+from strategy_compiler import compile_strategy, hand_class
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(levelname)s: %(message)s')
 
+# Strategy tables are compiled (and checked for gaps) once at import
+STRATEGY = compile_strategy(BASIC_STRATEGY, INDEX_PLAYS)
+
 class BlackjackLogic:
-    def __init__(self, num_decks=NUM_DECKS):
+    def __init__(self, num_decks=NUM_DECKS, rng=None):
         self.num_decks = num_decks
+        self.rng = rng or random.Random() # Draws of simulate_dealer_turn; pass a seeded Random for reproducible runs
         self.hi_lo_running_count = 0
+        self.shoe = Shoe(num_decks)
         self.reset_shoe()
         self.card_removal_history = []
         self.dealer_outcome_history = defaultdict(lambda: deque(maxlen=MAX_DEALER_OUTCOME_HISTORY))
@@ -23,18 +35,8 @@ class BlackjackLogic:
         if not full_card_label or not isinstance(full_card_label, str):
             logging.warning(f"Invalid label type for key generation: {full_card_label}")
             return None
-        label_upper = full_card_label.upper()
-        if label_upper.startswith('10'):
-            suit = label_upper[2:]
-            if len(suit) == 1 and suit in ['S', 'H', 'D', 'C']:
-                return 'T' + suit  # Use 'T' for Ten
-        elif len(label_upper) == 2:  # Expect Rank+Suit
-            rank = label_upper[0]
-            suit = label_upper[1]
-            if rank in CARD_RANKS and suit in ['S', 'H', 'D', 'C']:
-                if rank == '1':  # Should not happen if model outputs 10
-                    rank = 'T'
-                return rank + suit
+        key, _ = parse_card_label(full_card_label)
+        if key is not None: return key
         logging.warning(f"Could not create valid internal key from label '{full_card_label}'.")
         return None
 
@@ -52,24 +54,17 @@ class BlackjackLogic:
 
     def reset_shoe(self):
         """Resets the shoe using standardized keys ('AS', 'KH', 'TS')."""
-        self.total_cards_in_shoe = self.num_decks * 52
-        self.remaining_cards = {}
-        if self.num_decks == 1:
-            suits = ['S', 'H', 'D', 'C']
-            ranks_for_init = CARD_RANKS  # e.g., ['2', '3', ..., 'A']
-            for rank in ranks_for_init:
-                for suit in suits:
-                    card_key = rank + suit
-                    self.remaining_cards[card_key] = 1
-        else:
-            logging.warning("Multi-deck rank tracking not fully supported. Tracking by rank only.")
-            for rank in CARD_RANKS:
-                self.remaining_cards[rank] = 4 * self.num_decks
-
+        self.shoe.reset()
+        self.total_cards_in_shoe = self.shoe.total_cards
         self.cards_seen_count = 0
         self.hi_lo_running_count = 0
         self.card_removal_history = []
-        logging.info(f"Shoe reset ({self.num_decks} deck)... Tracking unique cards.")
+        logging.info(f"Shoe reset ({self.num_decks} deck)... Tracking {self.total_cards_in_shoe} cards.")
+
+    def is_card_available(self, full_card_label):
+        """True if the card (label or internal key) still has copies left in the shoe."""
+        card_key = self._get_internal_card_key(full_card_label)
+        return card_key is not None and self.shoe.count(card_key) > 0
 
     def _get_card_value_numeric(self, card_rank):
         """Gets the numerical value using standard ranks ('T' for 10)."""
@@ -98,27 +93,16 @@ class BlackjackLogic:
         if rank_for_counting is None:
             return
 
-        if self.num_decks != 1:
-            logging.error("Multi-deck removal not fully supported here.")
-            return
-
-        if card_key in self.remaining_cards:
-            if self.remaining_cards[card_key] > 0:
-                self.remaining_cards[card_key] -= 1
-                self.cards_seen_count += 1
-                self.hi_lo_running_count += self._get_card_value_hi_lo(rank_for_counting)
-                self.card_removal_history.append(card_key)
-                logging.info(f"Removed: {card_key}. Rem: {self.remaining_cards[card_key]}, Seen: {self.cards_seen_count}, RC: {self.hi_lo_running_count}")
-            else:
-                logging.error(f"Tried to remove {card_key}, already removed!")
+        if self.shoe.remove(card_key):
+            self.cards_seen_count += 1
+            self.hi_lo_running_count += self._get_card_value_hi_lo(rank_for_counting)
+            self.card_removal_history.append(card_key)
+            logging.info(f"Removed: {card_key}. Rem: {self.shoe.count(card_key)}, Seen: {self.cards_seen_count}, RC: {self.hi_lo_running_count}")
         else:
-            logging.warning(f"Card key '{card_key}' (from '{full_card_label}') not found in remaining_cards.")
+            logging.error(f"Tried to remove {card_key}, already removed!")
 
     def add_card_back_to_shoe(self, full_card_label_or_key):
         """Undo removal by adding back a card using standardized key."""
-        if self.num_decks != 1:
-            logging.error("Undo requires NUM_DECKS=1.")
-            return False
         card_key = self._get_internal_card_key(full_card_label_or_key)
         if card_key is None:
             return False
@@ -127,21 +111,46 @@ class BlackjackLogic:
         if rank_for_counting is None:
             return False
 
-        if card_key in self.remaining_cards:
-            if self.remaining_cards[card_key] < 1:  # For single deck, max is 1
-                self.remaining_cards[card_key] += 1
-                self.cards_seen_count -= 1
-                self.hi_lo_running_count -= self._get_card_value_hi_lo(rank_for_counting)
-                if self.card_removal_history and self.card_removal_history[-1] == card_key:
-                    self.card_removal_history.pop()
-                logging.info(f"UNDO: Added back {card_key}. Rem: {self.remaining_cards[card_key]}, Seen: {self.cards_seen_count}, RC: {self.hi_lo_running_count}")
-                return True
-            else:
-                logging.error(f"Count max for {card_key}.")
-        else:
-            logging.warning(f"Invalid card key '{card_key}' for UNDO.")
+        if self.shoe.restore(card_key):
+            self.cards_seen_count -= 1
+            self.hi_lo_running_count -= self._get_card_value_hi_lo(rank_for_counting)
+            if self.card_removal_history and self.card_removal_history[-1] == card_key:
+                self.card_removal_history.pop()
+            logging.info(f"UNDO: Added back {card_key}. Rem: {self.shoe.count(card_key)}, Seen: {self.cards_seen_count}, RC: {self.hi_lo_running_count}")
+            return True
+        logging.error(f"Count max for {card_key}.")
         return False
 
+    @contextmanager
+    def card_removed(self, card_key):
+        """
+        Temporarily takes one card out of the shoe and the count (no logging or undo history),
+        e.g. to evaluate a possible next card; everything is restored on exit.
+        """
+        rank = self._get_rank_from_key_or_label(card_key)
+        if rank is None or not self.shoe.remove(card_key): raise ValueError(f"Card {card_key} is not in the shoe.")
+        hi_lo = self._get_card_value_hi_lo(rank)
+        self.cards_seen_count += 1; self.hi_lo_running_count += hi_lo
+        try:
+            yield
+        finally:
+            self.shoe.restore(card_key)
+            self.cards_seen_count -= 1; self.hi_lo_running_count -= hi_lo
+
+    def snapshot(self):
+        """
+        Independent copy of the shoe and count, without history and with its own RNG, for work
+        on another thread (the speculator); nothing done to it touches this object.
+        """
+        clone = copy.copy(self)
+        clone.shoe = copy.deepcopy(self.shoe); clone.rng = random.Random()
+        clone.card_removal_history = []; clone.dealer_outcome_history = defaultdict(lambda: deque(maxlen=MAX_DEALER_OUTCOME_HISTORY))
+        return clone
+
+    def state_key(self):
+        """Everything an analysis depends on besides the hands: remaining composition by value and the Hi-Lo count."""
+        return self.shoe.composition(), self.hi_lo_running_count, self.cards_seen_count
+
     def get_hi_lo_true_count(self):
         total_remaining = self.total_cards_in_shoe - self.cards_seen_count
         if total_remaining <= 0:
@@ -165,120 +174,83 @@ class BlackjackLogic:
             ace_count -= 1
         return total
 
+    def get_hand_state(self, hand_labels):
+        """Returns (total, soft) for a hand, parsing each label once."""
+        total = 0; aces = 0
+        for lbl in hand_labels:
+            rank = self._get_rank_from_key_or_label(lbl)
+            if rank is None:
+                continue
+            total += self._get_card_value_numeric(rank)
+            if rank == 'A':
+                aces += 1
+        while total > 21 and aces > 0:
+            total -= 10
+            aces -= 1
+        return total, aces > 0
+
     def calculate_bust_probability(self, player_hand_labels):
-        logging.debug("\n--- DEBUG: calculate_bust_probability ---")
-        logging.debug(f"Input Hand Labels: {player_hand_labels}")
-        current_total = self.get_hand_value(player_hand_labels)
-        logging.debug(f"Current Hand Total: {current_total}")
+        """Chance the next card busts the hand; a single lookup into the shoe's incrementally maintained table."""
+        current_total, is_soft = self.get_hand_state(player_hand_labels)
         if current_total >= 21:
-            result_str = 'Busted' if current_total > 21 else '21/Stand'
-            logging.debug(f"Result: {result_str}")
-            logging.debug("--- END DEBUG ---")
             return 1.0 if current_total > 21 else 0.0
-
-        bust_card_count = 0
-        total_remaining_cards = self.total_cards_in_shoe - self.cards_seen_count
-        logging.debug(f"Total Remaining Cards in Shoe: {total_remaining_cards}")
-        if total_remaining_cards <= 0:
+        if self.shoe.cards_remaining <= 0:
             logging.warning("No cards remaining.")
-            logging.debug("Result: Bust Prob = 0.0")
-            logging.debug("--- END DEBUG ---")
             return 0.0
-
-        logging.debug("Checking remaining cards for bust potential:")
-        if self.num_decks == 1:
-            for card_key, remaining_count in self.remaining_cards.items():
-                if remaining_count <= 0:
-                    continue
-                potential_new_total = self.get_hand_value(player_hand_labels + [card_key])
-                will_bust = potential_new_total > 21
-                logging.debug(f"  - Card: {card_key}, Rem: {remaining_count}, NewTotal: {potential_new_total}, Busts?: {will_bust}")
-                if will_bust:
-                    bust_card_count += remaining_count
-        else:
-            for rank in CARD_RANKS:
-                remaining_rank_count = self.remaining_cards.get(rank, 0)
-                if remaining_rank_count <= 0:
-                    continue
-                potential_new_total = self.get_hand_value(player_hand_labels + [rank])
-                will_bust = potential_new_total > 21
-                logging.debug(f"  - Rank: {rank}, Rem: {remaining_rank_count}, NewTotal: {potential_new_total}, Busts?: {will_bust}")
-                if will_bust:
-                    bust_card_count += remaining_rank_count
-
-        logging.debug(f"Total Count of Cards Causing Bust: {bust_card_count}")
-        bust_probability = bust_card_count / total_remaining_cards if total_remaining_cards > 0 else 0
-        logging.debug(f"Result: Bust Prob = {bust_card_count} / {total_remaining_cards} = {bust_probability:.3f}")
-        logging.debug("--- END DEBUG ---")
+        bust_probability = self.shoe.bust_probability(current_total, is_soft)
+        logging.debug(f"Bust Prob: {player_hand_labels} (Total {current_total}, {'Soft' if is_soft else 'Hard'}) = {bust_probability:.3f}")
         return bust_probability
 
-    def get_basic_strategy_move(self, player_hand_labels, dealer_up_card_label):
+    def _classify_hand(self, player_hand_labels, dealer_up_card_label, allow_split=True):
+        """
+        Parses a hand once for the compiled strategy table.
+        Returns (status, hand_class, dealer_value) where status is None on success, else 'N/A'/'Err'/'Bust'.
+        """
         if not player_hand_labels or not dealer_up_card_label:
-            return "N/A"
+            return "N/A", None, None
         player_ranks = []
         for label in player_hand_labels:
             rank = self._get_rank_from_key_or_label(label)
-            if rank:
-                player_ranks.append(rank)
-            else:
+            if not rank:
                 logging.warning(f"Invalid rank from '{label}' in basic strategy")
-                return "Err"
-        if not player_ranks:
-            return "Err"
-
+                return "Err", None, None
+            player_ranks.append(rank)
         dealer_up_rank = self._get_rank_from_key_or_label(dealer_up_card_label)
         if dealer_up_rank not in CARD_RANKS:
             logging.warning(f"Invalid dealer rank from '{dealer_up_card_label}'")
-            return "Err"
-
-        player_total = self.get_hand_value(player_hand_labels)
-        dealer_value = self._get_card_value_numeric(dealer_up_rank)
+            return "Err", None, None
+        player_total, is_soft = self.get_hand_state(player_hand_labels)
         if player_total > 21:
-            return 'Bust'
+            return 'Bust', None, None
+        pair_values = [self._get_card_value_numeric(r) for r in player_ranks] if len(player_ranks) == 2 else None
+        pair_rank = None
+        if allow_split and pair_values and pair_values[0] == pair_values[1]:
+            pair_rank = 'T' if pair_values[0] == 10 else player_ranks[0]
+        return None, hand_class(player_total, is_soft, pair_rank), self._get_card_value_numeric(dealer_up_rank)
+
+    def get_strategy_decision(self, player_hand_labels, dealer_up_card_label, true_count=None, allow_split=True):
+        """
+        Constant-time (basic move, count-adjusted move, reason) from the compiled strategy table.
+        `reason` is empty unless an index play changes the move. Uses the live true count by default;
+        with allow_split=False a pair is played as its hard/soft total.
+        """
+        status, hand_cls, dealer_value = self._classify_hand(player_hand_labels, dealer_up_card_label, allow_split)
+        if status is not None:
+            return status, status, ""
+        if true_count is None:
+            true_count = self.get_hi_lo_true_count()
+        return STRATEGY.lookup(hand_cls, dealer_value, true_count)
 
-        is_pair = len(player_ranks) == 2 and player_ranks[0] == player_ranks[1]
-        ace_present = 'A' in player_ranks
-        non_ace_total = sum(self._get_card_value_numeric(r) for r in player_ranks if r != 'A')
-        is_soft = ace_present and (player_total > non_ace_total + player_ranks.count('A'))
+    def get_basic_strategy_move(self, player_hand_labels, dealer_up_card_label):
+        return self.get_strategy_decision(player_hand_labels, dealer_up_card_label, 0)[0]
 
-        hand_type = 'N/A'
-        strat_key = None
-        try:
-            if is_pair:
-                hand_type = 'Pair'
-                pair_tuple = tuple(sorted(player_ranks))
-                if dealer_value in BASIC_STRATEGY.get(hand_type, {}) and pair_tuple in BASIC_STRATEGY[hand_type].get(dealer_value, {}):
-                    strat_key = pair_tuple
-                else:
-                    is_pair = False  # Fallback if no strategy found for pair
-            if not is_pair:
-                if is_soft:
-                    hand_type = 'Soft'
-                    strat_key = player_total
-                else:
-                    hand_type = 'Hard'
-                    strat_key = player_total
-            if hand_type == 'N/A' or strat_key is None:
-                logging.debug("Could not determine hand type/key for basic strategy.")
-                return "Err"
-
-            strategy_for_dealer = BASIC_STRATEGY.get(hand_type, {}).get(dealer_value, {})
-            if strat_key in strategy_for_dealer:
-                return strategy_for_dealer[strat_key]
-            else:
-                logging.warning(f"Strategy missing for HT='{hand_type}', D='{dealer_value}', PK='{strat_key}'. Defaulting.")
-                if hand_type == 'Hard':
-                    return 'S' if player_total >= 17 else 'H'
-                elif hand_type == 'Soft':
-                    return 'S' if player_total >= 19 else 'H'
-                else:
-                    return 'S' if player_total >= 17 else 'H'
-        except KeyError as e:
-            logging.error(f"KeyError in basic strategy: {e}. HT='{hand_type}', D='{dealer_value}', PK='{strat_key}'")
-            return "Err"
-        except Exception as e:
-            logging.error(f"Unexpected error in basic strategy: {e}")
-            return "Err"
+    def get_index_play(self, player_hand_labels, dealer_up_card_label, true_count):
+        """Returns the INDEX_PLAYS action triggered at this true count, or None if no deviation applies."""
+        basic_move, adjusted_move, reason = self.get_strategy_decision(player_hand_labels, dealer_up_card_label, true_count)
+        return adjusted_move if reason else None
+
+    def should_take_insurance(self, true_count):
+        return STRATEGY.take_insurance(true_count)
 
     def get_bet_recommendation(self, base_bet=1):
         true_count = self.get_hi_lo_true_count()
@@ -297,8 +269,8 @@ class BlackjackLogic:
             logging.error("Cannot simulate dealer turn with empty hand.")
             return [], 'Error'
         
-        # Create a simulation copy of the current shoe state
-        sim_remaining_cards = deepcopy(self.remaining_cards)
+        # Simulation copy of the 52-slot shoe array; a draw walks the slots without building a deck list
+        sim_card_counts = list(self.shoe.card_counts)
         sim_cards_seen = self.cards_seen_count
         sim_running_count = self.hi_lo_running_count
         
@@ -307,43 +279,90 @@ class BlackjackLogic:
         
         while True:
             current_total = self.get_hand_value(dealer_hand_sim)
-            logging.info(f"  Dealer Sim: Hand={dealer_hand_sim}, Total={current_total}")
+            logging.debug(f"  Dealer Sim: Hand={dealer_hand_sim}, Total={current_total}")
             if current_total >= 17:
-                logging.info(f"  Dealer Sim: Stands at {current_total}")
+                logging.debug(f"  Dealer Sim: Stands at {current_total}")
                 return dealer_hand_sim, current_total
-            logging.info(f"  Dealer Sim: Hits at {current_total}")
+            logging.debug(f"  Dealer Sim: Hits at {current_total}")
             
             total_remaining = self.total_cards_in_shoe - sim_cards_seen
             if total_remaining <= 0:
                 logging.error("No cards left in simulation shoe!")
                 return dealer_hand_sim, 'Error - No Cards'
             
-            remaining_deck_list = []
-            if self.num_decks == 1:
-                for card_key, count in sim_remaining_cards.items():
-                    if count > 0:
-                        remaining_deck_list.append(card_key)
-            else:
-                for rank_key, count in sim_remaining_cards.items():
-                    remaining_deck_list.extend([rank_key] * count)
-            if not remaining_deck_list:
-                logging.error("Simulation remaining deck empty!")
-                return dealer_hand_sim, 'Error - Deck Empty'
-            
-            drawn_card_label = random.choice(remaining_deck_list)
-            logging.info(f"  Dealer Sim: Draws {drawn_card_label}")
+            draw_position = self.rng.randrange(total_remaining)
+            drawn_slot = 0
+            while draw_position >= sim_card_counts[drawn_slot]:
+                draw_position -= sim_card_counts[drawn_slot]
+                drawn_slot += 1
+            drawn_card_label = SLOT_KEYS[drawn_slot]
+            logging.debug(f"  Dealer Sim: Draws {drawn_card_label}")
             dealer_hand_sim.append(drawn_card_label)
             # Update simulation state
-            if drawn_card_label in sim_remaining_cards and sim_remaining_cards[drawn_card_label] > 0:
-                sim_remaining_cards[drawn_card_label] -= 1
-                sim_cards_seen += 1
-                drawn_rank = self._get_rank_from_key_or_label(drawn_card_label)
-                sim_running_count += self._get_card_value_hi_lo(drawn_rank)
+            sim_card_counts[drawn_slot] -= 1
+            sim_cards_seen += 1
+            drawn_rank = self._get_rank_from_key_or_label(drawn_card_label)
+            sim_running_count += self._get_card_value_hi_lo(drawn_rank)
             new_total = self.get_hand_value(dealer_hand_sim)
             if new_total > 21:
-                logging.info(f"  Dealer Sim: Busts with {new_total}")
+                logging.debug(f"  Dealer Sim: Busts with {new_total}")
                 return dealer_hand_sim, 'Bust'
 
+    def get_rank_composition(self):
+        """Remaining shoe as a 10-tuple of counts by value (2..9, ten-valued, Ace) for the dealer engine."""
+        return self.shoe.composition()
+
+    def get_dealer_outcome_probabilities(self, dealer_hand_labels, peek=False):
+        """
+        Exact probability of each dealer result (17-21, 'BJ', 'Bust') from the current shoe.
+        A one-card hand is treated as the upcard (hole card still to come); longer hands
+        continue from their current total. Returns None for an empty/invalid hand.
+        """
+        if not dealer_hand_labels:
+            return None
+        ranks = [self._get_rank_from_key_or_label(lbl) for lbl in dealer_hand_labels]
+        if None in ranks:
+            logging.warning(f"Invalid labels in dealer outcome query: {dealer_hand_labels}")
+            return None
+        composition = self.get_rank_composition()
+        if len(ranks) == 1:
+            return dealer_outcome_probabilities(self._get_card_value_numeric(ranks[0]), composition, peek)
+        total, soft = self.get_hand_state(dealer_hand_labels)
+        return dealer_hand_probabilities(total, soft, composition)
+
+    def get_expected_dealer_bust_rate(self, up_card_rank):
+        """Live expected bust rate for an upcard rank given the current shoe, or None if unavailable."""
+        up_card_key = str(up_card_rank).upper()
+        if up_card_key not in CARD_RANKS:
+            return None
+        if self.total_cards_in_shoe - self.cards_seen_count <= 0:
+            return None
+        return dealer_outcome_probabilities(self._get_card_value_numeric(up_card_key), self.get_rank_composition())['Bust']
+
+    def simulate_dealer_outcomes_batch(self, up_card_label, n_hands, seed=None, peek=False):
+        """Vectorized Monte Carlo of `n_hands` dealer hands from the current shoe (see monte_carlo.simulate_dealer_batch)."""
+        up_rank = self._get_rank_from_key_or_label(up_card_label)
+        if up_rank is None or self.shoe.cards_remaining <= 0:
+            logging.error(f"Cannot batch-simulate dealer for upcard '{up_card_label}'.")
+            return None
+        return simulate_dealer_batch(self._get_card_value_numeric(up_rank), self.shoe.composition(), n_hands, seed=seed, peek=peek)
+
+    def get_action_evs(self, player_hand_labels, dealer_up_card_label):
+        """
+        Expected value (in initial bets) of each legal move from the exact remaining shoe.
+        Returns (best_move, {move: ev}) or (None, {}) if the hand or upcard is invalid.
+        """
+        if not player_hand_labels or not dealer_up_card_label:
+            return None, {}
+        player_ranks = [self._get_rank_from_key_or_label(lbl) for lbl in player_hand_labels]
+        dealer_up_rank = self._get_rank_from_key_or_label(dealer_up_card_label)
+        if None in player_ranks or dealer_up_rank is None:
+            logging.warning(f"Invalid labels for EV engine: {player_hand_labels} vs {dealer_up_card_label}")
+            return None, {}
+        player_values = [self._get_card_value_numeric(r) for r in player_ranks]
+        evs = compute_action_evs(player_values, self._get_card_value_numeric(dealer_up_rank), self.get_rank_composition())
+        return best_move(evs), evs
+
     def record_dealer_outcome(self, up_card_rank, final_total_or_bust):
         outcome = final_total_or_bust
         up_card_key = str(up_card_rank).upper()
@@ -359,7 +378,9 @@ class BlackjackLogic:
         if history is None or len(history) < DEALER_HISTORY_MIN_SAMPLES:
             return None
         num_samples = len(history)
-        expected_rate = EXPECTED_DEALER_BUST_RATES_S17_SINGLE_DECK.get(up_card_key, None)
+        expected_rate = self.get_expected_dealer_bust_rate(up_card_key) if USE_LIVE_DEALER_BUST_RATES else None
+        if expected_rate is None:
+            expected_rate = EXPECTED_DEALER_BUST_RATES_S17_SINGLE_DECK.get(up_card_key, None)
         if expected_rate is None:
             logging.warning(f"No expected bust rate for {up_card_key}.")
             return None
@@ -0,0 +1,145 @@
+# --- START OF FILE capture_pipeline.py ---
+import threading
+import time
+import cv2
+from config import CAMERA_INDEX, CAPTURE_RECONNECT_DELAY, CAPTURE_MAX_RECONNECT_ATTEMPTS, USE_DETECTION_PROCESS
+
+class FrameGrabber(threading.Thread):
+    """
+    Reads the camera as fast as it delivers and keeps only the newest frame, so the
+    camera buffer never backs up. Owns reconnects: on a failed read the capture is
+    reopened in the background while the UI keeps running.
+    """
+    def __init__(self, camera_index=CAMERA_INDEX):
+        super().__init__(name="FrameGrabber", daemon=True)
+        self.camera_index = camera_index
+        self.cap = cv2.VideoCapture(camera_index)
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open webcam index {camera_index}")
+        self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.condition = threading.Condition()
+        self.frame = None; self.seq = 0; self.timestamp = 0.0
+        self.status = "OK"; self.failed = False; self.reconnects = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        failed_attempts = 0
+        while not self._stop_event.is_set():
+            ret, frame = self.cap.read()
+            if ret:
+                failed_attempts = 0
+                with self.condition:
+                    self.frame = frame; self.seq += 1; self.timestamp = time.time(); self.status = "OK"
+                    self.condition.notify_all()
+                continue
+            # Reconnect without stalling anyone waiting on frames
+            failed_attempts += 1
+            self.status = f"Camera reconnecting ({failed_attempts}/{CAPTURE_MAX_RECONNECT_ATTEMPTS})..."
+            print(f"Error: Failed capture... {self.status}")
+            if failed_attempts > CAPTURE_MAX_RECONNECT_ATTEMPTS:
+                print("Failed reopen. Giving up."); self.failed = True
+                with self.condition: self.condition.notify_all()
+                break
+            self.cap.release()
+            if self._stop_event.wait(CAPTURE_RECONNECT_DELAY): break
+            self.cap = cv2.VideoCapture(self.camera_index)
+            if self.cap.isOpened(): self.reconnects += 1; print("Reopened camera.")
+        self.cap.release()
+
+    def wait_for_frame(self, after_seq, timeout):
+        """Returns (seq, frame) for the newest frame newer than `after_seq`, or (after_seq, None) on timeout."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.seq > after_seq or self.failed or self._stop_event.is_set(), timeout):
+                return after_seq, None
+            return self.seq, self.frame
+
+    def latest(self):
+        with self.condition: return self.seq, self.frame
+
+    def stop(self):
+        self._stop_event.set()
+        with self.condition: self.condition.notify_all()
+
+class DetectionWorker(threading.Thread):
+    """
+    Runs the detector on the newest grabbed frame; frames that arrive during inference are
+    skipped on purpose. With a SceneChangeGate, unchanged frames publish nothing new.
+    """
+    def __init__(self, detector, grabber, latency=None, gate=None):
+        super().__init__(name="DetectionWorker", daemon=True)
+        self.detector = detector; self.grabber = grabber; self.latency = latency; self.gate = gate
+        self.condition = threading.Condition()
+        self.result = None  # (frame seq, frame, detected_data, overlay); boxes are drawn by the render loop
+        self.result_seq = 0; self.dropped_frames = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last_frame_seq = 0
+        while not self._stop_event.is_set():
+            frame_seq, frame = self.grabber.wait_for_frame(last_frame_seq, timeout=0.5)
+            if frame is None:
+                if self.grabber.failed: break
+                continue
+            if last_frame_seq: self.dropped_frames += frame_seq - last_frame_seq - 1
+            last_frame_seq = frame_seq
+            start = time.perf_counter()
+            try:
+                if self.gate is not None:
+                    (detected_data, overlay), fresh = self.gate.process(frame, self.detector.detect_overlay)
+                    if not fresh: continue  # Static scene: the last published result still holds
+                else:
+                    detected_data, overlay = self.detector.detect_overlay(frame)
+            except Exception as e:
+                print(f"Error card detection: {e}"); detected_data, overlay = {'player': [], 'dealer': []}, []
+            if self.latency is not None: self.latency.record('detect_bg', (time.perf_counter() - start) * 1000.0)
+            with self.condition:
+                self.result = (frame_seq, frame, detected_data, overlay); self.result_seq += 1
+                self.condition.notify_all()
+
+    def wait_for_result(self, after_seq, timeout):
+        """Returns (result_seq, result) once a result newer than `after_seq` exists, else the current one after `timeout`."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.result_seq > after_seq or self._stop_event.is_set(), timeout)
+            return self.result_seq, self.result
+
+    def stop(self):
+        self._stop_event.set()
+        with self.condition: self.condition.notify_all()
+
+class CapturePipeline:
+    """Capture thread -> detection thread -> (caller's) render/input loop, connected by newest-only slots."""
+    def __init__(self, detector, camera_index=CAMERA_INDEX, latency=None, gate=None, use_process=USE_DETECTION_PROCESS):
+        # With use_process the detector lives in a child process and `detector` may be None
+        self.grabber = FrameGrabber(camera_index)
+        if use_process:
+            from detection_process import DetectionProcessWorker
+            self.worker = DetectionProcessWorker(self.grabber, latency, gate)
+        else: self.worker = DetectionWorker(detector, self.grabber, latency, gate)
+        self.frame_width = self.grabber.frame_width; self.frame_height = self.grabber.frame_height
+
+    @property
+    def failed(self):
+        return self.grabber.failed
+
+    @property
+    def status(self):
+        return self.grabber.status
+
+    def start(self):
+        self.grabber.start(); self.worker.start()
+
+    def wait_for_result(self, after_seq, timeout):
+        return self.worker.wait_for_result(after_seq, timeout)
+
+    def wait_for_frame(self, after_seq, timeout):
+        return self.grabber.wait_for_frame(after_seq, timeout)
+
+    def latest_frame(self):
+        return self.grabber.latest()[1]
+
+    def stop(self):
+        self.worker.stop(); self.grabber.stop()
+        self.worker.join(timeout=2.0); self.grabber.join(timeout=2.0)
+
+# --- END OF FILE capture_pipeline.py ---
@@ -1,103 +1,259 @@
 # --- START OF FILE card_detector.py ---
 import cv2
 import numpy as np
-from ultralytics import YOLO
-from config import DETECTION_CONFIDENCE, CARD_RANKS, CARD_MODEL_PATH
-from utils import draw_bounding_box
+from config import (DETECTION_CONFIDENCE, CARD_MODEL_PATH, DETECTOR_BACKEND, DETECTOR_IMGSZ, DETECTOR_INT8, DETECTION_INTERVAL,
+                    DETECTION_MOTION_THRESHOLD, TRACKER_MAX_CORNERS, DETECTION_ROI_MODE, DEALER_ROI, PLAYER_ROI,
+                    ROI_TILE_SIZE, ROI_TILE_OVERLAP, ROI_NMS_IOU)
+from detector_backends import load_model
+from utils import draw_bounding_box, downscale_gray, frame_difference, parse_card_label
+
+# Zones by box centre, as fractions of frame height: dealer above 40%, player below 60%, neutral between
+DEALER_AREA_Y_LIMIT = 0.4
+PLAYER_AREA_Y_START = 0.6
+ZONE_NAMES = (None, 'dealer', 'player')
+
+def roi_tiles(frame_shape, roi, tile_size=0, overlap=0.2):
+    """
+    Pixel rectangles (x1, y1, x2, y2) covering a fractional ROI. With tile_size > 0 the ROI is
+    split into overlapping tiles of about tile_size pixels, so each tile is upscaled to the
+    model input size and small cards keep more detail.
+    """
+    height, width = frame_shape[:2]
+    rx1, ry1 = int(roi[0] * width), int(roi[1] * height); rx2, ry2 = int(roi[2] * width), int(roi[3] * height)
+    if rx2 <= rx1 or ry2 <= ry1: return []
+    if tile_size <= 0: return [(rx1, ry1, rx2, ry2)]
+    stride = max(1, int(tile_size * (1 - overlap)))
+    def starts(lo, hi):
+        if hi - lo <= tile_size: return [lo]
+        positions = list(range(lo, hi - tile_size, stride)); positions.append(hi - tile_size)
+        return positions
+    return [(x, y, min(x + tile_size, rx2), min(y + tile_size, ry2)) for y in starts(ry1, ry2) for x in starts(rx1, rx2)]
+
+def position_zones(data, frame_height):
+    """Zone id per box row (0 neutral, 1 dealer, 2 player) from the box centre's height in the frame."""
+    centers_y = (data[:, 1] + data[:, 3]) / 2
+    zone_ids = np.zeros(len(data), dtype=np.int8)
+    zone_ids[centers_y < frame_height * DEALER_AREA_Y_LIMIT] = 1
+    zone_ids[centers_y > frame_height * PLAYER_AREA_Y_START] = 2
+    return zone_ids
+
+ZONE_COLORS = {'dealer': (255, 0, 0), 'player': (0, 255, 0)}; OTHER_ZONE_COLOR = (150, 150, 150)
+
+def split_boxes(detected_boxes):
+    """
+    Groups labels by the zone assigned at inference time and snapshots what draw_boxes needs,
+    without touching any image. Returns (detected_data, overlay), overlay = [(box, label, color), ...].
+    """
+    player_card_labels = []
+    dealer_card_labels = []
+    overlay = []
+
+    for item in sorted(detected_boxes, key=lambda item: item['center_x']):
+        zone = item['zone']
+        if zone == 'dealer': dealer_card_labels.append(item['value'])
+        elif zone == 'player': player_card_labels.append(item['value'])
+        overlay.append((item['box'], item['label'], ZONE_COLORS.get(zone, OTHER_ZONE_COLOR))) # Tracking replaces 'box', never edits it
+
+    # Return dictionary with lists of FULL LABELS found in each zone
+    detected_data = {'player': player_card_labels, 'dealer': dealer_card_labels}
+    return detected_data, overlay
+
+def draw_boxes(frame, overlay):
+    """Draws an overlay from split_boxes onto `frame` in place and returns it."""
+    for box, label, color in overlay: draw_bounding_box(frame, box, label, color)
+    return frame
+
+def annotate_boxes(annotated_frame, detected_boxes):
+    """Draws the boxes and groups labels by the zone assigned at inference time."""
+    detected_data, overlay = split_boxes(detected_boxes)
+    return detected_data, draw_boxes(annotated_frame, overlay)
+
+# Compact per-box record for moving detections between processes or to disk
+RECORD_DTYPE = np.dtype([('box', np.float32, 4), ('confidence', np.float32), ('class_id', np.int16), ('zone', np.int8)])
+
+def boxes_to_records(detected_boxes):
+    records = np.zeros(len(detected_boxes), dtype=RECORD_DTYPE)
+    for i, item in enumerate(detected_boxes):
+        records[i] = (item['box'], item['confidence'], item['class_id'], ZONE_NAMES.index(item['zone']))
+    return records
+
+def records_to_boxes(records, class_table):
+    """Inverse of boxes_to_records, using a table from build_class_table."""
+    detected_boxes = []
+    for box, confidence, class_id, zone_id in zip(records['box'].tolist(), records['confidence'].tolist(), records['class_id'].tolist(), records['zone'].tolist()):
+        label, key, rank = class_table[class_id]
+        detected_boxes.append({'box': box, 'center_x': (box[0] + box[2]) / 2, 'center_y': (box[1] + box[3]) / 2, 'label': label, 'value': label,
+                               'key': key, 'rank': rank, 'class_id': class_id, 'confidence': confidence, 'zone': ZONE_NAMES[zone_id]})
+    return detected_boxes
+
+def build_class_table(model_names):
+    """
+    Resolves every model class once at load: returns a list indexed by class id of
+    (full label, internal key, rank) and a boolean array of classes with a usable rank.
+    """
+    size = max(model_names, default=-1) + 1
+    table = [(None, None, None)] * size; valid = np.zeros(size, dtype=bool)
+    for class_id, label in model_names.items():
+        key, rank = parse_card_label(label)
+        # !!! USER MUST VERIFY: labels like 'Ace'/'King' need their own mapping here !!!
+        if rank is None:
+            print(f"Warning: Could not extract valid rank from label '{label}'. Class {class_id} will be ignored."); continue
+        table[class_id] = (label, key, rank); valid[class_id] = True
+    return table, valid
 
 class CardDetector:
-    def __init__(self):
+    def __init__(self, backend=DETECTOR_BACKEND, imgsz=DETECTOR_IMGSZ, int8=DETECTOR_INT8, model=None):
+        # `model`: an already-loaded (or stub) model to use instead of loading CARD_MODEL_PATH
         self.model = None
+        self.backend = backend; self.imgsz = imgsz
         self.model_names = {}
+        self.class_table = []; self.class_valid = np.zeros(0, dtype=bool) # Class id -> (label, key, rank), see build_class_table
+        self.tracked_boxes = [] # Boxes from the last inference, moved along by the tracker
+        self.prev_gray = None; self.frames_since_inference = 0
         try:
-            self.model = YOLO(CARD_MODEL_PATH)
-            print(f"Card recognition model loaded successfully from {CARD_MODEL_PATH}")
+            if model is not None: self.model = model
+            else:
+                self.model = load_model(backend, CARD_MODEL_PATH, imgsz, int8)
+                print(f"Card recognition model loaded successfully from {CARD_MODEL_PATH} (backend: {backend})")
             if hasattr(self.model, 'names'):
                 self.model_names = self.model.names
                 print("--- IMPORTANT: Verify these Model Class Names match your rank extraction logic below ---")
                 print("Model Class Names:", self.model_names) # <<<--- USER MUST CHECK THIS OUTPUT
+                self.class_table, self.class_valid = build_class_table(self.model_names)
             else:
                 print("Warning: Could not access model class names.")
         except Exception as e:
             print(f"Error loading card model '{CARD_MODEL_PATH}': {e}")
 
-    def detect(self, frame):
-        annotated_frame = frame.copy()
-        detected_boxes = []
-        frame_height, frame_width, _ = frame.shape
-        dealer_area_y_limit = frame_height * 0.4
-        player_area_y_start = frame_height * 0.6
+    def detect(self, frame, force=False):
+        """
+        Returns (detected_data, annotated_frame). Full inference runs every DETECTION_INTERVAL
+        frames, when the scene moves or when `force` is set; in between, the last boxes are
+        carried forward by optical-flow tracking with their labels and zones unchanged.
+        """
+        return annotate_boxes(frame.copy(), self.detect_boxes(frame, force))
+
+    def detect_overlay(self, frame, force=False):
+        """
+        detect() without the copy: returns (detected_data, overlay) and leaves `frame` alone.
+        The boxes are drawn later, once, by draw_boxes in the final render pass.
+        """
+        return split_boxes(self.detect_boxes(frame, force))
+
+    def detect_boxes(self, frame, force=False):
+        """The box dicts behind detect(), without copying or drawing on the frame. `force` skips tracking and always infers."""
+        if not self.model: return []
+
+        gray, scale = downscale_gray(frame)
+        motion = frame_difference(gray, self.prev_gray)
+        if force or self.frames_since_inference + 1 >= DETECTION_INTERVAL or motion > DETECTION_MOTION_THRESHOLD:
+            detected_boxes = self._infer(frame)
+            if detected_boxes is None:
+                self.tracked_boxes = []; self.prev_gray = None
+                return []
+            self.tracked_boxes = detected_boxes; self.frames_since_inference = 0
+        else:
+            self._track(self.prev_gray, gray, scale); self.frames_since_inference += 1
+        self.prev_gray = gray
+        return self.tracked_boxes
 
-        if not self.model:
-            return {'player': [], 'dealer': []}, annotated_frame
+    def detect_batch(self, frames):
+        """
+        detect() for several frames (e.g. one per table) in a single model call, so the
+        per-call overhead is shared. Always full inference, without tracking or ROI crops.
+        """
+        return [annotate_boxes(frame.copy(), detected_boxes) for frame, detected_boxes in zip(frames, self.detect_boxes_batch(frames))]
 
+    def detect_boxes_batch(self, frames):
+        """The box dicts behind detect_batch(); an empty list per frame if there is no model or the call fails."""
+        if not self.model or not len(frames): return [[] for _ in frames]
         try:
-            results = self.model(frame, verbose=False, conf=DETECTION_CONFIDENCE)
+            arrays = self._run_model(list(frames))
         except Exception as e:
             print(f"Error during YOLO detection: {e}")
-            return {'player': [], 'dealer': []}, annotated_frame
-
-        if results and results[0].boxes:
-            for box in results[0].boxes:
-                coords = box.xyxy[0].tolist()
-                confidence = box.conf[0].item()
-                center_x = (coords[0] + coords[2]) / 2
-                center_y = (coords[1] + coords[3]) / 2
-
-                try:
-                    if self.model_names and box.cls is not None and len(box.cls) > 0:
-                        class_id = int(box.cls[0])
-                        predicted_label = self.model_names.get(class_id, None) # Full label 'AS', 'KH', '10d' etc.
-
-                        if predicted_label is None: continue
-
-                        # --- Extract Rank ---
-                        # !!! USER MUST VERIFY/ADJUST THIS LOGIC based on printed "Model Class Names" !!!
-                        label_upper = predicted_label.upper()
-                        card_rank = None
-                        if label_upper.startswith('10'): card_rank = 'T'
-                        elif len(label_upper) >= 1:
-                            first_char = label_upper[0]
-                            if first_char in CARD_RANKS: card_rank = first_char
-                        # Add elif conditions here if model uses non-standard labels like 'Ace', 'King'
-
-                        if card_rank is None or card_rank not in CARD_RANKS:
-                            print(f"Warning: Could not extract valid rank from label '{predicted_label}'. Skipping.")
-                            continue
-                        # !!! END OF VERIFICATION BLOCK !!!
-
-                        card_value_full_label = predicted_label # Use original case for tracking
-                        card_label_display = predicted_label # Label for display box
-
-                        detected_boxes.append({
-                            'box': coords, 'center_x': center_x, 'center_y': center_y,
-                            'label': card_label_display, # Show 'Ac', '10d', etc.
-                            'value': card_value_full_label, # <<<--- VALUE IS FULL LABEL ('Ac', '10d')
-                            'rank': card_rank,        # Extracted rank ('A', 'T', 'K')
-                            'confidence': confidence
-                        })
-                    # ... (handle missing prediction/names) ...
-                except Exception as e:
-                    print(f"Error processing prediction for box {box}: {e}")
-                    continue
-
-        detected_boxes.sort(key=lambda item: item['center_x'])
-        player_card_labels = []
-        dealer_card_labels = []
-
-        for item in detected_boxes:
-            coords = item['box']; display_label = item['label']; full_label = item['value']; center_y = item['center_y']
-            if center_y < dealer_area_y_limit:
-                dealer_card_labels.append(full_label)
-                color = (255, 0, 0); draw_bounding_box(annotated_frame, coords, display_label, color)
-            elif center_y > player_area_y_start:
-                 player_card_labels.append(full_label)
-                 color = (0, 255, 0); draw_bounding_box(annotated_frame, coords, display_label, color)
-            else:
-                 color = (150, 150, 150); draw_bounding_box(annotated_frame, coords, display_label, color)
+            return [[] for _ in frames]
+        return [self._to_boxes(data, position_zones(data, frame.shape[0])) for frame, data in zip(frames, arrays)]
+
+    def _run_model(self, images):
+        """One model call over a frame or a list of crops. Returns one [x1, y1, x2, y2, conf, cls] float32 array per image."""
+        results = self.model(images, verbose=False, conf=DETECTION_CONFIDENCE, imgsz=self.imgsz)
+        arrays = []
+        for result in results:
+            # One device->host copy per result
+            if result.boxes is None or len(result.boxes) == 0: arrays.append(np.zeros((0, 6), dtype=np.float32))
+            else: arrays.append(np.asarray(result.boxes.data.cpu().numpy(), dtype=np.float32))
+        return arrays
+
+    def _infer(self, frame):
+        """Runs YOLO on the frame (or its regions of interest). Returns box dicts with their zone ('dealer', 'player' or None), or None on error."""
+        try:
+            if DETECTION_ROI_MODE: return self._infer_rois(frame)
+            data = self._run_model(frame)[0]
+        except Exception as e:
+            print(f"Error during YOLO detection: {e}")
+            return None
+        return self._to_boxes(data, position_zones(data, frame.shape[0]))
+
+    def _infer_rois(self, frame):
+        """Crops (and optionally tiles) the dealer and player ROIs, runs them as one batch and merges overlaps with NMS."""
+        crops = []; offsets = []; crop_zones = []
+        for zone_id, roi in ((1, DEALER_ROI), (2, PLAYER_ROI)):
+            for x1, y1, x2, y2 in roi_tiles(frame.shape, roi, ROI_TILE_SIZE, ROI_TILE_OVERLAP):
+                crops.append(frame[y1:y2, x1:x2]); offsets.append((x1, y1)); crop_zones.append(zone_id)
+        if not crops: return []
+        arrays = self._run_model(crops)
+        data = np.concatenate([a + np.array([x, y, x, y, 0, 0], dtype=np.float32) for a, (x, y) in zip(arrays, offsets)])
+        zone_ids = np.concatenate([np.full(len(a), zone_id, dtype=np.int8) for a, zone_id in zip(arrays, crop_zones)])
+        if len(data) > 1 and len(crops) > 1:
+            # Class-aware NMS: shift each class to its own region so different cards never suppress each other
+            shift = data[:, 5:6] * (max(frame.shape[:2]) + 1)
+            xywh = np.hstack([data[:, 0:2] + shift, data[:, 2:4] - data[:, 0:2]])
+            keep = cv2.dnn.NMSBoxes(xywh.tolist(), data[:, 4].tolist(), DETECTION_CONFIDENCE, ROI_NMS_IOU)
+            keep = np.asarray(keep, dtype=np.int64).reshape(-1)
+            data = data[keep]; zone_ids = zone_ids[keep]
+        return self._to_boxes(data, zone_ids)
+
+    def _to_boxes(self, data, zone_ids):
+        """Drops unknown classes and builds box dicts sorted left to right."""
+        class_ids = data[:, 5].astype(np.int64)
+        known = (class_ids >= 0) & (class_ids < len(self.class_valid))
+        known[known] = self.class_valid[class_ids[known]]
+        data = data[known]; class_ids = class_ids[known]; zone_ids = zone_ids[known]
+        centers_x = (data[:, 0] + data[:, 2]) / 2; centers_y = (data[:, 1] + data[:, 3]) / 2
+        order = np.argsort(centers_x, kind='stable')
+
+        detected_boxes = []
+        for box, center_x, center_y, class_id, zone_id in zip(data[order, :5].tolist(), centers_x[order].tolist(), centers_y[order].tolist(), class_ids[order].tolist(), zone_ids[order].tolist()):
+            label, key, rank = self.class_table[class_id]
+            detected_boxes.append({
+                'box': box[:4], 'center_x': center_x, 'center_y': center_y,
+                'label': label, # Show 'Ac', '10d', etc.
+                'value': label, # <<<--- VALUE IS FULL LABEL ('Ac', '10d')
+                'key': key, 'rank': rank, # Internal key ('AC', 'TD') and rank ('A', 'T', 'K')
+                'class_id': class_id, 'confidence': box[4], 'zone': ZONE_NAMES[zone_id]
+            })
+        return detected_boxes
 
-        # Return dictionary with lists of FULL LABELS found in each zone
-        detected_data = {'player': player_card_labels, 'dealer': dealer_card_labels}
-        return detected_data, annotated_frame
+    def _track(self, prev_gray, gray, scale):
+        """Shifts each carried box by the median Lucas-Kanade flow of corner points found inside it."""
+        if prev_gray is None or prev_gray.shape != gray.shape or not self.tracked_boxes: return
+        points = []; owners = []
+        for i, item in enumerate(self.tracked_boxes):
+            x1, y1, x2, y2 = (int(c / scale) for c in item['box'])
+            mask = np.zeros_like(prev_gray); mask[max(y1, 0):max(y2, 0), max(x1, 0):max(x2, 0)] = 255
+            corners = cv2.goodFeaturesToTrack(prev_gray, maxCorners=TRACKER_MAX_CORNERS, qualityLevel=0.01, minDistance=3, mask=mask)
+            if corners is None: continue
+            points.append(corners); owners.extend([i] * len(corners))
+        if not points: return
+        points = np.concatenate(points)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, winSize=(15, 15), maxLevel=2)
+        shifts = (moved - points).reshape(-1, 2) * scale; ok = status.ravel() == 1; owners = np.array(owners)
+        for i, item in enumerate(self.tracked_boxes):
+            box_shifts = shifts[ok & (owners == i)]
+            if len(box_shifts) < 3: continue  # Too few points to trust; leave the box where it was
+            dx, dy = (float(v) for v in np.median(box_shifts, axis=0))
+            x1, y1, x2, y2 = item['box']
+            item['box'] = [x1 + dx, y1 + dy, x2 + dx, y2 + dy]
+            item['center_x'] += dx; item['center_y'] += dy
 
-# --- END OF FILE card_detector.py ---
\ No newline at end of file
+# --- END OF FILE card_detector.py ---
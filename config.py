@@ -8,15 +8,43 @@ load_dotenv() # Load environment variables from .env file
 
 # --- Camera Settings ---
 CAMERA_INDEX = 0  # <<<--- SET THIS TO THE CORRECT INDEX FOR YOUR IPHONE CAMERA
+USE_THREADED_PIPELINE = True # Capture and detection on background threads (capture_pipeline.py); False = old single-threaded loop
+CAPTURE_RECONNECT_DELAY = 0.5 # Seconds between camera reopen attempts
+CAPTURE_MAX_RECONNECT_ATTEMPTS = 10 # Consecutive failed reads/reopens before giving up
+RENDER_POLL_INTERVAL = 1.0 / 60 # Max seconds the render loop waits for a new detection before redrawing/polling keys
+MULTI_TABLE_CAMERAS = [] # Two or more camera indices = multi-table mode (multi_table.py), e.g. [0, 1, 2]; keys 1-9 pick the table
+USE_DETECTION_PROCESS = False # Threaded pipeline only: run the detector in a separate process fed via shared memory (detection_process.py)
+DETECTION_PROCESS_SLOTS = 3 # Frames in the shared-memory ring; up to SLOTS-1 requests are in flight at once
+DETECTION_PROCESS_TIMEOUT = 10.0 # Seconds without an answer before the detection process is restarted
+DETECTION_PROCESS_STARTUP_TIMEOUT = 120.0 # Seconds allowed for the process to load the model
 
 # --- CV Model Settings ---
 CARD_MODEL_PATH = 'card_model.pt' # Path to your card recognition model
 DETECTION_CONFIDENCE = 0.4 # Adjust based on testing (0.25 to 0.7)
+DETECTION_INTERVAL = 5 # Full YOLO inference every N frames (1 = every frame); boxes are tracked in between
+DETECTION_MOTION_THRESHOLD = 6.0 # Mean abs grey-level change (0-255) between frames that forces a fresh inference
+TRACKER_DOWNSCALE_WIDTH = 320 # Width of the greyscale image used for motion checks and optical-flow tracking
+TRACKER_MAX_CORNERS = 20 # Corner points tracked per card box
+DETECTOR_BACKEND = 'torch' # 'torch' (CARD_MODEL_PATH as-is), 'onnx' (ONNX Runtime) or 'openvino'; exports are cached next to the weights
+DETECTOR_IMGSZ = 640 # Model input size (exported models are fixed to this size)
+DETECTOR_INT8 = False # INT8-quantize the exported model (onnx: dynamic quantization, openvino: calibrated)
+DETECTOR_INT8_DATA = None # Dataset YAML used to calibrate OpenVINO INT8 (None = ultralytics default)
+DETECTION_ROI_MODE = False # Run the model only on the dealer/player regions below (one batched call) instead of the full frame
+DEALER_ROI = (0.0, 0.0, 1.0, 0.4) # (x1, y1, x2, y2) as fractions of the frame
+PLAYER_ROI = (0.0, 0.6, 1.0, 1.0)
+ROI_TILE_SIZE = 0 # >0: split each ROI into overlapping tiles of this many pixels for small/distant cards (0 = one crop per ROI)
+ROI_TILE_OVERLAP = 0.2 # Fraction of a tile shared with its neighbour, so cards on a seam appear whole in one tile
+ROI_NMS_IOU = 0.5 # Overlap above which duplicate boxes from neighbouring tiles are merged
+USE_SCENE_GATE = True # Skip detection entirely while the dealer/player zones are unchanged (frame_gate.py)
+SCENE_PIXEL_THRESHOLD = 25 # Grey-level change (0-255) for a downscaled pixel to count as changed
+SCENE_CHANGE_FRACTION = 0.003 # Fraction of changed pixels in any zone that triggers a new detection
+SCENE_REFRESH_INTERVAL = 2.0 # Seconds after which detection runs anyway (0 = only on change)
 
 # --- Blackjack Settings ---
-NUM_DECKS = 1 # Single Deck
+NUM_DECKS = 1 # Single Deck (any deck count works, e.g. 2, 6 or 8)
 SHOE_PENETRATION = 0.75
 CARD_RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K', 'A']
+CARD_SUITS = ('S', 'H', 'D', 'C')
 COUNTING_SYSTEM = { # Hi-Lo (Used for True Count display and Index Plays)
     '2': 1, '3': 1, '4': 1, '5': 1, '6': 1, '7': 0, '8': 0, '9': 0,
     'T': -1, 'J': -1, 'Q': -1, 'K': -1, 'A': -1
@@ -78,6 +106,14 @@ INDEX_PLAYS = {
     (('T','T'), 6): {'Type': 'ge', 'Threshold': +4, 'Action': 'P'},
 }
 
+# --- Shoe Simulator Settings (shoe_simulator.py) ---
+SIMULATOR_BATCH_SHOES = 200 # Shoes per process-pool task; smaller batches stream partial results sooner
+SIMULATOR_BANKROLL_UNITS = 1000 # Bankroll in base-bet units used for the risk-of-ruin estimate
+
+# --- Compiled Strategy Table Settings (strategy_compiler.py) ---
+STRATEGY_TC_BUCKET_STEP = 0.1 # Grid of the compiled table; INDEX_PLAYS thresholds must lie on it (counts are compared exactly)
+STRATEGY_TC_BUCKET_LIMIT = 10 # True counts beyond +/- this are clamped
+
 # --- Dealer Bust Rate Analysis Config ---
 DEALER_HISTORY_MIN_SAMPLES = 10 # Minimum hands needed for a specific upcard before checking anomaly
 DEALER_BUST_RATE_THRESHOLD_MULTIPLIER = 0.70 # Trigger warning if observed bust rate is LESS than e.g., 70% of expected rate
@@ -87,17 +123,63 @@ EXPECTED_DEALER_BUST_RATES_S17_SINGLE_DECK = {
     '7': 0.26, '8': 0.24, '9': 0.23, 'T': 0.23, 'J': 0.23, 'Q': 0.23, 'K': 0.23, # Lower bust chance
     'A': 0.17  # Lowest bust chance
 }
+USE_LIVE_DEALER_BUST_RATES = True # Compare observed bust rates against exact rates from the current shoe instead of the static table
+DEALER_ENGINE_CACHE_SIZE = 200000 # Max memoized (dealer hand, shoe composition) states kept by dealer_engine
+
+# --- EV Engine Settings ---
+USE_EV_ENGINE = True # Recommend the highest-EV move from the exact remaining shoe instead of the fixed bust% override
+DOUBLE_AFTER_SPLIT = True # Matches the DAS rules assumed by BASIC_STRATEGY
+EV_ENGINE_CACHE_SIZE = 200000 # Max memoized (hand state, shoe composition) subproblems per EV table
+EV_ENGINE_DEALER_DEPTH = 0 # Player draws also removed from the dealer's shoe; deeper is more exact but slower
+
+# --- Monte Carlo (monte_carlo.py) ---
+MONTE_CARLO_SEED = None # Seed for the NumPy batch simulators (None = fresh entropy each run)
 
+# --- Speculation (speculation.py) ---
+USE_SPECULATION = True # Precompute analyses for every possible next card (and the dealer turn for every hole card) on a background thread while idle
 
 # --- Gemini Settings ---
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 if not GEMINI_API_KEY: print("Warning: GEMINI_API_KEY not found.")
 GEMINI_MODEL_NAME = "gemini-1.5-flash"
+EXPLANATION_MODE = 'local_then_gemini' # 'local' (offline templates only), 'gemini' (falls back to local when unavailable), or 'local_then_gemini' (local at once, replaced by Gemini's answer)
+GEMINI_STUB = False # Use the offline StubGeminiModel instead of the API (no key or network needed)
+GEMINI_STUB_DELAY = 1.5 # Seconds the stub takes to answer, to exercise the pending state
+EXPLANATION_CACHE_PATH = 'explanation_cache.sqlite3' # Explanations stored by situation across restarts; None = in memory only
+EXPLANATION_CACHE_SIZE = 512 # Situations kept in memory (least recently used are dropped)
+EXPLANATION_CACHE_TTL = 30 * 24 * 3600 # Seconds before a stored explanation is asked for again (0 = never expires)
+EXPLANATION_CACHE_TC_STEP = 1.0 # True counts within the same step share explanations (coarser than the strategy buckets)
 
 # --- UI Settings ---
 HUD_FONT = cv2.FONT_HERSHEY_SIMPLEX
 HUD_SCALE = 0.6; HUD_THICKNESS = 1
+WINDOW_NAME = 'Blackjack AI Assistant'
 HUD_COLOR_GOOD = (0, 255, 0); HUD_COLOR_BAD = (0, 0, 255); HUD_COLOR_NEUTRAL = (255, 255, 0); HUD_COLOR_TEXT = (255, 255, 255)
+HUD_PANEL_ALPHA = 0.7; HUD_STATUS_ALPHA = 0.9 # Opacity of the black HUD panels (hud_renderer.py blends them over the video)
+HUD_TEXT_CACHE_SIZE = 512 # Rasterized HUD strings kept (least recently used are dropped)
+
+# --- Latency Instrumentation (latency_monitor.py) ---
+LATENCY_MONITOR_ENABLED = True # Per-stage lap timing of the main loop; near-zero cost when False
+LATENCY_OVERLAY = False # Show FPS and p50/p99 per stage on the HUD at startup (toggle with 'L')
+LATENCY_RING_SIZE = 300 # Samples kept per stage
+LATENCY_FRAME_BUDGET_MS = 1000.0 / 30 # Stages whose p99 exceeds this are highlighted
+LATENCY_EXPORT_PATH = 'latency_log.jsonl' # JSON-lines snapshots; None disables export
+LATENCY_EXPORT_INTERVAL = 10.0 # Seconds between snapshots
+
+# --- Offline Processing (offline_processor.py) ---
+OFFLINE_BATCH_SIZE = 8 # Frames per batched model call
+OFFLINE_DECODE_THREADS = 4 # Image-folder decode threads (a video is decoded by one thread)
+OFFLINE_PREFETCH_FRAMES = 32 # Decoded frames buffered ahead of the detector
+
+# --- Session Recording (session_recorder.py) ---
+SESSION_RECORD_DIR = None # Folder to record frames + keypresses of a live session into for later replay; None = off
+SESSION_RECORD_FPS = 30 # Nominal frame rate of the recorded video (replay uses the logged timestamps)
+
+# --- Benchmarks (benchmarks.py) ---
+BENCHMARK_BASELINE_PATH = 'benchmark_baseline.json' # Stored results compared against on every run
+BENCHMARK_TOLERANCE = 0.30 # Calibrated ops/s drop (fraction of baseline) flagged as a regression; run-to-run noise measured here stays under ~0.17
+BENCHMARK_MIN_TIME = 1.0 # Seconds spent timing each benchmark, split across the repeats
+BENCHMARK_REPEATS = 15 # Timing runs per benchmark, each paired with a calibration run; medians are reported (robust to background load)
 
 # --- History Limits ---
 MAX_HOLE_CARD_HISTORY = 10 # How many recent hole cards to display on HUD
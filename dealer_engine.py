@@ -0,0 +1,83 @@
+# --- START OF FILE dealer_engine.py ---
+from functools import lru_cache
+from config import DEALER_ENGINE_CACHE_SIZE
+
+# Composition keys are 10-tuples of remaining card counts indexed by value:
+# index 0..7 -> 2..9, index 8 -> ten-valued (T/J/Q/K), index 9 -> Ace.
+CARD_VALUES = (2, 3, 4, 5, 6, 7, 8, 9, 10, 11)
+TEN_INDEX = 8
+ACE_INDEX = 9
+DEALER_OUTCOMES = (17, 18, 19, 20, 21, 'BJ', 'Bust')
+_BJ_SLOT = 5
+_BUST_SLOT = 6
+_STAND_RESULT = {total: tuple(1.0 if i == total - 17 else 0.0 for i in range(len(DEALER_OUTCOMES))) for total in range(17, 22)}
+_BUST_RESULT = tuple(1.0 if i == _BUST_SLOT else 0.0 for i in range(len(DEALER_OUTCOMES)))
+_EMPTY_RESULT = (0.0,) * len(DEALER_OUTCOMES)
+
+def value_index(card_value):
+    """Maps a numeric card value (2-11) to its composition index."""
+    return card_value - 2
+
+def _add_card(total, soft, card_value):
+    """Returns (total, soft) after adding a card, counting one ace as 11 while it fits."""
+    if card_value == 11:
+        if total + 11 <= 21: return total + 11, True
+        return total + 1, soft
+    total += card_value
+    if total > 21 and soft: return total - 10, False
+    return total, soft
+
+@lru_cache(maxsize=DEALER_ENGINE_CACHE_SIZE)
+def _dealer_distribution(total, soft, composition):
+    """Outcome probabilities (ordered as DEALER_OUTCOMES) for a dealer standing on all 17s (S17)."""
+    if total > 21: return _BUST_RESULT
+    if total >= 17: return _STAND_RESULT[total]
+    remaining = sum(composition)
+    if remaining <= 0: return _EMPTY_RESULT  # Shoe exhausted mid-hand; probabilities sum below 1
+    result = [0.0] * len(DEALER_OUTCOMES)
+    for idx, count in enumerate(composition):
+        if count <= 0: continue
+        weight = count / remaining
+        next_total, next_soft = _add_card(total, soft, CARD_VALUES[idx])
+        next_composition = composition[:idx] + (count - 1,) + composition[idx + 1:]
+        for slot, prob in enumerate(_dealer_distribution(next_total, next_soft, next_composition)):
+            result[slot] += weight * prob
+    return tuple(result)
+
+@lru_cache(maxsize=DEALER_ENGINE_CACHE_SIZE)
+def _upcard_distribution(up_value, composition, peek):
+    """Outcome probabilities for a dealer showing `up_value`, including the hole-card draw."""
+    start_total, start_soft = _add_card(0, False, up_value)
+    bj_index = ACE_INDEX if up_value == 10 else TEN_INDEX if up_value == 11 else None
+    remaining = sum(composition)
+    if peek and bj_index is not None: remaining -= composition[bj_index]  # Dealer checked for blackjack
+    if remaining <= 0: return _EMPTY_RESULT
+    result = [0.0] * len(DEALER_OUTCOMES)
+    for idx, count in enumerate(composition):
+        if count <= 0: continue
+        weight = count / remaining
+        if idx == bj_index:
+            if not peek: result[_BJ_SLOT] += weight
+            continue
+        next_total, next_soft = _add_card(start_total, start_soft, CARD_VALUES[idx])
+        next_composition = composition[:idx] + (count - 1,) + composition[idx + 1:]
+        for slot, prob in enumerate(_dealer_distribution(next_total, next_soft, next_composition)):
+            result[slot] += weight * prob
+    return tuple(result)
+
+def dealer_outcome_probabilities(up_value, composition, peek=False):
+    """
+    Exact dealer outcome distribution for an upcard and the remaining shoe composition.
+    Returns a dict {17, 18, 19, 20, 21, 'BJ', 'Bust'} -> probability. With peek=True the
+    distribution is conditioned on the dealer not holding blackjack.
+    """
+    return dict(zip(DEALER_OUTCOMES, _upcard_distribution(up_value, tuple(composition), peek)))
+
+def dealer_hand_probabilities(total, soft, composition):
+    """Exact outcome distribution for a dealer hand already holding two or more cards."""
+    return dict(zip(DEALER_OUTCOMES, _dealer_distribution(total, soft, tuple(composition))))
+
+def clear_cache():
+    _dealer_distribution.cache_clear(); _upcard_distribution.cache_clear()
+
+# --- END OF FILE dealer_engine.py ---
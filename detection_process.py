@@ -0,0 +1,148 @@
+# --- START OF FILE detection_process.py ---
+import multiprocessing as mp
+import queue
+import threading
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from config import DETECTION_PROCESS_SLOTS, DETECTION_PROCESS_TIMEOUT, DETECTION_PROCESS_STARTUP_TIMEOUT
+from card_detector import RECORD_DTYPE, boxes_to_records, build_class_table, records_to_boxes, split_boxes
+
+def _worker_main(shm_name, frame_shape, slots, requests, results):
+    """Child process: owns the CardDetector and answers (slot, seq, force) requests with packed box records."""
+    from card_detector import CardDetector
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = np.ndarray((slots,) + frame_shape, dtype=np.uint8, buffer=shm.buf)
+    detector = CardDetector()
+    results.put(('ready', dict(detector.model_names)))
+    try:
+        while True:
+            request = requests.get()
+            if request is None: break
+            slot, seq, force = request
+            start = time.perf_counter()
+            try:
+                records = boxes_to_records(detector.detect_boxes(frames[slot], force))
+            except Exception as e:
+                print(f"Error card detection (worker process): {e}"); records = np.zeros(0, dtype=RECORD_DTYPE)
+            results.put(('result', slot, seq, records.tobytes(), (time.perf_counter() - start) * 1000.0))
+    finally:
+        del frames; shm.close()
+
+class DetectionProcessWorker(threading.Thread):
+    """
+    Drop-in replacement for capture_pipeline.DetectionWorker that runs CardDetector in a
+    separate process, so model pre/post-processing never holds this process's GIL.
+    Frames are copied into a shared-memory ring of `slots` frames and only (slot, seq, force)
+    crosses the queue; detections come back as RECORD_DTYPE bytes and are drawn here.
+    A worker that dies or stops answering is restarted; game state lives in the UI
+    process and is unaffected.
+    """
+    def __init__(self, grabber, latency=None, gate=None, slots=DETECTION_PROCESS_SLOTS):
+        super().__init__(name="DetectionProcessWorker", daemon=True)
+        self.grabber = grabber; self.latency = latency; self.gate = gate
+        self.slots = max(2, slots)
+        self.condition = threading.Condition()
+        self.result = None; self.result_seq = 0; self.dropped_frames = 0; self.restarts = 0
+        self._stop_event = threading.Event()
+        self._context = mp.get_context('spawn')  # fork() with live capture threads is unsafe
+        self.process = None; self.shm = None; self.frames = None; self.frame_shape = None
+        self.class_table = []; self.ready = False; self.started_at = 0.0
+        self.in_flight = {}  # slot -> (frame seq, gate grey image, submit time)
+
+    # --- Worker process management ---
+    def _start_process(self, frame_shape):
+        self._stop_process()
+        if self.frame_shape != frame_shape or self.shm is None:
+            self._release_ring()
+            self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(frame_shape)) * self.slots)
+            self.frames = np.ndarray((self.slots,) + frame_shape, dtype=np.uint8, buffer=self.shm.buf)
+            self.frame_shape = frame_shape
+        self.requests = self._context.Queue(); self.results = self._context.Queue()
+        self.process = self._context.Process(target=_worker_main, args=(self.shm.name, frame_shape, self.slots, self.requests, self.results), daemon=True)
+        self.process.start()
+        self.ready = False; self.started_at = time.time(); self.in_flight.clear()
+
+    def _stop_process(self):
+        if self.process is None: return
+        try: self.requests.put_nowait(None)
+        except Exception: pass
+        self.process.join(timeout=1.0)
+        if self.process.is_alive(): self.process.kill(); self.process.join(timeout=1.0)
+        self.process = None
+
+    def _restart(self, reason):
+        print(f"Detection process {reason}; restarting it."); self.restarts += 1
+        self._start_process(self.frame_shape)
+
+    def _release_ring(self):
+        if self.shm is None: return
+        self.frames = None
+        self.shm.close(); self.shm.unlink(); self.shm = None
+
+    def _check_health(self):
+        now = time.time()
+        if not self.process.is_alive(): self._restart(f"exited (code {self.process.exitcode})")
+        elif not self.ready and now - self.started_at > DETECTION_PROCESS_STARTUP_TIMEOUT: self._restart("did not load the model in time")
+        elif self.in_flight and now - min(t for _, _, t in self.in_flight.values()) > DETECTION_PROCESS_TIMEOUT: self._restart("stopped answering")
+
+    # --- Main loop ---
+    def run(self):
+        last_frame_seq = 0
+        try:
+            while not self._stop_event.is_set():
+                if self.process is not None: self._check_health()
+                if self.process is None or (self.ready and len(self.in_flight) < self.slots - 1):
+                    frame_seq, frame = self.grabber.wait_for_frame(last_frame_seq, timeout=0.01 if self.in_flight else 0.5)
+                    if frame is None:
+                        if self.grabber.failed: break
+                    else:
+                        if last_frame_seq: self.dropped_frames += frame_seq - last_frame_seq - 1
+                        last_frame_seq = frame_seq
+                        if self.process is None or frame.shape != self.frame_shape: self._start_process(frame.shape)
+                        else: self._submit(frame_seq, frame)
+                self._collect(timeout=0.001 if not self.in_flight else 0.01)
+        finally:
+            self._stop_process(); self._release_ring()
+
+    def _submit(self, frame_seq, frame):
+        gray = None
+        if self.gate is not None:
+            needed, gray = self.gate.check(frame)
+            if not needed: return  # Static scene: the last published result still holds
+        slot = next(s for s in range(self.slots) if s not in self.in_flight)
+        np.copyto(self.frames[slot], frame)
+        self.in_flight[slot] = (frame_seq, gray, time.time())
+        self.requests.put((slot, frame_seq, self.gate is not None))  # A gated frame changed: infer it, don't track
+
+    def _collect(self, timeout):
+        try:
+            message = self.results.get(timeout=timeout)
+        except queue.Empty:
+            return
+        if message[0] == 'ready':
+            self.class_table, _ = build_class_table(message[1]); self.ready = True
+            print(f"Detection process ready (pid {self.process.pid}).")
+            return
+        _, slot, frame_seq, payload, detect_ms = message
+        if slot not in self.in_flight: return  # From before a restart
+        _, gray, _ = self.in_flight.pop(slot)
+        frame = self.frames[slot].copy()  # The slot is reused for the next request
+        detected_boxes = records_to_boxes(np.frombuffer(payload, dtype=RECORD_DTYPE), self.class_table)
+        output = split_boxes(detected_boxes)
+        if self.gate is not None: self.gate.remember(gray, output)
+        if self.latency is not None: self.latency.record('detect_bg', detect_ms)
+        with self.condition:
+            self.result = (frame_seq, frame, output[0], output[1]); self.result_seq += 1
+            self.condition.notify_all()
+
+    def wait_for_result(self, after_seq, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.result_seq > after_seq or self._stop_event.is_set(), timeout)
+            return self.result_seq, self.result
+
+    def stop(self):
+        self._stop_event.set()
+        with self.condition: self.condition.notify_all()
+
+# --- END OF FILE detection_process.py ---
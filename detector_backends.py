@@ -0,0 +1,112 @@
+# --- START OF FILE detector_backends.py ---
+"""
+CPU inference backends for CardDetector. The PyTorch weights are exported once per
+(backend, input size, INT8) combination and cached next to CARD_MODEL_PATH; later runs
+load the cached artifact directly. Every backend is loaded through ultralytics.YOLO,
+so results (and CardDetector.detect) look the same whichever one is used.
+
+Compare backends on a folder of frames:
+    python detector_backends.py --frames captured_frames/ --backends torch onnx openvino --int8
+"""
+import argparse
+import glob
+import os
+import shutil
+import time
+import numpy as np
+from ultralytics import YOLO
+from config import CARD_MODEL_PATH, DETECTOR_BACKEND, DETECTOR_IMGSZ, DETECTOR_INT8, DETECTOR_INT8_DATA
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+
+def exported_model_path(weights_path, backend, imgsz, int8):
+    """Cache location for an exported model, e.g. card_model_640_dyn_int8.onnx or card_model_640_dyn_openvino_model/."""
+    stem = os.path.splitext(weights_path)[0] + f"_{imgsz}_dyn" + ("_int8" if int8 else "")  # '_dyn': earlier batch-1 exports are not reused
+    return stem + ".onnx" if backend == 'onnx' else stem + "_openvino_model"
+
+def _quantize_onnx(source_path, target_path):
+    try:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+    except ImportError as e:
+        raise ImportError("INT8 for the onnx backend needs onnxruntime (pip install onnxruntime).") from e
+    quantize_dynamic(source_path, target_path, weight_type=QuantType.QUInt8)
+
+def export_model(weights_path=CARD_MODEL_PATH, backend=DETECTOR_BACKEND, imgsz=DETECTOR_IMGSZ, int8=DETECTOR_INT8):
+    """
+    Exports the weights for `backend` unless an export newer than the weights is already cached. Returns its path.
+    The batch dimension is dynamic: ROI crops, multi-table and offline batches pass several images per call.
+    """
+    if backend not in BACKENDS or backend == 'torch': raise ValueError(f"Cannot export to backend '{backend}'.")
+    target = exported_model_path(weights_path, backend, imgsz, int8)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(weights_path):
+        return target
+    print(f"Exporting {weights_path} -> {target} (imgsz={imgsz}, int8={int8})...")
+    model = YOLO(weights_path)
+    if backend == 'onnx':
+        exported = model.export(format='onnx', imgsz=imgsz, simplify=True, dynamic=True)
+        if int8: _quantize_onnx(exported, target); os.remove(exported)
+        else: shutil.move(exported, target)
+    else:
+        export_args = {'format': 'openvino', 'imgsz': imgsz, 'int8': int8, 'dynamic': True}
+        if int8 and DETECTOR_INT8_DATA: export_args['data'] = DETECTOR_INT8_DATA
+        exported = model.export(**export_args)
+        if os.path.exists(target): shutil.rmtree(target)
+        shutil.move(exported, target)
+    print(f"Export cached at {target}")
+    return target
+
+def load_model(backend=DETECTOR_BACKEND, weights_path=CARD_MODEL_PATH, imgsz=DETECTOR_IMGSZ, int8=DETECTOR_INT8):
+    """Loads the card model for `backend`, exporting it first if needed."""
+    if backend == 'torch': return YOLO(weights_path)
+    return YOLO(export_model(weights_path, backend, imgsz, int8), task='detect')
+
+def _iou(a, b):
+    x1 = max(a[0], b[0]); y1 = max(a[1], b[1]); x2 = min(a[2], b[2]); y2 = min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+def detection_agreement(reference, candidate, iou_threshold=0.5):
+    """Fraction of boxes (of the larger set) matched one-to-one by label and IoU. 1.0 when both are empty."""
+    if not reference and not candidate: return 1.0
+    unmatched = list(candidate); matched = 0
+    for ref in reference:
+        for i, cand in enumerate(unmatched):
+            if cand['label'] == ref['label'] and _iou(ref['box'], cand['box']) >= iou_threshold:
+                matched += 1; unmatched.pop(i); break
+    return matched / max(len(reference), len(candidate))
+
+def compare_backends(frame_paths, backends, imgsz=DETECTOR_IMGSZ, int8=DETECTOR_INT8, warmup=3):
+    """Runs each backend over the frames; returns {backend: {'mean_ms', 'p50_ms', 'p95_ms', 'agreement'}} with agreement against the first backend."""
+    import cv2
+    from card_detector import CardDetector
+    frames = [f for f in (cv2.imread(p) for p in frame_paths) if f is not None]
+    if not frames: raise ValueError("No readable frames to compare on.")
+    reference = None; report = {}
+    for backend in backends:
+        detector = CardDetector(backend=backend, imgsz=imgsz, int8=int8)
+        for frame in frames[:warmup]: detector._infer(frame)
+        timings = []; outputs = []
+        for frame in frames:
+            start = time.perf_counter(); outputs.append(detector._infer(frame) or []); timings.append((time.perf_counter() - start) * 1000.0)
+        if reference is None: reference = outputs
+        report[backend] = {
+            'mean_ms': float(np.mean(timings)), 'p50_ms': float(np.percentile(timings, 50)), 'p95_ms': float(np.percentile(timings, 95)),
+            'agreement': float(np.mean([detection_agreement(r, o) for r, o in zip(reference, outputs)])),
+        }
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare card detector backends on a folder of frames")
+    parser.add_argument('--frames', required=True, help="Folder of .jpg/.png frames")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS, help="First backend is the agreement reference")
+    parser.add_argument('--imgsz', type=int, default=DETECTOR_IMGSZ)
+    parser.add_argument('--int8', action=argparse.BooleanOptionalAction, default=DETECTOR_INT8, help="INT8-quantize the exports (--no-int8 to turn off)")
+    args = parser.parse_args()
+    paths = sorted(p for ext in ('*.jpg', '*.jpeg', '*.png') for p in glob.glob(os.path.join(args.frames, ext)))
+    report = compare_backends(paths, args.backends, args.imgsz, args.int8)
+    print(f"{len(paths)} frames, imgsz={args.imgsz}, int8={args.int8}, reference={args.backends[0]}")
+    for backend, stats in report.items():
+        print(f"{backend:<9} mean {stats['mean_ms']:7.1f} ms  p50 {stats['p50_ms']:7.1f} ms  p95 {stats['p95_ms']:7.1f} ms  agreement {stats['agreement']:.1%}")
+
+# --- END OF FILE detector_backends.py ---
@@ -0,0 +1,114 @@
+# --- START OF FILE ev_engine.py ---
+from functools import lru_cache
+from config import EV_ENGINE_CACHE_SIZE, EV_ENGINE_DEALER_DEPTH, DOUBLE_AFTER_SPLIT
+from dealer_engine import CARD_VALUES, _add_card, _upcard_distribution
+
+# EVs are in units of the initial bet and conditioned on the dealer not holding blackjack
+# (dealer peeks with an A/T upcard), which is the situation in which the player actually decides.
+MOVE_ORDER = ('S', 'H', 'D', 'P')
+
+def _draw(composition, idx):
+    return composition[:idx] + (composition[idx] - 1,) + composition[idx + 1:]
+
+# Each subproblem carries two compositions: `composition` is what the player draws from and is
+# always exact; `dealer_composition` follows it for the first `depth` player draws and is then
+# frozen, which bounds the number of distinct dealer distributions that must be computed.
+def _next_state(composition, dealer_composition, depth, idx):
+    if depth > 0: return _draw(composition, idx), _draw(dealer_composition, idx), depth - 1
+    return _draw(composition, idx), dealer_composition, 0
+
+@lru_cache(maxsize=EV_ENGINE_CACHE_SIZE)
+def _stand_ev(up_value, total, dealer_composition):
+    if total > 21: return -1.0
+    dist = _upcard_distribution(up_value, dealer_composition, True)
+    # dist is ordered (17, 18, 19, 20, 21, BJ, Bust); BJ is zero under peek
+    ev = dist[6]
+    for slot, dealer_total in enumerate((17, 18, 19, 20, 21)):
+        if total > dealer_total: ev += dist[slot]
+        elif total < dealer_total: ev -= dist[slot]
+    return ev
+
+@lru_cache(maxsize=EV_ENGINE_CACHE_SIZE)
+def _hit_ev(up_value, total, soft, composition, dealer_composition, depth):
+    """EV of taking one card and then continuing optimally (hit/stand only)."""
+    remaining = sum(composition)
+    if remaining <= 0: return _stand_ev(up_value, total, dealer_composition)
+    ev = 0.0
+    for idx, count in enumerate(composition):
+        if count <= 0: continue
+        next_total, next_soft = _add_card(total, soft, CARD_VALUES[idx])
+        ev += count / remaining * _best_hit_stand_ev(up_value, next_total, next_soft, *_next_state(composition, dealer_composition, depth, idx))
+    return ev
+
+def _best_hit_stand_ev(up_value, total, soft, composition, dealer_composition, depth):
+    if total > 21: return -1.0
+    stand = _stand_ev(up_value, total, dealer_composition)
+    if total == 21: return stand
+    return max(stand, _hit_ev(up_value, total, soft, composition, dealer_composition, depth))
+
+@lru_cache(maxsize=EV_ENGINE_CACHE_SIZE)
+def _double_ev(up_value, total, soft, composition, dealer_composition, depth):
+    remaining = sum(composition)
+    if remaining <= 0: return 2 * _stand_ev(up_value, total, dealer_composition)
+    ev = 0.0
+    for idx, count in enumerate(composition):
+        if count <= 0: continue
+        next_total, _ = _add_card(total, soft, CARD_VALUES[idx])
+        ev += count / remaining * _stand_ev(up_value, next_total, _next_state(composition, dealer_composition, depth, idx)[1])
+    return 2 * ev
+
+@lru_cache(maxsize=EV_ENGINE_CACHE_SIZE)
+def _split_ev(up_value, pair_value, composition, depth):
+    """
+    EV of splitting a pair (no resplits; split aces receive one card each).
+    Both hands are approximated as drawing from the same composition.
+    """
+    remaining = sum(composition)
+    if remaining <= 0: return 0.0
+    start_total, start_soft = _add_card(0, False, pair_value)
+    hand_ev = 0.0
+    for idx, count in enumerate(composition):
+        if count <= 0: continue
+        next_total, next_soft = _add_card(start_total, start_soft, CARD_VALUES[idx])
+        state = _next_state(composition, composition, depth, idx)
+        if pair_value == 11:
+            best = _stand_ev(up_value, next_total, state[1])
+        else:
+            best = _best_hit_stand_ev(up_value, next_total, next_soft, *state)
+            if DOUBLE_AFTER_SPLIT: best = max(best, _double_ev(up_value, next_total, next_soft, *state))
+        hand_ev += count / remaining * best
+    return 2 * hand_ev
+
+def hand_state(card_values):
+    """Returns (total, soft) for a list of numeric card values (Ace = 11)."""
+    total, soft = 0, False
+    for value in card_values: total, soft = _add_card(total, soft, value)
+    return total, soft
+
+def compute_action_evs(player_card_values, up_value, composition, depth=EV_ENGINE_DEALER_DEPTH):
+    """
+    Expected value of every legal action for a player hand against a dealer upcard.
+    `player_card_values` are numeric values (Ace = 11) and `composition` the remaining shoe
+    as a 10-tuple by value (see dealer_engine). `depth` is how many player draws are also
+    removed from the dealer's shoe. Returns {move: ev} for the legal moves.
+    """
+    composition = tuple(composition)
+    total, soft = hand_state(player_card_values)
+    if total > 21: return {'Bust': -1.0}
+    if len(player_card_values) == 2 and total == 21: return {'S': 1.5}  # Natural, dealer has no BJ
+    evs = {'S': _stand_ev(up_value, total, composition)}
+    if total < 21: evs['H'] = _hit_ev(up_value, total, soft, composition, composition, depth)
+    if len(player_card_values) == 2:
+        evs['D'] = _double_ev(up_value, total, soft, composition, composition, depth)
+        if player_card_values[0] == player_card_values[1]:
+            evs['P'] = _split_ev(up_value, player_card_values[0], composition, depth)
+    return evs
+
+def best_move(evs):
+    """Highest-EV move from a compute_action_evs result (ties resolved in MOVE_ORDER)."""
+    return max(evs, key=lambda move: (evs[move], -MOVE_ORDER.index(move) if move in MOVE_ORDER else 0))
+
+def clear_cache():
+    _stand_ev.cache_clear(); _hit_ev.cache_clear(); _double_ev.cache_clear(); _split_ev.cache_clear()
+
+# --- END OF FILE ev_engine.py ---
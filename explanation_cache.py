@@ -0,0 +1,95 @@
+# --- START OF FILE explanation_cache.py ---
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config import EXPLANATION_CACHE_PATH, EXPLANATION_CACHE_SIZE, EXPLANATION_CACHE_TTL, EXPLANATION_CACHE_TC_STEP
+from strategy_compiler import hand_class
+from shoe import parse_card_label
+
+def _rank_value(rank):
+    return 11 if rank == 'A' else 10 if rank in ('T', 'J', 'Q', 'K') else int(rank)
+
+def reason_category(override_reason):
+    """Override reason without its live numbers: 'insurance', 'ev', 'bust', 'index:<rule>' or '' (unknown text is kept)."""
+    if not override_reason: return ''
+    if override_reason.startswith("Take Insurance"): return 'insurance'
+    if override_reason.startswith("EV"): return 'ev'
+    if override_reason.startswith("High Bust%"): return 'bust'
+    if override_reason.startswith("Index"): return f"index:{override_reason[len('Index'):].strip(' ()')}"  # Rule threshold, fixed per rule
+    return override_reason
+
+def situation_key(player_hand_labels, dealer_up_card_label, true_count, basic_move, final_move, override_reason):
+    """
+    Normalizes a decision to what an explanation depends on: hand class (hard/soft total or
+    pair), upcard value, true-count bucket, basic and final move and the kind of override
+    (see reason_category). Returns None for hands that cannot be parsed.
+    """
+    ranks = [parse_card_label(label)[1] for label in player_hand_labels or []]
+    up_rank = parse_card_label(dealer_up_card_label)[1] if dealer_up_card_label else None
+    if not ranks or None in ranks or up_rank is None: return None
+    values = [_rank_value(rank) for rank in ranks]
+    total = sum(values); aces = ranks.count('A')
+    while total > 21 and aces: total -= 10; aces -= 1
+    pair_rank = ('T' if values[0] == 10 else ranks[0]) if len(values) == 2 and values[0] == values[1] else None
+    return f"{hand_class(total, aces > 0, pair_rank)}|{_rank_value(up_rank)}|{round(true_count / EXPLANATION_CACHE_TC_STEP)}|{basic_move}|{final_move}|{reason_category(override_reason)}"
+
+class ExplanationCache:
+    """
+    Situation key -> explanation text. An in-memory LRU of `capacity` entries in front of
+    an optional sqlite3 file, so answers survive restarts; entries older than `ttl`
+    seconds are ignored and replaced. Safe to use from the Gemini worker thread.
+    """
+    def __init__(self, path=EXPLANATION_CACHE_PATH, capacity=EXPLANATION_CACHE_SIZE, ttl=EXPLANATION_CACHE_TTL):
+        self.capacity = capacity; self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (text, created)
+        self.hits = 0; self.misses = 0
+        self._lock = threading.Lock()
+        self.db = None
+        if path:
+            try:
+                self.db = sqlite3.connect(path, check_same_thread=False)
+                self.db.execute("CREATE TABLE IF NOT EXISTS explanations (key TEXT PRIMARY KEY, text TEXT NOT NULL, created REAL NOT NULL)")
+                if ttl > 0: self.db.execute("DELETE FROM explanations WHERE created < ?", (time.time() - ttl,))
+                self.db.commit()
+            except sqlite3.Error as e:
+                print(f"Explanation cache disabled on disk ({path}): {e}"); self.db = None
+
+    def _fresh(self, created):
+        return self.ttl <= 0 or time.time() - created < self.ttl
+
+    def get(self, key):
+        if key is None: return None
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None and self.db is not None:
+                row = self.db.execute("SELECT text, created FROM explanations WHERE key = ?", (key,)).fetchone()
+                if row: entry = self._remember(key, row[0], row[1])
+            if entry is None or not self._fresh(entry[1]):
+                self.misses += 1; return None
+            self.entries.move_to_end(key); self.hits += 1
+            return entry[0]
+
+    def put(self, key, text):
+        if key is None: return
+        with self._lock:
+            created = time.time()
+            self._remember(key, text, created)
+            if self.db is not None:
+                try:
+                    self.db.execute("INSERT OR REPLACE INTO explanations (key, text, created) VALUES (?, ?, ?)", (key, text, created))
+                    self.db.commit()
+                except sqlite3.Error as e:
+                    print(f"Explanation cache write failed: {e}")
+
+    def _remember(self, key, text, created):
+        entry = self.entries[key] = (text, created)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity: self.entries.popitem(last=False)
+        return entry
+
+    def close(self):
+        with self._lock:
+            if self.db is not None: self.db.close(); self.db = None
+
+# --- END OF FILE explanation_cache.py ---
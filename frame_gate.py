@@ -0,0 +1,61 @@
+# --- START OF FILE frame_gate.py ---
+import time
+import numpy as np
+from config import (DEALER_ROI, PLAYER_ROI, TRACKER_DOWNSCALE_WIDTH, SCENE_PIXEL_THRESHOLD,
+                    SCENE_CHANGE_FRACTION, SCENE_REFRESH_INTERVAL)
+from utils import downscale_gray
+
+class SceneChangeGate:
+    """
+    Cheap change detector in front of CardDetector.detect. Each frame is shrunk to a small
+    greyscale image and compared, zone by zone, with the last frame that was actually
+    inferred. Detection only runs again when some zone has more than `change_fraction` of
+    its pixels changed by over `pixel_threshold` grey levels, or when `refresh_interval`
+    seconds have passed; otherwise the previous detection output is reused. Detections the
+    gate asks for must be full inferences (force=True), never tracker carry-overs, or the
+    reference image would not match the cached output.
+    """
+    def __init__(self, zones=(DEALER_ROI, PLAYER_ROI), pixel_threshold=SCENE_PIXEL_THRESHOLD,
+                 change_fraction=SCENE_CHANGE_FRACTION, refresh_interval=SCENE_REFRESH_INTERVAL, width=TRACKER_DOWNSCALE_WIDTH):
+        self.zones = zones
+        self.pixel_threshold = pixel_threshold; self.change_fraction = change_fraction
+        self.refresh_interval = refresh_interval; self.width = width
+        self.reference = None  # Downscaled grey of the last detected frame
+        self.last_output = None; self.last_refresh = 0.0
+        self.frames_checked = 0; self.frames_skipped = 0
+
+    def zone_changes(self, gray):
+        """Fraction of changed pixels in each zone relative to the reference image."""
+        changed = np.abs(gray.astype(np.int16) - self.reference) > self.pixel_threshold
+        height, width = gray.shape
+        fractions = []
+        for x1, y1, x2, y2 in self.zones:
+            region = changed[int(y1 * height):int(y2 * height), int(x1 * width):int(x2 * width)]
+            fractions.append(float(region.mean()) if region.size else 0.0)
+        return fractions
+
+    def needs_detection(self, gray, now):
+        if self.last_output is None or self.reference is None or self.reference.shape != gray.shape: return True
+        if self.refresh_interval > 0 and now - self.last_refresh >= self.refresh_interval: return True
+        return max(self.zone_changes(gray), default=1.0) > self.change_fraction
+
+    def check(self, frame, now=None):
+        """Returns (needs_detection, gray). Pass `gray` to remember() with the detection output. `now` defaults to time.time()."""
+        self.frames_checked += 1
+        gray, _ = downscale_gray(frame, self.width)
+        needed = self.needs_detection(gray, time.time() if now is None else now)
+        if not needed: self.frames_skipped += 1
+        return needed, gray
+
+    def remember(self, gray, output, now=None):
+        self.last_output = output
+        self.reference = gray.astype(np.int16); self.last_refresh = time.time() if now is None else now
+
+    def process(self, frame, detect, now=None):
+        """Returns (output, fresh): `detect(frame, force=True)`'s output if the scene changed, else the cached one."""
+        needed, gray = self.check(frame, now)
+        if not needed: return self.last_output, False
+        self.remember(gray, detect(frame, force=True), now)
+        return self.last_output, True
+
+# --- END OF FILE frame_gate.py ---
@@ -1,12 +1,42 @@
 # --- START OF FILE gemini_integration.py ---
-import google.generativeai as genai
+import threading
 import time
-from config import GEMINI_API_KEY, GEMINI_MODEL_NAME
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from config import GEMINI_API_KEY, GEMINI_MODEL_NAME, GEMINI_STUB_DELAY
+from explanation_cache import ExplanationCache, situation_key
 from utils import format_hand
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None # Only StubGeminiModel (or another injected model) works without the SDK
+
+ERROR_PREFIXES = ("Gemini ", "Error Gemini") # Every non-answer _generate returns starts with one of these
+
+def is_error_response(text):
+    return text is None or text.startswith(ERROR_PREFIXES)
+
+class StubGeminiModel:
+    """Offline stand-in for genai.GenerativeModel: answers after `delay` seconds, failing the first `failures` calls."""
+    def __init__(self, delay=GEMINI_STUB_DELAY, failures=0):
+        self.delay = delay; self.failures = failures; self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1; time.sleep(self.delay)
+        if self.calls <= self.failures: raise ConnectionError("stub failure")
+        move = prompt.split("Final Recommended Move:")[1].split("\n")[0].strip() if "Final Recommended Move:" in prompt else "?"
+        return SimpleNamespace(parts=[1], text=f"(stub #{self.calls}) {move} is the recommended move here.", prompt_feedback=SimpleNamespace(block_reason=None))
 
 class GeminiIntegration:
-    def __init__(self):
+    def __init__(self, model=None, cache=None):
+        # `model`: anything with generate_content(prompt), e.g. StubGeminiModel, used instead of the API
+        # `cache`: ExplanationCache for answers by situation (default: one built from config)
         self.initialized = False
+        self.cache = cache if cache is not None else ExplanationCache()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Gemini") # One request at a time, off the frame loop
+        self._latest = {} # channel -> (future, cancel event) of the newest request
+        if model is not None: self.model = model; self.initialized = True; return
+        if genai is None: print("google-generativeai not installed; Gemini disabled."); return
         if not GEMINI_API_KEY: print("Gemini API Key not configured."); return
         try:
             genai.configure(api_key=GEMINI_API_KEY)
@@ -16,30 +46,71 @@ class GeminiIntegration:
             self.initialized = True; print(f"Gemini initialized successfully with model {GEMINI_MODEL_NAME}.")
         except Exception as e: print(f"Error initializing Gemini: {e}")
 
-    def _generate(self, prompt):
+    def _generate(self, prompt, cancelled=None, cache_key=None):
+        """Blocking call with retries. `cancelled` (threading.Event) aborts between attempts; returns None then. Successful answers are cached under `cache_key`."""
         if not self.initialized: return "Gemini not initialized."
         retries = 2; delay = 1
         for i in range(retries + 1):
+            if cancelled is not None and cancelled.is_set(): return None
             try:
                 response = self.model.generate_content(prompt)
                 if response.parts:
                     if response.prompt_feedback.block_reason: return f"Gemini blocked: {response.prompt_feedback.block_reason}"
-                    return response.text.strip()
+                    text = response.text.strip(); self.cache.put(cache_key, text)
+                    return text
                 elif response.prompt_feedback.block_reason: return f"Gemini blocked: {response.prompt_feedback.block_reason}"
                 else: print("Warning: Gemini empty response."); return "Gemini returned empty."
             except Exception as e:
                 print(f"Error Gemini API (Try {i+1}): {e}")
-                if i < retries: time.sleep(delay); delay *= 2
+                if i < retries:
+                    if cancelled is None: time.sleep(delay)
+                    elif cancelled.wait(delay): return None # Superseded while backing off
+                    delay *= 2
                 else: return f"Error Gemini: {e}"
         return "Gemini failed after retries."
 
-    def explain_strategy_enhanced(self, player_hand_labels, dealer_up_card_label,
-                                  hi_lo_true_count, basic_strategy_move,
-                                  final_recommended_move, bust_probability,
-                                  player_total, dealer_up_card_value, # Use numeric dealer value for context
-                                  deck_composition_summary, override_reason):
-        """Asks Gemini to explain the recommended move, considering multiple factors."""
+    def explain_strategy_enhanced(self, *situation):
+        """Asks Gemini to explain the recommended move, considering multiple factors. Blocks until answered unless cached."""
+        cached = self.cached_explanation(*situation)
+        if cached is not None: return cached
         if not self.initialized: return "Gemini N/A"
+        return self._generate(self._strategy_prompt(*situation), cache_key=self._situation_key(*situation))
+
+    def cached_explanation(self, *situation):
+        """Stored answer for an equivalent situation (same hand class, upcard, count bucket, moves and reason), or None."""
+        return self.cache.get(self._situation_key(*situation))
+
+    @staticmethod
+    def _situation_key(player_hand_labels, dealer_up_card_label, hi_lo_true_count, basic_strategy_move, final_recommended_move,
+                       bust_probability, player_total, dealer_up_card_value, deck_composition_summary, override_reason):
+        return situation_key(player_hand_labels, dealer_up_card_label, hi_lo_true_count, basic_strategy_move, final_recommended_move, override_reason)
+
+    def explain_strategy_enhanced_async(self, *situation, channel=None):
+        """
+        Non-blocking explain_strategy_enhanced: returns a Future of the answer text. Only the
+        newest request per `channel` counts: an older one still queued is cancelled, and one
+        already running stops at its next retry and resolves to None.
+        """
+        self.cancel_pending(channel)
+        cancelled = threading.Event()
+        future = self._executor.submit(self._generate, self._strategy_prompt(*situation), cancelled, self._situation_key(*situation))
+        self._latest[channel] = (future, cancelled)
+        return future
+
+    def cancel_pending(self, channel=None):
+        previous = self._latest.pop(channel, None)
+        if previous: previous[1].set(); previous[0].cancel()
+
+    def close(self):
+        for channel in list(self._latest): self.cancel_pending(channel)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.cache.close()
+
+    def _strategy_prompt(self, player_hand_labels, dealer_up_card_label,
+                         hi_lo_true_count, basic_strategy_move,
+                         final_recommended_move, bust_probability,
+                         player_total, dealer_up_card_value, # Use numeric dealer value for context
+                         deck_composition_summary, override_reason):
 
         player_hand_str = format_hand(player_hand_labels)
         dealer_card_str = dealer_up_card_label if dealer_up_card_label else "N/A"
@@ -65,6 +136,6 @@ class GeminiIntegration:
         3. Briefly incorporate the deck composition summary or True Count context into the explanation where relevant (e.g., "...standing is safer, especially given the {deck_composition_summary.lower()}" or "...hitting is correct by basic strategy, and the neutral count doesn't suggest deviating.").
         4. Keep the tone advisory and informative.
         """
-        return self._generate(prompt)
+        return prompt
 
 # --- END OF FILE gemini_integration.py ---
\ No newline at end of file
@@ -0,0 +1,132 @@
+# --- START OF FILE hud_renderer.py ---
+from collections import OrderedDict
+from functools import lru_cache
+import cv2
+import numpy as np
+from config import HUD_FONT, HUD_SCALE, HUD_THICKNESS, HUD_TEXT_CACHE_SIZE
+from utils import wrap_text
+
+@lru_cache(maxsize=HUD_TEXT_CACHE_SIZE)
+def text_size(text):
+    """cv2.getTextSize for the HUD font, memoized: ((width, height), baseline)."""
+    return cv2.getTextSize(text, HUD_FONT, HUD_SCALE, HUD_THICKNESS)
+
+@lru_cache(maxsize=64)
+def wrapped_lines(text, width):
+    """utils.wrap_text, memoized, so an unchanged explanation is not re-wrapped every frame."""
+    return tuple(wrap_text(text, width=width))
+
+class HudRenderer:
+    """
+    Layered HUD compositor. Panels are full-width translucent black bands given as
+    (y0, y1, alpha); text items are (text, (x, baseline y), BGR colour) and must lie on a panel.
+
+    - Static layer (panels + static text) is rendered once per resolution/content.
+    - Each text string is rasterized once into an anti-aliased coverage mask (LRU cache).
+    - The composed layer is kept as premultiplied colour + inverse alpha (uint8); when text
+      changes only the rectangles it covered are redrawn. Every frame then costs one
+      multiply-add over the panel rows, however much text is shown.
+    """
+    PAD = 2  # Pixels around each raster for anti-aliasing
+
+    def __init__(self, cache_size=HUD_TEXT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.rasters = OrderedDict()  # text -> (coverage float32 (h, w, 1), height above baseline)
+        self.static_key = None; self.static_color = None; self.static_alpha = None  # Panels + static text (float32)
+        self.bands = []; self.layer_width = 0  # (frame y0, y1, layer row offset) per run of panel rows
+        self.color_layer = None; self.alpha_layer = None  # Static + current text, premultiplied colour and alpha (float32)
+        self.layer_key = None; self.layer_premult = None; self.layer_inverse = None  # uint8 blend inputs
+        self.rebuilds = 0
+
+    def _raster(self, text):
+        raster = self.rasters.get(text)
+        if raster is not None: self.rasters.move_to_end(text); return raster
+        (width, height), baseline = text_size(text); pad = self.PAD
+        canvas = np.zeros((height + baseline + 2 * pad, width + 2 * pad), dtype=np.uint8)
+        cv2.putText(canvas, text, (pad, height + pad), HUD_FONT, HUD_SCALE, 255, HUD_THICKNESS, cv2.LINE_AA)
+        raster = self.rasters[text] = ((canvas.astype(np.float32) / 255.0)[:, :, None], height + pad)
+        while len(self.rasters) > self.cache_size: self.rasters.popitem(last=False)
+        return raster
+
+    def _placement(self, text, position):
+        """Where a text raster lands in the layer: (band index, r0, r1, c0, c1, coverage) clipped to its band, or None."""
+        if not text: return None
+        for index, (y0, y1, offset) in enumerate(self.bands):
+            if y0 <= position[1] < y1: break
+        else: return None
+        coverage, ascent = self._raster(text); h, w = coverage.shape[:2]
+        row = offset + position[1] - ascent - y0; x = position[0] - self.PAD
+        r0 = max(row, offset); r1 = min(row + h, offset + y1 - y0)
+        c0 = max(x, 0); c1 = min(x + w, self.layer_width)
+        if r1 <= r0 or c1 <= c0: return None
+        return index, r0, r1, c0, c1, coverage[r0 - row:r1 - row, c0 - x:c1 - x]
+
+    def _composite(self, placement, color, clip):
+        """Draws a placed raster 'over' the float layer (premultiplied colour + alpha) inside the clip rect."""
+        _, r0, r1, c0, c1, coverage = placement
+        cr0 = max(r0, clip[0]); cr1 = min(r1, clip[1]); cc0 = max(c0, clip[2]); cc1 = min(c1, clip[3])
+        if cr1 <= cr0 or cc1 <= cc0: return
+        cov = coverage[cr0 - r0:cr1 - r0, cc0 - c0:cc1 - c0]; region = (slice(cr0, cr1), slice(cc0, cc1))
+        self.color_layer[region] = cov * np.asarray(color, dtype=np.float32) + self.color_layer[region] * (1.0 - cov)
+        self.alpha_layer[region] = cov + self.alpha_layer[region] * (1.0 - cov)
+
+    def render(self, frame, panels, static_text, text):
+        """Blends the HUD onto `frame` in place and returns it."""
+        height, width = frame.shape[:2]
+        static_key = (height, width, tuple(panels), tuple(static_text))
+        if static_key != self.static_key: self._build_static(frame.shape, panels, static_text, static_key)
+        layer_key = tuple(text)
+        if layer_key != self.layer_key: self._update_layer(layer_key)
+        # out = frame * (1 - alpha) + premultiplied colour, in place on each band of full-width rows
+        for y0, y1, offset in self.bands:
+            rows = slice(offset, offset + y1 - y0); target = frame[y0:y1]
+            cv2.multiply(target, self.layer_inverse[rows], dst=target, scale=1.0 / 255)
+            cv2.add(target, self.layer_premult[rows], dst=target)
+        return frame
+
+    def _build_static(self, shape, panels, static_text, static_key):
+        height, width = shape[:2]; self.layer_width = width
+        row_alpha = np.zeros(height, dtype=np.float32)
+        for y0, y1, alpha in panels: row_alpha[max(y0, 0):min(y1, height)] = alpha
+        # Contiguous runs of panel rows become bands, stacked in the layer arrays
+        self.bands = []; offset = 0; y = 0
+        while y < height:
+            if row_alpha[y] <= 0: y += 1; continue
+            y0 = y
+            while y < height and row_alpha[y] > 0: y += 1
+            self.bands.append((y0, y, offset)); offset += y - y0
+        rows = np.concatenate([row_alpha[y0:y1] for y0, y1, _ in self.bands]) if self.bands else np.zeros(0, np.float32)
+        self.alpha_layer = np.repeat(rows[:, None, None], width, axis=1)
+        self.color_layer = np.zeros((len(rows), width, 3), dtype=np.float32)  # Black panels: premultiplied colour is 0
+        everything = (0, len(rows), 0, width)
+        for text, position, color in static_text:
+            placement = self._placement(text, position)
+            if placement: self._composite(placement, color, everything)
+        self.static_color = self.color_layer.copy(); self.static_alpha = self.alpha_layer.copy()
+        self.layer_premult = np.empty((len(rows), width, 3), dtype=np.uint8); self.layer_inverse = np.empty_like(self.layer_premult)
+        self._convert(everything)
+        self.static_key = static_key; self.layer_key = ()
+
+    def _update_layer(self, items):
+        """Redraws only the rectangles covered by text that appeared or disappeared since the last frame (one per band)."""
+        dirty = {}
+        for text, position, _ in set(self.layer_key) ^ set(items):
+            placement = self._placement(text, position)
+            if placement is None: continue
+            index, r0, r1, c0, c1, _ = placement; rect = dirty.get(index)
+            dirty[index] = (r0, r1, c0, c1) if rect is None else (min(rect[0], r0), max(rect[1], r1), min(rect[2], c0), max(rect[3], c1))
+        placements = [(self._placement(text, position), color) for text, position, color in items]
+        for index, clip in dirty.items():
+            region = (slice(clip[0], clip[1]), slice(clip[2], clip[3]))
+            self.color_layer[region] = self.static_color[region]; self.alpha_layer[region] = self.static_alpha[region]
+            for placement, color in placements:
+                if placement and placement[0] == index: self._composite(placement, color, clip)
+            self._convert(clip)
+        self.layer_key = items; self.rebuilds += 1
+
+    def _convert(self, clip):
+        region = (slice(clip[0], clip[1]), slice(clip[2], clip[3]))
+        self.layer_premult[region] = np.rint(self.color_layer[region])
+        self.layer_inverse[region] = np.rint((1.0 - self.alpha_layer[region]) * 255.0)  # Broadcast to 3 channels: cv2 wants matching shapes
+
+# --- END OF FILE hud_renderer.py ---
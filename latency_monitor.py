@@ -0,0 +1,96 @@
+# --- START OF FILE latency_monitor.py ---
+import json
+import time
+import numpy as np
+from config import (LATENCY_MONITOR_ENABLED, LATENCY_RING_SIZE, LATENCY_EXPORT_PATH,
+                    LATENCY_EXPORT_INTERVAL, LATENCY_FRAME_BUDGET_MS, HUD_COLOR_NEUTRAL, HUD_COLOR_BAD)
+from utils import draw_hud_element
+
+class _Ring:
+    """Fixed-size ring buffer of float samples (milliseconds)."""
+    def __init__(self, size):
+        self.samples = np.zeros(size, dtype=np.float64)
+        self.index = 0; self.count = 0
+
+    def add(self, value):
+        self.samples[self.index] = value
+        self.index = (self.index + 1) % len(self.samples)
+        if self.count < len(self.samples): self.count += 1
+
+    def values(self):
+        return self.samples[:self.count] if self.count < len(self.samples) else self.samples
+
+class LatencyMonitor:
+    """
+    Lap timer for the main loop. Call begin_frame() at the top of each iteration and
+    lap('stage') after each stage; the time since the previous lap is recorded in that
+    stage's ring buffer. Every method returns immediately when disabled.
+    """
+    def __init__(self, enabled=LATENCY_MONITOR_ENABLED, ring_size=LATENCY_RING_SIZE,
+                 export_path=LATENCY_EXPORT_PATH, export_interval=LATENCY_EXPORT_INTERVAL):
+        self.enabled = enabled
+        self.ring_size = ring_size
+        self.export_path = export_path; self.export_interval = export_interval
+        self.rings = {}  # Insertion order = stage order in the loop
+        self.frame_ring = _Ring(ring_size)
+        self._frame_start = None; self._last = None
+        self._last_export = time.time()
+
+    def begin_frame(self):
+        if not self.enabled: return
+        now = time.perf_counter()
+        if self._frame_start is not None: self.frame_ring.add((now - self._frame_start) * 1000.0)
+        self._frame_start = now; self._last = now
+
+    def lap(self, stage):
+        if not self.enabled or self._last is None: return
+        now = time.perf_counter()
+        ring = self.rings.get(stage)
+        if ring is None: ring = self.rings[stage] = _Ring(self.ring_size)
+        ring.add((now - self._last) * 1000.0)
+        self._last = now
+
+    def record(self, stage, ms):
+        """Adds a sample timed outside the lap sequence (e.g. on a worker thread)."""
+        if not self.enabled: return
+        ring = self.rings.get(stage)
+        if ring is None: ring = self.rings[stage] = _Ring(self.ring_size)
+        ring.add(ms)
+
+    def fps(self):
+        frame_ms = self.frame_ring.values()
+        return 1000.0 / frame_ms.mean() if len(frame_ms) else 0.0
+
+    def snapshot(self):
+        """Current FPS and p50/p99/mean/max per stage in milliseconds."""
+        stages = {}
+        for stage, ring in list(self.rings.items()):  # Worker threads may add stages concurrently
+            values = ring.values()
+            if not len(values): continue
+            p50, p99 = np.percentile(values, (50, 99))
+            stages[stage] = {'p50': round(float(p50), 3), 'p99': round(float(p99), 3), 'mean': round(float(values.mean()), 3), 'max': round(float(values.max()), 3), 'n': int(len(values))}
+        frame_ms = self.frame_ring.values()
+        frame = {'p50': round(float(np.percentile(frame_ms, 50)), 3), 'p99': round(float(np.percentile(frame_ms, 99)), 3)} if len(frame_ms) else {}
+        return {'time': time.time(), 'fps': round(self.fps(), 2), 'frame_ms': frame, 'stages': stages}
+
+    def maybe_export(self):
+        """Appends a snapshot to the JSON-lines export file every `export_interval` seconds."""
+        if not self.enabled or not self.export_path or self.export_interval <= 0: return
+        now = time.time()
+        if now - self._last_export < self.export_interval: return
+        self._last_export = now
+        try:
+            with open(self.export_path, 'a') as f: f.write(json.dumps(self.snapshot()) + "\n")
+        except OSError as e:
+            print(f"Latency export failed ({self.export_path}): {e}"); self.export_path = None
+
+    def draw_overlay(self, frame, x, y, frame_budget_ms=LATENCY_FRAME_BUDGET_MS):
+        """Draws FPS and p50/p99 per stage; stages whose p99 exceeds the frame budget are shown in red."""
+        if not self.enabled: return
+        snap = self.snapshot()
+        draw_hud_element(frame, f"FPS: {snap['fps']:.1f}  Frame p50/p99: {snap['frame_ms'].get('p50', 0):.1f}/{snap['frame_ms'].get('p99', 0):.1f} ms", (x, y), HUD_COLOR_NEUTRAL)
+        for i, (stage, stats) in enumerate(snap['stages'].items(), 1):
+            color = HUD_COLOR_BAD if stats['p99'] > frame_budget_ms else HUD_COLOR_NEUTRAL
+            draw_hud_element(frame, f"{stage:<9} {stats['p50']:6.1f} / {stats['p99']:6.1f} ms", (x, y + i * 18), color)
+
+# --- END OF FILE latency_monitor.py ---
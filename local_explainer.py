@@ -0,0 +1,50 @@
+# --- START OF FILE local_explainer.py ---
+from utils import format_hand
+
+MOVE_NAMES = {'H': 'hit', 'S': 'stand', 'D': 'double down', 'P': 'split', 'Bust': 'bust', 'Err': 'error', 'N/A': 'N/A'}
+
+def _reason_sentence(override_reason, final_desc, true_count):
+    """Why the final move differs from basic strategy, phrased from the override reason string."""
+    if override_reason.startswith("EV"):
+        return f"An exact expected-value calculation on the remaining cards makes {final_desc} the stronger play ({override_reason})."
+    if override_reason.startswith("High Bust%"):
+        return f"The chance of busting on the next card is too high ({override_reason}), so the play is to {final_desc}."
+    if override_reason.startswith("Take Insurance"):
+        return f"Also take insurance: at a true count of {true_count:+.1f} enough tens remain to make it profitable."
+    return f"The count changes the play to {final_desc}: {override_reason}."
+
+def _count_sentence(true_count, composition_summary):
+    if true_count >= 2: context = "The shoe is rich in tens and aces, which favors the player."
+    elif true_count <= -1: context = "Mostly small cards remain, so the dealer busts less often."
+    else: context = "The count is close to neutral, so there is no reason to deviate."
+    return f"{context} ({composition_summary.strip()} TC {true_count:+.1f}.)"
+
+class LocalExplainer:
+    """
+    Instant, offline stand-in for GeminiIntegration.explain_strategy_enhanced: builds the same
+    2-4 sentence advice from the analysis inputs with string templates, no network.
+    """
+    initialized = True
+
+    def explain_strategy_enhanced(self, player_hand_labels, dealer_up_card_label,
+                                  hi_lo_true_count, basic_strategy_move,
+                                  final_recommended_move, bust_probability,
+                                  player_total, dealer_up_card_value,
+                                  deck_composition_summary, override_reason):
+        if final_recommended_move == 'Bust': return f"{format_hand(player_hand_labels)} is {player_total}: the hand is bust."
+        if final_recommended_move in ('N/A', 'Err'): return "No recommendation for this hand."
+        basic_desc = MOVE_NAMES.get(basic_strategy_move, basic_strategy_move)
+        final_desc = MOVE_NAMES.get(final_recommended_move, final_recommended_move)
+        dealer_desc = "ace" if dealer_up_card_value == 11 else dealer_up_card_value
+        sentences = [f"Basic strategy with {player_total} against a dealer {dealer_desc} is to {basic_desc}."]
+        if override_reason: sentences.append(_reason_sentence(override_reason, final_desc, hi_lo_true_count))
+        if final_recommended_move != basic_strategy_move and (not override_reason or override_reason.startswith("Take Insurance")):
+            sentences.append(f"The recommended play here is to {final_desc}.")
+        if final_recommended_move in ('H', 'D') and bust_probability > 0:
+            sentences.append(f"Taking a card busts {bust_probability:.0%} of the time, which is still better than standing on {player_total}.")
+        elif final_recommended_move == 'S' and player_total >= 12 and dealer_up_card_value <= 6:
+            sentences.append(f"With the dealer showing a weak {dealer_desc}, let the dealer take the bust risk.")
+        sentences.append(_count_sentence(hi_lo_true_count, deck_composition_summary))
+        return " ".join(sentences[:4])
+
+# --- END OF FILE local_explainer.py ---
@@ -1,32 +1,55 @@
 # --- START OF FILE main.py ---
 import cv2
 import time
+import numpy as np
 from collections import deque
 from config import *
-from card_detector import CardDetector
+from card_detector import CardDetector, draw_boxes
+from capture_pipeline import CapturePipeline
+from frame_gate import SceneChangeGate
 from blackjack_logic import BlackjackLogic
-from gemini_integration import GeminiIntegration
-from utils import draw_hud_element, format_hand, wrap_text
+from gemini_integration import GeminiIntegration, StubGeminiModel, is_error_response
+from local_explainer import LocalExplainer
+from latency_monitor import LatencyMonitor
+from session_recorder import SessionRecorder
+from speculation import Speculator
+from hud_renderer import HudRenderer, wrapped_lines
+from utils import format_hand
 
 BUST_PROBABILITY_THRESHOLD = 0.50
 
 class CasinoAI:
     # --- Indent Level 0 ---
-    def __init__(self):
+    def __init__(self, camera_index=CAMERA_INDEX, card_detector=None, gemini_integration=None, window_name=WINDOW_NAME, open_camera=True):
         # --- Indent Level 1 ---
+        # open_camera=False builds only the table state; the caller supplies frames to step() (multi-table mode)
         print("Initializing AI...")
-        cam_idx = CAMERA_INDEX; num_decks = NUM_DECKS
-        self.card_detector = CardDetector()
+        cam_idx = camera_index; num_decks = NUM_DECKS
+        detector_in_process = open_camera and USE_THREADED_PIPELINE and USE_DETECTION_PROCESS
+        self.card_detector = card_detector or (None if detector_in_process else CardDetector()) # Process mode loads the model in the child only
         self.blackjack_logic = BlackjackLogic(num_decks=num_decks)
-        self.gemini_integration = GeminiIntegration()
-        self.cap = cv2.VideoCapture(cam_idx)
-        if not self.cap.isOpened():
+        self.gemini_integration = gemini_integration or GeminiIntegration(StubGeminiModel() if GEMINI_STUB else None)
+        self.latency = LatencyMonitor()
+        self.window_name = window_name; self.camera_index = camera_index
+        self.scene_gate = SceneChangeGate() if USE_SCENE_GATE else None
+        self.cap = None; self.pipeline = None; self.last_result_seq = 0; self.last_frame_seq = 0
+        if not open_camera:
              # --- Indent Level 2 ---
-             raise IOError(f"Cannot open webcam index {cam_idx}")
-
-        self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        print(f"Webcam {cam_idx} opened ({self.frame_width}x{self.frame_height}).")
+             self.frame_width = 0; self.frame_height = 0 # Taken from each frame passed to step()
+        elif USE_THREADED_PIPELINE:
+             # --- Indent Level 2 --- # Capture + detection threads; run() only renders and reads keys
+             self.pipeline = CapturePipeline(self.card_detector, cam_idx, self.latency, self.scene_gate)
+             self.frame_width = self.pipeline.frame_width; self.frame_height = self.pipeline.frame_height
+        else:
+             # --- Indent Level 2 ---
+             self.cap = cv2.VideoCapture(cam_idx)
+             if not self.cap.isOpened():
+                  # --- Indent Level 3 ---
+                  raise IOError(f"Cannot open webcam index {cam_idx}")
+             self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+             self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if open_camera: print(f"Webcam {cam_idx} opened ({self.frame_width}x{self.frame_height}).")
+        self.recorder = SessionRecorder(SESSION_RECORD_DIR) if SESSION_RECORD_DIR and open_camera else None
 
         # State Variables
         self.all_player_hands = []
@@ -35,67 +58,68 @@ class CasinoAI:
         self.game_phase = "START"
         self.status_message = "Press 'R' Reset. Then 'P' per Player Hand, 'D' for Dealer."
         self.latest_detected_cards = {'player': [], 'dealer': []}
+        self.latest_overlay = [] # Boxes to draw on the next render (card_detector.split_boxes)
+        self.capture_buffer = None; self.render_buffer = None # Reused full-resolution frames, no per-frame allocation
         self.last_gemini_response = ""
         self.last_gemini_query_time = 0
         self.gemini_cooldown = 5
-        self.last_analysis_state = { "player_index": 0, "recommended_move": "N/A", "bet_recommendation": 1, "bust_probability": 0.0, "override_reason": ""}
+        self.gemini_future = None; self.gemini_query_start = 0.0 # Background explanation request (see collect_gemini_response)
+        self.local_explainer = LocalExplainer(); self.explanation_source = "Gemini" # HUD label of last_gemini_response
+        self.speculator = Speculator(self) # Precomputes likely next analyses while idle
+        self.last_analysis_state = { "player_index": 0, "recommended_move": "N/A", "bet_recommendation": 1, "bust_probability": 0.0, "override_reason": "", "action_evs": {}}
         self.action_history = deque(maxlen=10)
         self.dealer_hole_card_history = deque(maxlen=MAX_HOLE_CARD_HISTORY)
         self.dealer_anomaly_warning = ""
+        self.show_latency_overlay = LATENCY_OVERLAY
+        self.hud_renderer = HudRenderer() # Cached HUD layers and text rasters
 
     def display_hud(self, frame, current_hud_state):
         # --- Indent Level 1 ---
-        """Draws the Heads-Up Display with game information."""
+        """Draws the Heads-Up Display with game information (composited by HudRenderer; text drawn only when it changes)."""
         # Backgrounds
-        hud_bg_height = 260; status_bar_height = 30; gemini_area_height = 80
-        cv2.rectangle(frame, (0, 0), (self.frame_width, hud_bg_height), (0, 0, 0, 0.7), cv2.FILLED)
-        cv2.rectangle(frame, (0, self.frame_height - gemini_area_height - status_bar_height), (self.frame_width, self.frame_height - status_bar_height), (0, 0, 0, 0.7), cv2.FILLED)
-        cv2.rectangle(frame, (0, self.frame_height - status_bar_height), (self.frame_width, self.frame_height), (0, 0, 0, 0.9), cv2.FILLED)
+        hud_bg_height = 285; status_bar_height = 30; gemini_area_height = 80
+        panels = ((0, hud_bg_height, HUD_PANEL_ALPHA),
+                  (self.frame_height - gemini_area_height - status_bar_height, self.frame_height - status_bar_height, HUD_PANEL_ALPHA),
+                  (self.frame_height - status_bar_height, self.frame_height, HUD_STATUS_ALPHA))
+        text = [] # (text, position, color) in draw order
 
         # Counts, Bet Units, Remaining A/T Vis...
         # --- Indent Level 2 ---
-        draw_hud_element(frame, f"HiLo RC: {self.blackjack_logic.hi_lo_running_count}", (10, 25), HUD_COLOR_NEUTRAL)
-        draw_hud_element(frame, f"HiLo TC: {self.blackjack_logic.get_hi_lo_true_count():.2f}", (10, 50), HUD_COLOR_NEUTRAL)
-        draw_hud_element(frame, f"Cards Seen: {self.blackjack_logic.cards_seen_count}", (10, 75), HUD_COLOR_NEUTRAL)
-        draw_hud_element(frame, f"Bet Units: {current_hud_state.get('bet_recommendation', 1)}", (10, 100), HUD_COLOR_NEUTRAL)
-        rem_aces = 0; rem_tens = 0;
-        if self.blackjack_logic.num_decks == 1:
-            # --- Indent Level 3 --- # Around Line 57
-            for card_key, count in self.blackjack_logic.remaining_cards.items():
-                # --- Indent Level 4 ---
-                if count > 0:
-                    # --- Indent Level 5 ---
-                    rank = self.blackjack_logic._get_rank_from_key_or_label(card_key) # Use helper
-                    if rank == 'A': rem_aces += 1
-                    elif rank in ['T','J','Q','K']: rem_tens += 1
-        else:
-            # --- Indent Level 3 ---
-            rem_aces = self.blackjack_logic.remaining_cards.get('A', 0) # Assumes rank keys for multi-deck
-            rem_tens = sum(self.blackjack_logic.remaining_cards.get(r, 0) for r in ['T','J','Q','K'])
-        # --- Indent Level 2 ---
-        total_rem = self.blackjack_logic.total_cards_in_shoe - self.blackjack_logic.cards_seen_count; ace_pct = (rem_aces / total_rem * 100) if total_rem > 0 else 0; ten_pct = (rem_tens / total_rem * 100) if total_rem > 0 else 0
-        draw_hud_element(frame, f"Rem A/T Ranks: {rem_aces}/{rem_tens} ({ace_pct:.0f}%/{ten_pct:.0f}%)", (10, 125), HUD_COLOR_NEUTRAL)
+        text.append((f"HiLo RC: {self.blackjack_logic.hi_lo_running_count}", (10, 25), HUD_COLOR_NEUTRAL))
+        text.append((f"HiLo TC: {self.blackjack_logic.get_hi_lo_true_count():.2f}", (10, 50), HUD_COLOR_NEUTRAL))
+        text.append((f"Cards Seen: {self.blackjack_logic.cards_seen_count}", (10, 75), HUD_COLOR_NEUTRAL))
+        text.append((f"Bet Units: {current_hud_state.get('bet_recommendation', 1)}", (10, 100), HUD_COLOR_NEUTRAL))
+        shoe = self.blackjack_logic.shoe
+        rem_aces = shoe.aces_remaining; rem_tens = shoe.tens_remaining; total_rem = shoe.cards_remaining
+        ace_pct = (rem_aces / total_rem * 100) if total_rem > 0 else 0; ten_pct = (rem_tens / total_rem * 100) if total_rem > 0 else 0
+        text.append((f"Rem A/T: {rem_aces}/{rem_tens} ({ace_pct:.0f}%/{ten_pct:.0f}%)", (10, 125), HUD_COLOR_NEUTRAL))
 
         # Hands Display
         player_hand_str = format_hand(current_hud_state['player_hand'])
         dealer_display_hand = self.dealer_hand if len(self.dealer_hand) > 1 else ([current_hud_state['dealer_card']] if current_hud_state['dealer_card'] else [])
         dealer_hand_str = format_hand(dealer_display_hand)
         dealer_val_str = f"Val: {self.blackjack_logic.get_hand_value(dealer_display_hand)}" if dealer_display_hand else ""
-        draw_hud_element(frame, f"P1: {player_hand_str} (Val: {current_hud_state['player_total']})", (10, 155), HUD_COLOR_GOOD)
-        draw_hud_element(frame, f"D: {dealer_hand_str} ({dealer_val_str})", (10, 180), HUD_COLOR_BAD)
+        text.append((f"P1: {player_hand_str} (Val: {current_hud_state['player_total']})", (10, 155), HUD_COLOR_GOOD))
+        text.append((f"D: {dealer_hand_str} ({dealer_val_str})", (10, 180), HUD_COLOR_BAD))
 
         # Strategy Recommendation & Bust Probability
         move = current_hud_state.get('recommended_move', 'N/A'); bust_prob = current_hud_state.get('bust_probability', 0.0); override_reason = current_hud_state.get('override_reason', "")
         move_text = f"P1 Move: {move} ({ {'H': 'Hit', 'S': 'Stand', 'D': 'Double', 'P': 'Split', 'Err': 'Error', 'N/A': 'N/A', 'Bust': 'Bust'}.get(move, move) })"
         if override_reason: move_text += f" ({override_reason})"
-        draw_hud_element(frame, move_text, (10, 215), HUD_COLOR_TEXT)
-        if current_hud_state.get('player_total', 0) < 21: draw_hud_element(frame, f"Bust on Hit: {bust_prob:.1%}", (10, 240), HUD_COLOR_NEUTRAL)
-
-        # Instructions
+        text.append((move_text, (10, 215), HUD_COLOR_TEXT))
+        if current_hud_state.get('player_total', 0) < 21: text.append((f"Bust on Hit: {bust_prob:.1%}", (10, 240), HUD_COLOR_NEUTRAL))
+        action_evs = current_hud_state.get('action_evs', {})
+        if action_evs:
+            # --- Indent Level 3 --- # Best move first, alternatives show how much EV they give up
+            ranked = sorted(action_evs.items(), key=lambda item: item[1], reverse=True); best_ev = ranked[0][1]
+            ev_text = " | ".join(f"{m} {ev:+.3f}" + (f" ({ev - best_ev:+.3f})" if i else "") for i, (m, ev) in enumerate(ranked))
+            text.append((f"EV: {ev_text}", (10, 265), HUD_COLOR_NEUTRAL))
+
+        # Instructions (static layer, rendered once per resolution)
         inst_x = self.frame_width - 350
-        draw_hud_element(frame, "'P': Player | 'D': Dealer | 'H': P1 Hit", (inst_x, 25), HUD_COLOR_TEXT)
-        draw_hud_element(frame, "'A': Analyze P1 | 'F': Final Dealer Hand", (inst_x, 50), HUD_COLOR_TEXT)
-        draw_hud_element(frame, "'U': Undo Last | 'R': Reset | 'Q': Quit", (inst_x, 75), HUD_COLOR_TEXT)
+        static_text = (("'P': Player | 'D': Dealer | 'H': P1 Hit", (inst_x, 25), HUD_COLOR_TEXT),
+                       ("'A': Analyze P1 | 'F': Final Dealer Hand", (inst_x, 50), HUD_COLOR_TEXT),
+                       ("'U': Undo | 'R': Reset | 'L': Perf | 'Q': Quit", (inst_x, 75), HUD_COLOR_TEXT))
 
         # Hole Card History & Anomaly Display
         hole_hist_str = "Hole Cards (Last {}): ".format(len(self.dealer_hole_card_history)); tens_aces_count = 0
@@ -107,29 +131,36 @@ class CasinoAI:
              if hole_rank in ['T','J','Q','K','A']: tens_aces_count += 1
         # --- Indent Level 2 ---
         if self.dealer_hole_card_history: hole_hist_str += f" [{tens_aces_count} T/A]"
-        draw_hud_element(frame, hole_hist_str, (inst_x, 100), HUD_COLOR_NEUTRAL)
+        text.append((hole_hist_str, (inst_x, 100), HUD_COLOR_NEUTRAL))
         # Display Dealer Anomaly Warning
         dealer_anomaly_msg = current_hud_state.get("dealer_anomaly", "") # Safely get value
         if dealer_anomaly_msg:
              # --- Indent Level 3 --- # Around Line 123 / 125
-             draw_hud_element(frame, f"DEALER ALERT: {dealer_anomaly_msg}", (inst_x, 125), HUD_COLOR_BAD) # Ensure this line is indented under the 'if'
+             text.append((f"DEALER ALERT: {dealer_anomaly_msg}", (inst_x, 125), HUD_COLOR_BAD)) # Ensure this line is indented under the 'if'
+        # Live dealer outcome odds for the current upcard and shoe
+        dealer_outcomes = current_hud_state.get("dealer_outcomes")
+        if dealer_outcomes:
+             # --- Indent Level 3 ---
+             text.append((f"Live D Bust: {dealer_outcomes['Bust']:.1%} | BJ: {dealer_outcomes['BJ']:.1%}", (inst_x, 150), HUD_COLOR_NEUTRAL))
 
         # Gemini Response Area
         # --- Indent Level 2 ---
         if self.last_gemini_response:
-            # --- Indent Level 3 ---
-            response_lines = wrap_text(f"Gemini: {self.last_gemini_response}", width=int(self.frame_width / (HUD_SCALE * 10))-5)
+            # --- Indent Level 3 --- # Wrapping is memoized, so an unchanged response costs nothing per frame
+            response_lines = wrapped_lines(f"{self.explanation_source}: {self.last_gemini_response}", int(self.frame_width / (HUD_SCALE * 10))-5)
             y_start = self.frame_height - status_bar_height - gemini_area_height + 15; max_lines = 3
             for i, line in enumerate(response_lines[:max_lines]):
                  # --- Indent Level 4 ---
                  line_y = y_start + i * 18
                  if line_y < self.frame_height - status_bar_height - 5:
                       # --- Indent Level 5 ---
-                      draw_hud_element(frame, line, (10, line_y), HUD_COLOR_NEUTRAL)
+                      text.append((line, (10, line_y), HUD_COLOR_NEUTRAL))
 
         # Status Bar
         # --- Indent Level 2 ---
-        draw_hud_element(frame, current_hud_state.get("status_message", ""), (10, self.frame_height - 10), HUD_COLOR_TEXT)
+        text.append((current_hud_state.get("status_message", ""), (10, self.frame_height - 10), HUD_COLOR_TEXT))
+        self.hud_renderer.render(frame, panels, static_text, text)
+        if self.show_latency_overlay: self.latency.draw_overlay(frame, inst_x, hud_bg_height + 20)
         return frame
 
     def undo_last_action(self):
@@ -204,327 +235,450 @@ class CasinoAI:
             self.status_message = f"Undo failed for action '{last_action_type}'."
 
 
-    def run(self):
+    def detect_frame(self, frame, current_time=None):
         # --- Indent Level 1 ---
-        """Main application loop with key-triggered state changes."""
-        print("Starting AI Assistant..."); print(self.status_message)
-        while True:
-            # --- Indent Level 2 ---
-            ret, frame = self.cap.read()
-            if not ret:
-                print("Error: Failed capture..."); time.sleep(0.5); self.cap.release(); self.cap = cv2.VideoCapture(CAMERA_INDEX)
-                if not self.cap.isOpened(): print("Failed reopen. Exiting."); break
-                else: print("Reopened camera."); continue
-
-            # 1. Continuous Detection
-            try:
-                 detected_cards_dict, annotated_frame = self.card_detector.detect(frame); self.latest_detected_cards = detected_cards_dict
-            except Exception as e:
-                 print(f"Error card detection: {e}"); annotated_frame = frame; self.latest_detected_cards = {'player': [], 'dealer': []}
-
-            # 2. Handle User Input Keys
-            key = cv2.waitKey(1) & 0xFF; current_time = time.time(); analysis_requested = False; override_reason = ""
-            self.dealer_anomaly_warning = "" # Reset anomaly warning
-
-            # --- State Update Keys ---
-            if key == ord('r'): # Reset
+        """Single-threaded detection (scene gate + CardDetector). Updates latest_detected_cards and latest_overlay; returns (frame, new_frame)."""
+        try:
+             if self.scene_gate: (detected_cards_dict, overlay), new_frame = self.scene_gate.process(frame, self.card_detector.detect_overlay, current_time)
+             else: detected_cards_dict, overlay = self.card_detector.detect_overlay(frame); new_frame = True
+             self.latest_detected_cards = detected_cards_dict; self.latest_overlay = overlay
+        except Exception as e:
+             print(f"Error card detection: {e}"); new_frame = True; self.latest_detected_cards = {'player': [], 'dealer': []}; self.latest_overlay = []
+        return frame, new_frame
+
+    def analyze_hand(self, player_hand, dealer_up_card, verbose=True, logic=None):
+        # --- Indent Level 1 ---
+        """
+        Basic strategy, index plays, EV engine and bust check for a hand against the current shoe.
+        Returns a dict of the results, or None if the upcard has no valid rank. Reads only the shoe
+        and count (of `logic`, default the live one), so the speculator can run it on a snapshot.
+        """
+        logic = logic or self.blackjack_logic
+        player_total = logic.get_hand_value(player_hand)
+        dealer_up_rank = logic._get_rank_from_key_or_label(dealer_up_card)
+        if dealer_up_rank is None: return None
+        dealer_up_value = logic._get_card_value_numeric(dealer_up_rank)
+        final_move = "N/A"; basic_move = "N/A"; bust_probability = 0.0; override_reason = ""; action_evs = {}
+        hi_lo_tc = logic.get_hi_lo_true_count()
+
+        if player_total <= 21:
+            # --- Indent Level 2 --- # Basic + index move in one compiled-table lookup
+            basic_move, final_move, index_reason = logic.get_strategy_decision(player_hand, dealer_up_card, hi_lo_tc)
+
+            # Check Insurance
+            if dealer_up_rank == 'A':
+                 # --- Indent Level 3 ---
+                 if logic.should_take_insurance(hi_lo_tc):
+                      override_reason = f"Take Insurance (TC {hi_lo_tc:+.1f})"
+                      if verbose: print(f"Index: Insurance")
+
+            # Index play already applied by the compiled table
+            if index_reason:
                 # --- Indent Level 3 ---
-                self.all_player_hands = []; self.current_player_input_index = 0; self.dealer_hand = []
-                self.blackjack_logic.reset_shoe(); self.last_gemini_response = ""
-                self.last_analysis_state = {"player_index": 0, "recommended_move": "N/A", "bet_recommendation": 1, "bust_probability": 0.0, "override_reason": ""}
-                self.game_phase = "START"; self.status_message = "Reset. 'P' for P1 Hand..., 'D' for Dealer."
-                self.action_history.clear(); # Keep hole card history across resets
-                print("\n--- Game Reset ---")
-
-            elif key == ord('p') and self.game_phase in ["START", "PLAYER_INPUT"]: # Player Hand
+                if not override_reason: override_reason = index_reason
+                if verbose: print(f"Override: BS='{basic_move}', Index='{final_move}' at TC {hi_lo_tc:+.1f}")
+
+            # Composition-dependent EV of every legal move from the exact remaining shoe
+            if USE_EV_ENGINE:
                 # --- Indent Level 3 ---
-                player_labels_detected = self.latest_detected_cards.get('player', [])
-                if player_labels_detected:
-                    # --- Indent Level 4 ---
-                    player_index_display = self.current_player_input_index + 1
-                    while len(self.all_player_hands) <= self.current_player_input_index: self.all_player_hands.append([])
-                    new_hand_labels = sorted([lbl.upper() for lbl in player_labels_detected])
-
-                    valid_new_hand = True; cards_to_remove = []
-                    for card_label in new_hand_labels:
-                         # --- Indent Level 5 ---
-                         card_key = self.blackjack_logic._get_internal_card_key(card_label)
-                         if card_key is None or self.blackjack_logic.remaining_cards.get(card_key, 0) <= 0:
-                              # --- Indent Level 6 ---
-                              self.status_message = f"Error: Card {card_label} invalid/removed!"; print(f"Error: Card {card_label} detected but invalid/removed."); valid_new_hand = False; break
-                         cards_to_remove.append(card_label) # Use original label for removal function
+                ev_move, action_evs = logic.get_action_evs(player_hand, dealer_up_card)
+                if ev_move and ev_move in action_evs and ev_move != final_move:
+                     # --- Indent Level 4 ---
+                     ev_reason = f"EV +{action_evs[ev_move] - action_evs[final_move]:.3f}" if final_move in action_evs else "EV (table move not legal)"
+                     if verbose: print(f"Override: Table='{final_move}', EV='{ev_move}' ({ev_reason})")
+                     final_move = ev_move
+                     if not override_reason or not override_reason.startswith("Take Insurance"): override_reason = ev_reason
 
-                    # --- Indent Level 4 ---
-                    if valid_new_hand and self.all_player_hands[self.current_player_input_index] != new_hand_labels:
-                        # --- Indent Level 5 ---
-                        print(f"Processing P{player_index_display}: {new_hand_labels}")
-                        for card_label in cards_to_remove: self.blackjack_logic.remove_card_from_shoe(card_label)
-                        self.action_history.append(('P', {'index': self.current_player_input_index, 'hand': list(new_hand_labels)}))
-                        self.all_player_hands[self.current_player_input_index] = new_hand_labels
-                        self.current_player_input_index += 1; self.game_phase = "PLAYER_INPUT"
-                        self.status_message = f"P{player_index_display} set. 'P' for next or 'D'."
-                        print(f"P{player_index_display} captured: {new_hand_labels}")
-                    elif self.all_player_hands[self.current_player_input_index] == new_hand_labels:
-                         # --- Indent Level 5 ---
-                         self.status_message = f"P{player_index_display} unchanged. 'P' or 'D'."
-                    # If not valid, status message already set
-                else:
+            # Check Bust Probability if still Hitting
+            if final_move == 'H':
+                # --- Indent Level 3 ---
+                bust_probability = logic.calculate_bust_probability(player_hand)
+                if verbose: print(f"Bust Prob on Hit: {bust_probability:.3f}")
+                if not USE_EV_ENGINE and bust_probability > BUST_PROBABILITY_THRESHOLD:
                      # --- Indent Level 4 ---
-                     self.status_message = f"No cards for P{self.current_player_input_index + 1}. Aim & 'P'."
+                     final_move = 'S'; override_reason = f"High Bust% ({bust_probability:.1%})"
+                     if verbose: print(f"Override: Move to 'S', bust > {BUST_PROBABILITY_THRESHOLD:.1%}")
+        else: # Player busted
+             # --- Indent Level 2 ---
+             final_move = 'Bust'; basic_move = 'Bust'; bust_probability = 1.0
 
-            elif key == ord('d') and self.game_phase in ["START", "PLAYER_INPUT"]: # Dealer Up Card
-                 # --- Indent Level 3 ---
-                 dealer_labels_detected = self.latest_detected_cards.get('dealer', [])
-                 if dealer_labels_detected:
-                      # --- Indent Level 4 ---
-                      up_card_label = dealer_labels_detected[0] # Use detected label
-                      up_card_key = self.blackjack_logic._get_internal_card_key(up_card_label) # Get key for check
-
-                      if up_card_key is None or self.blackjack_logic.remaining_cards.get(up_card_key, 0) <= 0:
-                           # --- Indent Level 5 ---
-                           self.status_message = f"Error: {up_card_label} invalid/removed!"; print(f"Error: {up_card_label} removed.")
-                      elif not self.dealer_hand:
-                           # --- Indent Level 5 ---
-                           up_card_to_store = up_card_label.upper() # Store consistently
-                           self.dealer_hand = [up_card_to_store]; self.blackjack_logic.remove_card_from_shoe(up_card_to_store); self.action_history.append(('D', up_card_to_store))
-                           self.game_phase = "DEALER_INPUT"; self.status_message = f"Dealer: {up_card_to_store}. Press 'A' for P1."
-                           print(f"Dealer upcard: {up_card_to_store}")
-                      else:
-                           # --- Indent Level 5 ---
-                           self.status_message = f"Dealer already has {self.dealer_hand[0]}. Press 'A'."
-                 else:
-                      # --- Indent Level 4 ---
-                      self.status_message = "No dealer card detected. Aim & 'D'."
-
-            elif key == ord('h') and self.game_phase == "DEALER_INPUT": # Player 1 Hit
-                 # --- Indent Level 3 ---
-                 player_index_hitting = 0
-                 if player_index_hitting < len(self.all_player_hands):
-                      # --- Indent Level 4 ---
-                      player_labels_detected = self.latest_detected_cards.get('player', [])
-                      if player_labels_detected:
-                           # --- Indent Level 5 ---
-                           hit_card_label = player_labels_detected[0] # Use detected label
-                           hit_card_key = self.blackjack_logic._get_internal_card_key(hit_card_label)
-
-                           if hit_card_key is None or self.blackjack_logic.remaining_cards.get(hit_card_key, 0) <= 0:
-                                # --- Indent Level 6 ---
-                                self.status_message = f"Error: Hit {hit_card_label} invalid/removed!"; print(f"Error: Hit {hit_card_label} removed.")
-                           else:
-                                # --- Indent Level 6 ---
-                                hit_card_to_store = hit_card_label.upper() # Store consistently
-                                self.all_player_hands[player_index_hitting].append(hit_card_to_store); self.blackjack_logic.remove_card_from_shoe(hit_card_to_store)
-                                self.action_history.append(('H', {'index': player_index_hitting, 'card': hit_card_to_store}))
-                                self.status_message = f"P1 Hit: {hit_card_to_store}. Hand: {format_hand(self.all_player_hands[player_index_hitting])}. Press 'A'."
-                                print(f"P{player_index_hitting+1} hit: {hit_card_to_store}")
-                      else:
-                           # --- Indent Level 5 ---
-                           self.status_message = "No card detected for Hit ('H'). Aim clearly."
-                 else:
-                      # --- Indent Level 4 ---
-                      self.status_message = "No P1 hand to hit. Use 'P'."
-
-            elif key == ord('f') and self.game_phase == "DEALER_INPUT" and len(self.dealer_hand) == 1: # Final Dealer Hand
-                 # --- Indent Level 3 ---
-                 print("--- 'F' Pressed: Simulating Dealer Turn ---")
-                 up_card_label = self.dealer_hand[0] # Already stored uppercase
-                 dealer_labels_detected = self.latest_detected_cards.get('dealer', [])
-                 if len(dealer_labels_detected) >= 2:
-                      # --- Indent Level 4 ---
-                      hole_card_label_detected = None
-                      for lbl in dealer_labels_detected:
-                           # --- Indent Level 5 ---
-                           if lbl.upper() != up_card_label: # Find one that isn't the upcard
-                                hole_card_label_detected = lbl; break
-                      # --- Indent Level 4 ---
-                      if hole_card_label_detected:
-                           # --- Indent Level 5 ---
-                           hole_card_to_store = hole_card_label_detected.upper() # Store consistently
-                           hole_card_key = self.blackjack_logic._get_internal_card_key(hole_card_to_store)
-
-                           if hole_card_key is None or self.blackjack_logic.remaining_cards.get(hole_card_key, 0) <= 0:
-                                # --- Indent Level 6 ---
-                                self.status_message = f"Error: Hole {hole_card_label_detected} invalid/removed!"; print(f"Error: Hole {hole_card_label_detected} removed.")
-                           else:
-                                # --- Indent Level 6 ---
-                                print(f"Hole card detected: {hole_card_to_store}. Simulating...")
-                                self.blackjack_logic.remove_card_from_shoe(hole_card_to_store) # Remove detected hole card
-                                initial_dealer_hand = [up_card_label, hole_card_to_store] # Start sim with labels
-                                final_dealer_hand_sim, final_outcome = self.blackjack_logic.simulate_dealer_turn(initial_dealer_hand)
-                                self.dealer_hand = final_dealer_hand_sim # Update state
-                                print(f"Dealer sim finished. Final: {self.dealer_hand}, Outcome: {final_outcome}")
-                                self.dealer_hole_card_history.append((up_card_label, hole_card_to_store))
-                                self.action_history.append(('F', {'up_card': up_card_label, 'hole_card': hole_card_to_store, 'final_hand': list(final_dealer_hand_sim)}))
-                                dealer_up_rank_for_hist = self.blackjack_logic._get_rank_from_key_or_label(up_card_label)
-                                self.blackjack_logic.record_dealer_outcome(dealer_up_rank_for_hist, final_outcome)
-                                dealer_final_total_display = final_outcome if isinstance(final_outcome, str) else self.blackjack_logic.get_hand_value(self.dealer_hand)
-                                self.status_message = f"Dealer Final (Sim): {format_hand(self.dealer_hand)} ({dealer_final_total_display}). Press 'R'."
-                                self.game_phase = "ROUND_OVER"
-                      else:
-                           # --- Indent Level 5 ---
-                           self.status_message = "Could not find distinct hole card. Aim & 'F'."
-                 else:
-                      # --- Indent Level 4 ---
-                      self.status_message = "Need both dealer cards clearly visible. Aim & 'F'."
-
-            elif key == ord('u'): # Undo
-                 # --- Indent Level 3 ---
-                 self.undo_last_action()
-                 self.last_analysis_state = {"player_index": 0, "recommended_move": "N/A", "bet_recommendation": 1, "bust_probability": 0.0, "override_reason": ""}
-                 self.last_gemini_response = ""
+        # Betting
+        # --- Indent Level 1 ---
+        shoe = logic.shoe
+        return {"basic_move": basic_move, "final_move": final_move, "override_reason": override_reason, "bust_probability": bust_probability,
+                "action_evs": action_evs, "bet_recommendation": logic.get_bet_recommendation(), "true_count": hi_lo_tc,
+                "player_total": player_total, "dealer_up_value": dealer_up_value,
+                "composition_summary": f"Rem Cards: {shoe.cards_remaining}. Rem Aces/Tens: {shoe.aces_remaining}/{shoe.tens_remaining}."}
 
-            elif key == ord('a') and self.game_phase == "DEALER_INPUT": # Analyze P1
+    def collect_gemini_response(self):
+        # --- Indent Level 1 ---
+        """Picks up a finished background Gemini request. Returns True if the response text changed."""
+        future = self.gemini_future
+        if future is None or not future.done(): return False
+        self.gemini_future = None
+        if future.cancelled(): return False
+        try: response = future.result()
+        except Exception as e: response = f"Error Gemini: {e}"
+        if response is None: return False # Superseded by a newer request
+        if is_error_response(response) and self.explanation_source != "Gemini":
+            print(f"Gemini failed ({response}); keeping local explanation."); self.explanation_source = "Local"; return True
+        self.last_gemini_response = response; self.explanation_source = "Gemini"; print(f"Gemini Response: {response}")
+        self.latency.record('gemini_rtt', (time.perf_counter() - self.gemini_query_start) * 1000.0)
+        return True
+
+    def cancel_gemini_request(self):
+        if self.gemini_future is None: return
+        self.gemini_integration.cancel_pending(self.window_name); self.gemini_future = None
+
+    def step(self, frame, new_frame, key, current_time):
+        # --- Indent Level 1 ---
+        """
+        One loop iteration after detection: applies the key, runs a requested analysis and
+        draws latest_overlay and the HUD. `frame` is not modified. Returns (final frame, or None
+        when nothing changed and the window can keep its last image; quit requested). The final
+        frame is a buffer reused by the next call: show or copy it before stepping again.
+        """
+        self.frame_height, self.frame_width = frame.shape[:2]
+        analysis_requested = False; override_reason = ""
+        self.dealer_anomaly_warning = "" # Reset anomaly warning
+
+        # --- State Update Keys ---
+        if key == ord('r'): # Reset
+            # --- Indent Level 2 ---
+            self.all_player_hands = []; self.current_player_input_index = 0; self.dealer_hand = []
+            self.blackjack_logic.reset_shoe(); self.last_gemini_response = ""; self.cancel_gemini_request()
+            self.last_analysis_state = {"player_index": 0, "recommended_move": "N/A", "bet_recommendation": 1, "bust_probability": 0.0, "override_reason": "", "action_evs": {}}
+            self.game_phase = "START"; self.status_message = "Reset. 'P' for P1 Hand..., 'D' for Dealer."
+            self.action_history.clear(); # Keep hole card history across resets
+            print("\n--- Game Reset ---")
+
+        elif key == ord('p') and self.game_phase in ["START", "PLAYER_INPUT"]: # Player Hand
+            # --- Indent Level 2 ---
+            player_labels_detected = self.latest_detected_cards.get('player', [])
+            if player_labels_detected:
                 # --- Indent Level 3 ---
-                player_index_to_analyze = 0
-                if player_index_to_analyze >= len(self.all_player_hands) or not self.dealer_hand:
-                    # --- Indent Level 4 ---
-                    self.status_message = "Need P1 Hand ('P') & Dealer Card ('D') before analyzing ('A')."
-                else:
+                player_index_display = self.current_player_input_index + 1
+                while len(self.all_player_hands) <= self.current_player_input_index: self.all_player_hands.append([])
+                new_hand_labels = sorted([lbl.upper() for lbl in player_labels_detected])
+
+                valid_new_hand = True; cards_to_remove = []
+                for card_label in new_hand_labels:
+                     # --- Indent Level 4 ---
+                     card_key = self.blackjack_logic._get_internal_card_key(card_label)
+                     if card_key is None or self.blackjack_logic.shoe.count(card_key) <= 0:
+                          # --- Indent Level 5 ---
+                          self.status_message = f"Error: Card {card_label} invalid/removed!"; print(f"Error: Card {card_label} detected but invalid/removed."); valid_new_hand = False; break
+                     cards_to_remove.append(card_label) # Use original label for removal function
+
+                # --- Indent Level 3 ---
+                if valid_new_hand and self.all_player_hands[self.current_player_input_index] != new_hand_labels:
                     # --- Indent Level 4 ---
-                    analysis_requested = True
-                    self.player_hand_to_analyze = self.all_player_hands[player_index_to_analyze]
-                    self.dealer_up_card_to_analyze = self.dealer_hand[0] # Label like 'AS'
-                    self.status_message = f"Analyzing P{player_index_to_analyze+1}... 'H' Hit, 'F' Final D, 'R' Reset."
-                    print(f"--- Analyzing P{player_index_to_analyze+1}: {self.player_hand_to_analyze} vs D: {self.dealer_up_card_to_analyze} ---")
-                    # Check dealer bust anomaly
-                    dealer_up_rank_for_analysis = self.blackjack_logic._get_rank_from_key_or_label(self.dealer_up_card_to_analyze)
-                    anomaly = self.blackjack_logic.check_dealer_bust_rate_anomaly(dealer_up_rank_for_analysis)
-                    self.dealer_anomaly_warning = anomaly if anomaly else ""
-                    if self.dealer_anomaly_warning: print(f"DEALER ANOMALY for upcard {dealer_up_rank_for_analysis}: {self.dealer_anomaly_warning}")
-
-
-            elif key == ord('q'):
+                    print(f"Processing P{player_index_display}: {new_hand_labels}")
+                    for card_label in cards_to_remove: self.blackjack_logic.remove_card_from_shoe(card_label)
+                    self.action_history.append(('P', {'index': self.current_player_input_index, 'hand': list(new_hand_labels)}))
+                    self.all_player_hands[self.current_player_input_index] = new_hand_labels
+                    self.current_player_input_index += 1; self.game_phase = "PLAYER_INPUT"
+                    self.status_message = f"P{player_index_display} set. 'P' for next or 'D'."
+                    print(f"P{player_index_display} captured: {new_hand_labels}")
+                elif self.all_player_hands[self.current_player_input_index] == new_hand_labels:
+                     # --- Indent Level 4 ---
+                     self.status_message = f"P{player_index_display} unchanged. 'P' or 'D'."
+                # If not valid, status message already set
+            else:
                  # --- Indent Level 3 ---
-                 break # Quit
+                 self.status_message = f"No cards for P{self.current_player_input_index + 1}. Aim & 'P'."
 
-            # 3. Perform Analysis (if requested)
+        elif key == ord('d') and self.game_phase in ["START", "PLAYER_INPUT"]: # Dealer Up Card
+             # --- Indent Level 2 ---
+             dealer_labels_detected = self.latest_detected_cards.get('dealer', [])
+             if dealer_labels_detected:
+                  # --- Indent Level 3 ---
+                  up_card_label = dealer_labels_detected[0] # Use detected label
+                  up_card_key = self.blackjack_logic._get_internal_card_key(up_card_label) # Get key for check
+
+                  if up_card_key is None or self.blackjack_logic.shoe.count(up_card_key) <= 0:
+                       # --- Indent Level 4 ---
+                       self.status_message = f"Error: {up_card_label} invalid/removed!"; print(f"Error: {up_card_label} removed.")
+                  elif not self.dealer_hand:
+                       # --- Indent Level 4 ---
+                       up_card_to_store = up_card_label.upper() # Store consistently
+                       self.dealer_hand = [up_card_to_store]; self.blackjack_logic.remove_card_from_shoe(up_card_to_store); self.action_history.append(('D', up_card_to_store))
+                       self.game_phase = "DEALER_INPUT"; self.status_message = f"Dealer: {up_card_to_store}. Press 'A' for P1."
+                       print(f"Dealer upcard: {up_card_to_store}")
+                  else:
+                       # --- Indent Level 4 ---
+                       self.status_message = f"Dealer already has {self.dealer_hand[0]}. Press 'A'."
+             else:
+                  # --- Indent Level 3 ---
+                  self.status_message = "No dealer card detected. Aim & 'D'."
+
+        elif key == ord('h') and self.game_phase == "DEALER_INPUT": # Player 1 Hit
+             # --- Indent Level 2 ---
+             player_index_hitting = 0
+             if player_index_hitting < len(self.all_player_hands):
+                  # --- Indent Level 3 ---
+                  player_labels_detected = self.latest_detected_cards.get('player', [])
+                  if player_labels_detected:
+                       # --- Indent Level 4 ---
+                       hit_card_label = player_labels_detected[0] # Use detected label
+                       hit_card_key = self.blackjack_logic._get_internal_card_key(hit_card_label)
+
+                       if hit_card_key is None or self.blackjack_logic.shoe.count(hit_card_key) <= 0:
+                            # --- Indent Level 5 ---
+                            self.status_message = f"Error: Hit {hit_card_label} invalid/removed!"; print(f"Error: Hit {hit_card_label} removed.")
+                       else:
+                            # --- Indent Level 5 ---
+                            hit_card_to_store = hit_card_label.upper() # Store consistently
+                            self.all_player_hands[player_index_hitting].append(hit_card_to_store); self.blackjack_logic.remove_card_from_shoe(hit_card_to_store)
+                            self.action_history.append(('H', {'index': player_index_hitting, 'card': hit_card_to_store}))
+                            self.status_message = f"P1 Hit: {hit_card_to_store}. Hand: {format_hand(self.all_player_hands[player_index_hitting])}. Press 'A'."
+                            print(f"P{player_index_hitting+1} hit: {hit_card_to_store}")
+                  else:
+                       # --- Indent Level 4 ---
+                       self.status_message = "No card detected for Hit ('H'). Aim clearly."
+             else:
+                  # --- Indent Level 3 ---
+                  self.status_message = "No P1 hand to hit. Use 'P'."
+
+        elif key == ord('f') and self.game_phase == "DEALER_INPUT" and len(self.dealer_hand) == 1: # Final Dealer Hand
+             # --- Indent Level 2 ---
+             print("--- 'F' Pressed: Simulating Dealer Turn ---")
+             up_card_label = self.dealer_hand[0] # Already stored uppercase
+             dealer_labels_detected = self.latest_detected_cards.get('dealer', [])
+             if len(dealer_labels_detected) >= 2:
+                  # --- Indent Level 3 ---
+                  hole_card_label_detected = None
+                  for lbl in dealer_labels_detected:
+                       # --- Indent Level 4 ---
+                       if lbl.upper() != up_card_label: # Find one that isn't the upcard
+                            hole_card_label_detected = lbl; break
+                  # --- Indent Level 3 ---
+                  if hole_card_label_detected:
+                       # --- Indent Level 4 ---
+                       hole_card_to_store = hole_card_label_detected.upper() # Store consistently
+                       hole_card_key = self.blackjack_logic._get_internal_card_key(hole_card_to_store)
+
+                       if hole_card_key is None or self.blackjack_logic.shoe.count(hole_card_key) <= 0:
+                            # --- Indent Level 5 ---
+                            self.status_message = f"Error: Hole {hole_card_label_detected} invalid/removed!"; print(f"Error: Hole {hole_card_label_detected} removed.")
+                       else:
+                            # --- Indent Level 5 ---
+                            print(f"Hole card detected: {hole_card_to_store}. Simulating...")
+                            self.blackjack_logic.remove_card_from_shoe(hole_card_to_store) # Remove detected hole card
+                            initial_dealer_hand = [up_card_label, hole_card_to_store] # Start sim with labels
+                            speculated = self.speculator.take_dealer(up_card_label, hole_card_to_store) # Simulated while idle on this exact shoe
+                            final_dealer_hand_sim, final_outcome = speculated or self.blackjack_logic.simulate_dealer_turn(initial_dealer_hand)
+                            self.dealer_hand = final_dealer_hand_sim # Update state
+                            print(f"Dealer sim finished. Final: {self.dealer_hand}, Outcome: {final_outcome}")
+                            self.dealer_hole_card_history.append((up_card_label, hole_card_to_store))
+                            self.action_history.append(('F', {'up_card': up_card_label, 'hole_card': hole_card_to_store, 'final_hand': list(final_dealer_hand_sim)}))
+                            dealer_up_rank_for_hist = self.blackjack_logic._get_rank_from_key_or_label(up_card_label)
+                            self.blackjack_logic.record_dealer_outcome(dealer_up_rank_for_hist, final_outcome)
+                            dealer_final_total_display = final_outcome if isinstance(final_outcome, str) else self.blackjack_logic.get_hand_value(self.dealer_hand)
+                            self.status_message = f"Dealer Final (Sim): {format_hand(self.dealer_hand)} ({dealer_final_total_display}). Press 'R'."
+                            self.game_phase = "ROUND_OVER"
+                  else:
+                       # --- Indent Level 4 ---
+                       self.status_message = "Could not find distinct hole card. Aim & 'F'."
+             else:
+                  # --- Indent Level 3 ---
+                  self.status_message = "Need both dealer cards clearly visible. Aim & 'F'."
+
+        elif key == ord('u'): # Undo
+             # --- Indent Level 2 ---
+             self.undo_last_action()
+             self.last_analysis_state = {"player_index": 0, "recommended_move": "N/A", "bet_recommendation": 1, "bust_probability": 0.0, "override_reason": "", "action_evs": {}}
+             self.last_gemini_response = ""; self.cancel_gemini_request()
+
+        elif key == ord('a') and self.game_phase == "DEALER_INPUT": # Analyze P1
             # --- Indent Level 2 ---
-            if analysis_requested:
+            player_index_to_analyze = 0
+            if player_index_to_analyze >= len(self.all_player_hands) or not self.dealer_hand:
                 # --- Indent Level 3 ---
-                player_total = self.blackjack_logic.get_hand_value(self.player_hand_to_analyze)
-                dealer_up_rank = self.blackjack_logic._get_rank_from_key_or_label(self.dealer_up_card_to_analyze)
-                # Handle case where dealer rank might be None if label was bad
-                if dealer_up_rank is None:
-                     print("Error: Cannot analyze, invalid dealer upcard rank.")
-                     self.status_message = "Error: Invalid dealer upcard for analysis."
-                     analysis_requested = False # Prevent further processing this cycle
-                     # Maybe revert game phase?
-                     # self.game_phase = "PLAYER_INPUT" # Allow re-entering dealer card?
-                else:
-                    dealer_up_value = self.blackjack_logic._get_card_value_numeric(dealer_up_rank)
-                    final_move = "N/A"; basic_move = "N/A"; bust_probability = 0.0; override_reason = ""
+                self.status_message = "Need P1 Hand ('P') & Dealer Card ('D') before analyzing ('A')."
+            else:
+                # --- Indent Level 3 ---
+                analysis_requested = True
+                self.player_hand_to_analyze = self.all_player_hands[player_index_to_analyze]
+                self.dealer_up_card_to_analyze = self.dealer_hand[0] # Label like 'AS'
+                self.status_message = f"Analyzing P{player_index_to_analyze+1}... 'H' Hit, 'F' Final D, 'R' Reset."
+                print(f"--- Analyzing P{player_index_to_analyze+1}: {self.player_hand_to_analyze} vs D: {self.dealer_up_card_to_analyze} ---")
+                # Check dealer bust anomaly
+                dealer_up_rank_for_analysis = self.blackjack_logic._get_rank_from_key_or_label(self.dealer_up_card_to_analyze)
+                anomaly = self.blackjack_logic.check_dealer_bust_rate_anomaly(dealer_up_rank_for_analysis)
+                self.dealer_anomaly_warning = anomaly if anomaly else ""
+                if self.dealer_anomaly_warning: print(f"DEALER ANOMALY for upcard {dealer_up_rank_for_analysis}: {self.dealer_anomaly_warning}")
+
+
+        elif key == ord('l'): # Toggle latency overlay
+             # --- Indent Level 2 ---
+             self.show_latency_overlay = not self.show_latency_overlay
 
-                    if player_total <= 21:
-                        # --- Indent Level 4 ---
-                        basic_move = self.blackjack_logic.get_basic_strategy_move(self.player_hand_to_analyze, self.dealer_up_card_to_analyze); final_move = basic_move
-                        hi_lo_tc = self.blackjack_logic.get_hi_lo_true_count()
-
-                        # Check Insurance
-                        if dealer_up_rank == 'A':
-                             # --- Indent Level 5 ---
-                             ins_key = ('Ins', 11);
-                             if ins_key in INDEX_PLAYS:
-                                  # --- Indent Level 6 ---
-                                  rule = INDEX_PLAYS[ins_key]; threshold = rule['Threshold'];
-                                  if rule['Type'] == 'ge' and hi_lo_tc >= threshold: override_reason = f"Take Insurance (TC {hi_lo_tc:+.1f})"; print(f"Index: Insurance")
-
-                        # Check other Index Plays
-                        player_ranks = [self.blackjack_logic._get_rank_from_key_or_label(lbl) for lbl in self.player_hand_to_analyze if self.blackjack_logic._get_rank_from_key_or_label(lbl) is not None]
-                        is_pair_local = len(player_ranks) == 2 and player_ranks[0] == player_ranks[1]
-                        player_key_for_index = tuple(sorted(player_ranks)) if is_pair_local else player_total
-                        index_lookup_key = (player_key_for_index, dealer_up_value) # Line 289 area
-
-                        if index_lookup_key in INDEX_PLAYS:
-                            # --- Indent Level 5 --- Line 295 area
-                            rule = INDEX_PLAYS[index_lookup_key]; threshold = rule['Threshold']; condition_met = (rule['Type'] == 'ge' and hi_lo_tc >= threshold) or (rule['Type'] == 'le' and hi_lo_tc <= threshold)
-                            if condition_met:
-                                # --- Indent Level 6 ---
-                                index_move = rule['Action'];
-                                if index_move != basic_move:
-                                     # --- Indent Level 7 ---
-                                     final_move = index_move;
-                                     if not override_reason or not override_reason.startswith("Take Insurance"): override_reason = f"Index (TC {hi_lo_tc:+.1f})"
-                                     print(f"Override: BS='{basic_move}', Index='{final_move}' at TC {hi_lo_tc:+.1f}")
-
-                        # Check Bust Probability if still Hitting
-                        if final_move == 'H':
-                            # --- Indent Level 5 ---
-                            bust_probability = self.blackjack_logic.calculate_bust_probability(self.player_hand_to_analyze); print(f"Bust Prob on Hit: {bust_probability:.3f}")
-                            if bust_probability > BUST_PROBABILITY_THRESHOLD:
-                                 # --- Indent Level 6 --- Line 314 area
-                                 final_move = 'S'; override_reason = f"High Bust% ({bust_probability:.1%})"; print(f"Override: Move to 'S', bust > {BUST_PROBABILITY_THRESHOLD:.1%}")
-                        else:
-                             # --- Indent Level 5 ---
-                             bust_probability = 0.0
-                    else: # Player busted
-                         # --- Indent Level 4 ---
-                         final_move = 'Bust'; basic_move = 'Bust'; bust_probability = 1.0
-
-                    # Betting
-                    # --- Indent Level 4 ---
-                    bet_recommendation = self.blackjack_logic.get_bet_recommendation()
-                    # Store results
-                    self.last_analysis_state = { "player_index": 0, "recommended_move": final_move, "bet_recommendation": bet_recommendation, "bust_probability": bust_probability, "override_reason": override_reason }
+        elif key == ord('q'):
+             # --- Indent Level 2 ---
+             return None, True # Quit
 
-                    # Query Gemini
-                    if self.gemini_integration.initialized and current_time - self.last_gemini_query_time > self.gemini_cooldown:
+        self.latency.lap('keys')
+
+        # 3. Perform Analysis (if requested)
+        # --- Indent Level 1 ---
+        if analysis_requested:
+            # --- Indent Level 2 --- # Precomputed by the speculator while idle if this hand/shoe was foreseen
+            analysis = self.speculator.take(self.player_hand_to_analyze, self.dealer_up_card_to_analyze)
+            if analysis is None: analysis = self.analyze_hand(self.player_hand_to_analyze, self.dealer_up_card_to_analyze)
+            else: print("Analysis: precomputed by speculation.")
+            # Handle case where dealer rank might be None if label was bad
+            if analysis is None:
+                 print("Error: Cannot analyze, invalid dealer upcard rank.")
+                 self.status_message = "Error: Invalid dealer upcard for analysis."
+                 analysis_requested = False # Prevent further processing this cycle
+                 # Maybe revert game phase?
+                 # self.game_phase = "PLAYER_INPUT" # Allow re-entering dealer card?
+            else:
+                final_move = analysis['final_move']; bust_probability = analysis['bust_probability']; override_reason = analysis['override_reason']
+                # Store results
+                self.last_analysis_state = { "player_index": 0, "recommended_move": final_move, "bet_recommendation": analysis['bet_recommendation'], "bust_probability": bust_probability, "override_reason": override_reason, "action_evs": analysis['action_evs'] }
+
+                self.latency.lap('analysis')
+
+                # Explanation per EXPLANATION_MODE: local templates (instant), Gemini (cached or background), or local first then Gemini.
+                # An equivalent situation seen before is answered from the Gemini cache, cooldown or not.
+                situation = (self.player_hand_to_analyze, self.dealer_up_card_to_analyze, analysis['true_count'], analysis['basic_move'], final_move, bust_probability, analysis['player_total'], analysis['dealer_up_value'], analysis['composition_summary'], override_reason)
+                cached_response = None if EXPLANATION_MODE == 'local' else self.gemini_integration.cached_explanation(*situation)
+                can_query = EXPLANATION_MODE != 'local' and self.gemini_integration.initialized and current_time - self.last_gemini_query_time > self.gemini_cooldown
+                if cached_response is not None:
+                    # --- Indent Level 3 ---
+                    self.cancel_gemini_request(); self.last_gemini_response = cached_response; self.explanation_source = "Gemini"
+                    print(f"Gemini Response (cached): {cached_response}")
+                else:
+                    # --- Indent Level 3 --- # Local text: the answer in 'local' mode, shown first otherwise, and the fallback when Gemini can't be asked
+                    if EXPLANATION_MODE != 'gemini' or not can_query:
+                        if not can_query: self.cancel_gemini_request()
+                        self.last_gemini_response = self.local_explainer.explain_strategy_enhanced(*situation); self.explanation_source = "Local"
+                    if can_query:
                         # --- Indent Level 4 ---
                         print("Querying Gemini..."); self.last_gemini_query_time = current_time;
-                        total_remaining = self.blackjack_logic.total_cards_in_shoe - self.blackjack_logic.cards_seen_count; rem_aces_rank = 0; rem_tens_rank = 0
-                        if self.blackjack_logic.num_decks == 1:
-                             # --- Indent Level 5 ---
-                             for card_key, count in self.blackjack_logic.remaining_cards.items():
-                                  # --- Indent Level 6 ---
-                                  if count > 0:
-                                       # --- Indent Level 7 ---
-                                       rank = self.blackjack_logic._get_rank_from_key_or_label(card_key)
-                                       if rank == 'A': rem_aces_rank += 1;
-                                       elif rank in ['T','J','Q','K']: rem_tens_rank += 1
-                        else:
-                             # --- Indent Level 5 ---
-                             rem_aces_rank = self.blackjack_logic.remaining_cards.get('A', 0); rem_tens_rank = sum(self.blackjack_logic.remaining_cards.get(r, 0) for r in ['T','J','Q','K'])
-                        composition_summary = f"Rem Cards: {total_remaining}. Rem A/T Ranks: {rem_aces_rank}/{rem_tens_rank}."
-                        self.last_gemini_response = self.gemini_integration.explain_strategy_enhanced(self.player_hand_to_analyze, self.dealer_up_card_to_analyze, hi_lo_tc, basic_move, final_move, bust_probability, player_total, dealer_up_value, composition_summary, override_reason)
-                        print(f"Gemini Response: {self.last_gemini_response}")
-                    else:
-                         # --- Indent Level 4 ---
-                         self.last_gemini_response = "Gemini ready or cooldown."
-
-
-            # 4. Prepare State for HUD
+                        # Answered on the Gemini worker thread; replaces any older request still in flight
+                        self.gemini_future = self.gemini_integration.explain_strategy_enhanced_async(*situation, channel=self.window_name)
+                        self.gemini_query_start = time.perf_counter()
+                        if EXPLANATION_MODE == 'gemini': self.last_gemini_response = "(thinking...)"; self.explanation_source = "Gemini"
+                        else: self.explanation_source = "Local, Gemini pending"
+                self.latency.lap('explain')
+
+
+        # Nothing new to show (static scene, no key, no Gemini answer): keep the window as is and skip HUD work
+        # --- Indent Level 1 ---
+        gemini_arrived = self.collect_gemini_response()
+        # No operator input this step: spend a bounded slice precomputing the likely next analyses
+        if key == 255 and not analysis_requested and self.speculator.run(): self.latency.lap('speculate')
+        if not new_frame and key == 255 and not analysis_requested and not gemini_arrived: return None, False
+
+        # 4. Prepare State for HUD
+        # --- Indent Level 1 ---
+        player_hand_display = self.all_player_hands[0] if self.all_player_hands else []
+        dealer_card_display = self.dealer_hand[0] if self.dealer_hand else None
+        player_total_display = self.blackjack_logic.get_hand_value(player_hand_display)
+        # Display value of only upcard unless F has been pressed
+        dealer_total_display = self.blackjack_logic.get_hand_value(self.dealer_hand) if len(self.dealer_hand)>1 else self.blackjack_logic.get_hand_value([dealer_card_display]) if dealer_card_display else 0
+        # Exact outcome odds are memoized on shoe composition, so this is a cache hit on most frames
+        dealer_outcomes = self.blackjack_logic.get_dealer_outcome_probabilities([dealer_card_display]) if dealer_card_display and len(self.dealer_hand) == 1 else None
+
+        hud_state = {
+            "player_hand": player_hand_display, "dealer_card": dealer_card_display,
+            "player_total": player_total_display, "dealer_total": dealer_total_display,
+            "recommended_move": self.last_analysis_state["recommended_move"],
+            "bet_recommendation": self.last_analysis_state["bet_recommendation"],
+            "bust_probability": self.last_analysis_state["bust_probability"],
+            "override_reason": self.last_analysis_state["override_reason"],
+            "action_evs": self.last_analysis_state["action_evs"],
+            "status_message": self.status_message if not self.pipeline or self.pipeline.status == "OK" else self.pipeline.status,
+            "dealer_anomaly": self.dealer_anomaly_warning,
+            "dealer_outcomes": dealer_outcomes
+        }
+
+        # 5. Render
+        # --- Indent Level 2 --- # One copy into a persistent buffer (camera/cached frames are shared), boxes and HUD drawn on top
+        if self.render_buffer is None or self.render_buffer.shape != frame.shape: self.render_buffer = np.empty_like(frame)
+        np.copyto(self.render_buffer, frame); draw_boxes(self.render_buffer, self.latest_overlay)
+        final_frame = self.display_hud(self.render_buffer, hud_state)
+        self.latency.lap('hud')
+        return final_frame, False
+
+    def run(self):
+        # --- Indent Level 1 ---
+        """Main application loop with key-triggered state changes."""
+        print("Starting AI Assistant..."); print(self.status_message)
+        if self.pipeline: self.pipeline.start()
+        while True:
             # --- Indent Level 2 ---
-            player_hand_display = self.all_player_hands[0] if self.all_player_hands else []
-            dealer_card_display = self.dealer_hand[0] if self.dealer_hand else None
-            player_total_display = self.blackjack_logic.get_hand_value(player_hand_display)
-            # Display value of only upcard unless F has been pressed
-            dealer_total_display = self.blackjack_logic.get_hand_value(self.dealer_hand) if len(self.dealer_hand)>1 else self.blackjack_logic.get_hand_value([dealer_card_display]) if dealer_card_display else 0
-
-            hud_state = {
-                "player_hand": player_hand_display, "dealer_card": dealer_card_display,
-                "player_total": player_total_display, "dealer_total": dealer_total_display,
-                "recommended_move": self.last_analysis_state["recommended_move"],
-                "bet_recommendation": self.last_analysis_state["bet_recommendation"],
-                "bust_probability": self.last_analysis_state["bust_probability"],
-                "override_reason": self.last_analysis_state["override_reason"],
-                "status_message": self.status_message,
-                "dealer_anomaly": self.dealer_anomaly_warning
-            }
-
-            # 5. Display Frame
-            final_frame = self.display_hud(annotated_frame, hud_state)
-            cv2.imshow('Blackjack AI Assistant', final_frame)
+            self.latency.begin_frame()
+            if self.pipeline:
+                # --- Indent Level 3 --- # Paced by the camera: newest picture with the newest detections, however far behind detection is
+                if self.pipeline.failed: print("Failed reopen. Exiting."); break
+                previous_frame_seq = self.last_frame_seq; previous_seq = self.last_result_seq
+                self.last_frame_seq, frame = self.pipeline.wait_for_frame(previous_frame_seq, RENDER_POLL_INTERVAL)
+                if frame is None: frame = self.pipeline.latest_frame() # Nothing new within the poll interval: repaint the last picture
+                self.last_result_seq, result = self.pipeline.wait_for_result(previous_seq, 0)
+                if result is not None:
+                    # --- Indent Level 4 --- # The result frame itself is only kept for the recorder; step() copies the camera frame before drawing
+                    _, result_frame, self.latest_detected_cards, self.latest_overlay = result
+                    if self.recorder and self.last_result_seq != previous_seq: self.recorder.record_frame(result_frame, time.time())
+                if frame is None:
+                    # --- Indent Level 4 --- # No camera picture yet
+                    if cv2.waitKey(10) & 0xFF == ord('q'): break
+                    continue
+                new_frame = self.last_frame_seq != previous_frame_seq or self.last_result_seq != previous_seq or self.pipeline.status != "OK"
+                self.latency.lap('capture')
+            else:
+                # --- Indent Level 3 ---
+                ret, frame = self.cap.read(self.capture_buffer) # Decoded into the previous frame's memory when the size matches
+                if ret: self.capture_buffer = frame
+                if not ret:
+                    print("Error: Failed capture..."); time.sleep(0.5); self.cap.release(); self.cap = cv2.VideoCapture(self.camera_index)
+                    if not self.cap.isOpened(): print("Failed reopen. Exiting."); break
+                    else: print("Reopened camera."); continue
+
+                if self.recorder: self.recorder.record_frame(frame, time.time())
+                self.latency.lap('capture')
+
+                # 1. Continuous Detection
+                frame, new_frame = self.detect_frame(frame)
+                self.latency.lap('detect')
+
+            # 2. Handle User Input Keys, analysis and HUD
+            key = cv2.waitKey(1) & 0xFF; current_time = time.time()
+            if self.recorder and key != 255: self.recorder.record_key(key, current_time)
+            self.latency.lap('input')
+            final_frame, quit_requested = self.step(frame, new_frame, key, current_time)
+            if quit_requested: break
+
+            # 3. Display Frame
+            if final_frame is not None:
+                cv2.imshow(self.window_name, final_frame)
+                self.latency.lap('display')
+            self.latency.maybe_export()
 
         # Cleanup (Outside While loop)
         # --- Indent Level 1 ---
-        self.cap.release(); cv2.destroyAllWindows(); print("Application terminated.")
+        if self.pipeline: self.pipeline.stop()
+        else: self.cap.release()
+        if self.recorder: self.recorder.close()
+        self.speculator.close(); self.gemini_integration.close()
+        cv2.destroyAllWindows(); print("Application terminated.")
 
 # --- Indent Level 0 --- # Around line 388
 if __name__ == "__main__":
     # --- Indent Level 1 ---
     try:
          # --- Indent Level 2 ---
-         ai_assistant = CasinoAI()
-         ai_assistant.run()
+         if len(MULTI_TABLE_CAMERAS) > 1:
+              # --- Indent Level 3 ---
+              from multi_table import MultiTableAI
+              MultiTableAI(MULTI_TABLE_CAMERAS).run()
+         else:
+              # --- Indent Level 3 ---
+              ai_assistant = CasinoAI()
+              ai_assistant.run()
     except Exception as e:
          # --- Indent Level 2 ---
          print(f"An error occurred: {e}")
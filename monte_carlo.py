@@ -0,0 +1,129 @@
+# --- START OF FILE monte_carlo.py ---
+import math
+import numpy as np
+from config import MONTE_CARLO_SEED
+from dealer_engine import CARD_VALUES, DEALER_OUTCOMES, TEN_INDEX, ACE_INDEX
+
+# Batch simulators: every row of an (N, 10) count matrix is an independent copy of the shoe
+# composition (same value layout as dealer_engine), so N hands are drawn without replacement
+# in lock-step with one vectorized draw per card position.
+_VALUES = np.array(CARD_VALUES, dtype=np.int16)
+_BJ_CODE = DEALER_OUTCOMES.index('BJ')
+_BUST_CODE = DEALER_OUTCOMES.index('Bust')
+
+def make_rng(seed=MONTE_CARLO_SEED):
+    """Seeded NumPy Generator (seed=None draws fresh OS entropy)."""
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+def _draw(counts, rows, rng, exclude=None):
+    """Draws one card for each listed row, removing it from that row's counts. Returns value indices (-1 if empty)."""
+    weights = counts[rows]
+    if exclude is not None: weights[:, exclude] = 0
+    cumulative = np.cumsum(weights, axis=1, dtype=np.int16)
+    remaining = cumulative[:, -1]
+    picks = (cumulative <= (rng.random(len(rows), dtype=np.float32) * remaining)[:, None]).sum(axis=1)
+    empty = remaining <= 0
+    picks[empty] = -1
+    live = ~empty
+    counts[rows[live], picks[live]] -= 1
+    return picks
+
+def _add_cards(totals, softs, picks):
+    """Vectorized (total, soft) update, counting an Ace as 11 while it fits. Empty draws (-1) add nothing."""
+    values = np.where(picks >= 0, _VALUES[picks], 0)
+    is_ace = values == 11
+    ace_fits = is_ace & (totals + 11 <= 21)
+    totals = totals + np.where(is_ace & ~ace_fits, 1, values)
+    softs = softs | ace_fits
+    over = (totals > 21) & softs
+    return np.where(over, totals - 10, totals), softs & ~over
+
+def _play_dealer(counts, totals, softs, rows, rng):
+    """Dealer hits every listed row until 17+ (stands on soft 17). Updates totals/softs in place."""
+    active = rows[totals[rows] < 17]
+    while active.size:
+        picks = _draw(counts, active, rng)
+        live = picks >= 0
+        active = active[live]
+        totals[active], softs[active] = _add_cards(totals[active], softs[active], picks[live])
+        active = active[totals[active] < 17]
+
+def _dealer_codes(totals, blackjack):
+    codes = np.where(totals > 21, _BUST_CODE, np.clip(totals, 17, 21) - 17)
+    codes[blackjack] = _BJ_CODE
+    return codes
+
+def _wilson_interval(successes, n, z=1.96):
+    if n == 0: return (0.0, 0.0)
+    p = successes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return (max(0.0, centre - half), min(1.0, centre + half))
+
+def simulate_dealer_batch(up_value, composition, n_hands, seed=MONTE_CARLO_SEED, peek=False):
+    """
+    Plays `n_hands` independent dealer hands (S17) for an upcard from the given composition.
+    Returns {'n', 'counts', 'probabilities', 'ci95'} keyed by DEALER_OUTCOMES; with peek=True the
+    hole card is drawn conditioned on no dealer blackjack, matching the EV engine.
+    """
+    if sum(composition) <= 0: raise ValueError("Cannot simulate from an empty shoe.")
+    rng = make_rng(seed)
+    counts = np.tile(np.asarray(composition, dtype=np.int16), (n_hands, 1))
+    rows = np.arange(n_hands)
+    totals = np.full(n_hands, up_value, dtype=np.int16)
+    softs = np.full(n_hands, up_value == 11)
+    bj_index = ACE_INDEX if up_value == 10 else TEN_INDEX if up_value == 11 else None
+    holes = _draw(counts, rows, rng, exclude=bj_index if peek else None)
+    if (holes < 0).any(): raise ValueError("No hole card can be drawn from this composition.")
+    totals, softs = _add_cards(totals, softs, holes)
+    blackjack = (holes == bj_index) if bj_index is not None else np.zeros(n_hands, dtype=bool)
+    _play_dealer(counts, totals, softs, rows[~blackjack], rng)
+    histogram = np.bincount(_dealer_codes(totals, blackjack), minlength=len(DEALER_OUTCOMES))
+    return {
+        'n': n_hands,
+        'counts': dict(zip(DEALER_OUTCOMES, histogram.tolist())),
+        'probabilities': dict(zip(DEALER_OUTCOMES, (histogram / n_hands).tolist())),
+        'ci95': {outcome: _wilson_interval(int(c), n_hands) for outcome, c in zip(DEALER_OUTCOMES, histogram)},
+    }
+
+def simulate_round_batch(player_card_values, up_value, composition, action, n_rounds, seed=MONTE_CARLO_SEED, stand_on=17):
+    """
+    Plays `n_rounds` of one player hand against the dealer (peek, S17) and returns the result per
+    initial bet: {'n', 'ev', 'std', 'ci95'}. `action` is 'S' (stand), 'D' (one card, double stake)
+    or 'H' (hit until the total reaches `stand_on`). Useful for cross-checking ev_engine what-ifs.
+    """
+    if sum(composition) <= 0: raise ValueError("Cannot simulate from an empty shoe.")
+    rng = make_rng(seed)
+    counts = np.tile(np.asarray(composition, dtype=np.int16), (n_rounds, 1))
+    rows = np.arange(n_rounds)
+    player_totals = np.zeros(n_rounds, dtype=np.int16); player_softs = np.zeros(n_rounds, dtype=bool)
+    for value in player_card_values:
+        player_totals, player_softs = _add_cards(player_totals, player_softs, np.full(n_rounds, CARD_VALUES.index(value)))
+    # Dealer hole card first (peeked, so never blackjack), then the player acts
+    dealer_totals = np.full(n_rounds, up_value, dtype=np.int16); dealer_softs = np.full(n_rounds, up_value == 11)
+    bj_index = ACE_INDEX if up_value == 10 else TEN_INDEX if up_value == 11 else None
+    holes = _draw(counts, rows, rng, exclude=bj_index)
+    if (holes < 0).any(): raise ValueError("No hole card can be drawn from this composition.")
+    dealer_totals, dealer_softs = _add_cards(dealer_totals, dealer_softs, holes)
+    stake = np.ones(n_rounds)
+    if action in ('D', 'H'):
+        active = rows if action == 'D' else rows[player_totals < stand_on]
+        while active.size:
+            picks = _draw(counts, active, rng)
+            active = active[picks >= 0]
+            player_totals[active], player_softs[active] = _add_cards(player_totals[active], player_softs[active], picks[picks >= 0])
+            if action == 'D': break
+            active = active[player_totals[active] < stand_on]
+        if action == 'D': stake[:] = 2.0
+    player_bust = player_totals > 21
+    _play_dealer(counts, dealer_totals, dealer_softs, rows[~player_bust], rng)
+    outcome = np.sign(player_totals.astype(np.int32) - dealer_totals)
+    outcome[dealer_totals > 21] = 1
+    outcome[player_bust] = -1
+    results = outcome * stake
+    ev = float(results.mean()); std = float(results.std())
+    half = 1.96 * std / math.sqrt(n_rounds)
+    return {'n': n_rounds, 'ev': ev, 'std': std, 'ci95': (ev - half, ev + half)}
+
+# --- END OF FILE monte_carlo.py ---
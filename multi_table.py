@@ -0,0 +1,130 @@
+# --- START OF FILE multi_table.py ---
+"""
+Watches several tables from one machine. Each camera gets its own CasinoAI table state
+(shoe, counts, game phase, history) and HUD window, while a single CardDetector runs one
+batched model call per tick over every stream whose picture changed, on a worker thread
+so the windows keep rendering and taking keys during inference.
+
+Keys go to the active table; press 1-9 to switch. Set MULTI_TABLE_CAMERAS in config.py
+(or pass indices: python multi_table.py 0 1 2).
+"""
+import sys
+import threading
+import time
+import cv2
+from config import MULTI_TABLE_CAMERAS, USE_SCENE_GATE, GEMINI_STUB, RENDER_POLL_INTERVAL, WINDOW_NAME, HUD_COLOR_GOOD, HUD_COLOR_NEUTRAL
+from capture_pipeline import FrameGrabber
+from card_detector import CardDetector, split_boxes
+from frame_gate import SceneChangeGate
+from gemini_integration import GeminiIntegration, StubGeminiModel
+from main import CasinoAI
+from utils import draw_hud_element
+
+class BatchDetectionWorker(threading.Thread):
+    """
+    Runs one batched detection per tick over every stream with a new, changed frame and
+    publishes (frame, detected_data, overlay) into newest-only per-table slots, like
+    capture_pipeline.DetectionWorker does for a single camera.
+    """
+    def __init__(self, detector, grabbers, gates):
+        super().__init__(name="BatchDetectionWorker", daemon=True)
+        self.detector = detector; self.grabbers = grabbers; self.gates = gates
+        self.frame_seqs = [0] * len(grabbers)
+        self.condition = threading.Condition()
+        self.results = [None] * len(grabbers)  # Latest (frame, detected_data, overlay) per table
+        self.result_seqs = [0] * len(grabbers)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set() and not all(grabber.failed for grabber in self.grabbers):
+            if not self.detect_tick(): self._stop_event.wait(RENDER_POLL_INTERVAL)  # Nothing new on any stream
+
+    def detect_tick(self):
+        """Runs one batched detection over every stream with a new, changed frame. Returns the set of updated tables."""
+        frames = []; owners = []; grays = []
+        for n, grabber in enumerate(self.grabbers):
+            seq, frame = grabber.latest()
+            if frame is None or seq == self.frame_seqs[n]: continue
+            self.frame_seqs[n] = seq
+            gate = self.gates[n]
+            if gate is not None:
+                needed, gray = gate.check(frame)
+                if not needed: continue
+                grays.append(gray)
+            else: grays.append(None)
+            frames.append(frame); owners.append(n)
+        if not frames: return set()
+        try: batch = self.detector.detect_boxes_batch(frames)  # Always full inference, so each gate reference is an inferred frame
+        except Exception as e: print(f"Error card detection: {e}"); batch = [[] for _ in frames]
+        outputs = [split_boxes(detected_boxes) for detected_boxes in batch]  # Drawn by the table's render pass, no per-frame copy here
+        for n, gray, output in zip(owners, grays, outputs):
+            if self.gates[n] is not None: self.gates[n].remember(gray, output)
+        with self.condition:
+            for n, frame, output in zip(owners, frames, outputs):
+                self.results[n] = (frame,) + output; self.result_seqs[n] += 1
+            self.condition.notify_all()
+        return set(owners)
+
+    def wait_for_results(self, after_seqs, timeout):
+        """Returns (result seqs, results) once any table has a result newer than `after_seqs`, else the current ones after `timeout`."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.result_seqs != after_seqs or self._stop_event.is_set(), timeout)
+            return list(self.result_seqs), list(self.results)
+
+    def stop(self):
+        self._stop_event.set()
+        with self.condition: self.condition.notify_all()
+
+class MultiTableAI:
+    def __init__(self, camera_indices=MULTI_TABLE_CAMERAS):
+        if not camera_indices: raise ValueError("Multi-table mode needs at least one camera index.")
+        print(f"Initializing multi-table AI for cameras {list(camera_indices)}...")
+        self.card_detector = CardDetector()
+        self.gemini_integration = GeminiIntegration(StubGeminiModel() if GEMINI_STUB else None)
+        self.grabbers = [FrameGrabber(index) for index in camera_indices]
+        self.tables = [CasinoAI(index, self.card_detector, self.gemini_integration, f"{WINDOW_NAME} - Table {n + 1}", open_camera=False)
+                       for n, index in enumerate(camera_indices)]
+        self.gates = [SceneChangeGate() if USE_SCENE_GATE else None for _ in camera_indices]
+        self.worker = BatchDetectionWorker(self.card_detector, self.grabbers, self.gates)
+        self.results = [None] * len(camera_indices)  # Snapshot of the worker's latest (frame, detected_data, overlay) per table
+        self.result_seqs = [0] * len(camera_indices)
+        self.active_table = 0
+
+    def run(self):
+        print("Starting multi-table AI... Press 1-9 to choose the table that receives keys.")
+        for grabber in self.grabbers: grabber.start()
+        self.worker.start()
+        while True:
+            # Waits at most one poll interval for fresh detections, so keys and redraws never wait on inference
+            seqs, self.results = self.worker.wait_for_results(self.result_seqs, RENDER_POLL_INTERVAL)
+            updated = {n for n, seq in enumerate(seqs) if seq != self.result_seqs[n]}; self.result_seqs = seqs
+            key = cv2.waitKey(1) & 0xFF; current_time = time.time()
+            if ord('1') <= key <= ord('9') and key - ord('1') < len(self.tables):
+                self.active_table = key - ord('1'); key = 255
+                updated = set(range(len(self.tables)))  # Redraw every window to move the ACTIVE marker
+                print(f"Active table: {self.active_table + 1}")
+            quit_requested = False
+            for n, table in enumerate(self.tables):
+                if self.results[n] is None or self.grabbers[n].failed: continue
+                table.latency.begin_frame()
+                frame, table.latest_detected_cards, table.latest_overlay = self.results[n]
+                final_frame, quit_requested = table.step(frame, n in updated or self.grabbers[n].status != "OK",
+                                                         key if n == self.active_table else 255, current_time)
+                if quit_requested: break
+                if final_frame is not None:
+                    active = n == self.active_table
+                    draw_hud_element(final_frame, f"Table {n + 1}" + (" [ACTIVE]" if active else f" (press {n + 1})"), (final_frame.shape[1] - 350, 175), HUD_COLOR_GOOD if active else HUD_COLOR_NEUTRAL)
+                    cv2.imshow(table.window_name, final_frame)
+                table.latency.maybe_export()
+            if quit_requested or all(grabber.failed for grabber in self.grabbers): break
+        self.worker.stop(); self.worker.join(timeout=2.0)
+        for grabber in self.grabbers: grabber.stop()
+        for grabber in self.grabbers: grabber.join(timeout=2.0)
+        for table in self.tables: table.speculator.close()
+        self.gemini_integration.close()
+        cv2.destroyAllWindows(); print("Application terminated.")
+
+if __name__ == "__main__":
+    MultiTableAI([int(arg) for arg in sys.argv[1:]] or MULTI_TABLE_CAMERAS).run()
+
+# --- END OF FILE multi_table.py ---
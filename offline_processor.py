@@ -0,0 +1,155 @@
+# --- START OF FILE offline_processor.py ---
+"""
+Headless batch detection over recorded sessions: a video file or a folder of frames
+is decoded on background threads, run through CardDetector in batches (full inference
+on every frame, no tracking) and saved as one compressed .npz of box records.
+
+    python offline_processor.py session.mp4 --out session_detections.npz --video-out session_annotated.mp4
+    python offline_processor.py captured_frames/ --batch 16
+
+The .npz holds `records` (card_detector.RECORD_DTYPE: box, confidence, class_id, zone),
+`frame_index` (source frame of each record), `class_names`, `frame_count` and `fps`;
+read it back with load_detections().
+"""
+import argparse
+import glob
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import cv2
+import numpy as np
+from config import OFFLINE_BATCH_SIZE, OFFLINE_DECODE_THREADS, OFFLINE_PREFETCH_FRAMES
+from card_detector import CardDetector, RECORD_DTYPE, ZONE_NAMES, annotate_boxes, boxes_to_records
+
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.bmp')
+
+def list_frames(folder):
+    return sorted(p for ext in IMAGE_EXTENSIONS for p in glob.glob(os.path.join(folder, ext)))
+
+def _read_video(path, frames):
+    cap = cv2.VideoCapture(path)
+    try:
+        index = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret: break
+            frames.put((index, frame)); index += 1
+    finally:
+        cap.release(); frames.put(None)
+
+def _read_folder(paths, frames, workers, depth):
+    # Decodes out of order on `workers` threads but hands frames over in order
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for index, path in enumerate(paths):
+                pending.append((index, pool.submit(cv2.imread, path)))
+                if len(pending) >= depth:
+                    i, future = pending.popleft(); frames.put((i, future.result()))
+            while pending:
+                i, future = pending.popleft(); frames.put((i, future.result()))
+    finally:
+        frames.put(None)
+
+def prefetch_frames(source, workers=OFFLINE_DECODE_THREADS, depth=OFFLINE_PREFETCH_FRAMES):
+    """Yields (frame_index, frame) from a video file or image folder, decoded ahead on background threads."""
+    frames = queue.Queue(maxsize=depth)
+    if os.path.isdir(source): target, args = _read_folder, (list_frames(source), frames, workers, depth)
+    else: target, args = _read_video, (source, frames)
+    threading.Thread(target=target, args=args, name="FramePrefetch", daemon=True).start()
+    while True:
+        item = frames.get()
+        if item is None: return
+        if item[1] is None: print(f"Warning: could not decode frame {item[0]}; skipped."); continue
+        yield item
+
+def _batches(frames, size):
+    batch = []
+    for item in frames:
+        batch.append(item)
+        if len(batch) >= size: yield batch; batch = []
+    if batch: yield batch
+
+class VideoSink(threading.Thread):
+    """Encodes frames on its own thread so writing never stalls detection. put() frames, then close()."""
+    def __init__(self, path, fps, fourcc='mp4v'):
+        super().__init__(name="VideoSink", daemon=True)
+        self.path = path; self.fps = fps; self.fourcc = fourcc; self.writer = None
+        self.frames = queue.Queue(maxsize=OFFLINE_PREFETCH_FRAMES)
+
+    def run(self):
+        while True:
+            frame = self.frames.get()
+            if frame is None: break
+            if self.writer is None:
+                self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (frame.shape[1], frame.shape[0]))
+            self.writer.write(frame)
+        if self.writer is not None: self.writer.release()
+
+    def put(self, frame):
+        self.frames.put(frame)
+
+    def close(self):
+        self.frames.put(None); self.join()
+
+def process(source, out_path, video_out=None, detector=None, batch_size=OFFLINE_BATCH_SIZE, workers=OFFLINE_DECODE_THREADS):
+    """Runs detection over every frame of `source` and writes `out_path`. Returns a summary dict with the throughput."""
+    detector = detector or CardDetector()
+    fps = 30.0
+    if not os.path.isdir(source):
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened(): raise IOError(f"Cannot open video '{source}'")
+        fps = cap.get(cv2.CAP_PROP_FPS) or fps; cap.release()
+    sink = VideoSink(video_out, fps) if video_out else None
+    if sink: sink.start()
+
+    records = []; frame_indices = []; frame_count = 0; detect_seconds = 0.0
+    start = time.perf_counter()
+    for batch in _batches(prefetch_frames(source, workers), batch_size):
+        frames = [frame for _, frame in batch]
+        detect_start = time.perf_counter()
+        batch_boxes = detector.detect_boxes_batch(frames)
+        detect_seconds += time.perf_counter() - detect_start
+        for (index, frame), detected_boxes in zip(batch, batch_boxes):
+            frame_records = boxes_to_records(detected_boxes)
+            records.append(frame_records); frame_indices.append(np.full(len(frame_records), index, dtype=np.int32))
+            if sink: sink.put(annotate_boxes(frame, detected_boxes)[1])  # Frame is ours; draw in place
+        frame_count += len(batch)
+    if sink: sink.close()
+    elapsed = time.perf_counter() - start
+
+    records = np.concatenate(records) if records else np.zeros(0, dtype=RECORD_DTYPE)
+    class_names = np.array([detector.model_names.get(i, '') for i in range(max(detector.model_names, default=-1) + 1)])
+    np.savez_compressed(out_path, records=records, frame_index=np.concatenate(frame_indices) if frame_indices else np.zeros(0, dtype=np.int32),
+                        class_names=class_names, frame_count=frame_count, fps=fps, source=os.path.abspath(source))
+    return {'frames': frame_count, 'detections': len(records), 'seconds': elapsed,
+            'fps': frame_count / elapsed if elapsed > 0 else 0.0,
+            'detector_fps': frame_count / detect_seconds if detect_seconds > 0 else 0.0}
+
+def load_detections(path):
+    """Reads a file written by process(). Returns {frame_index: [(zone, label, confidence, box), ...]} for frames with detections."""
+    with np.load(path) as data:
+        records = data['records']; frame_index = data['frame_index']; class_names = data['class_names'].tolist()
+    detections = {}
+    for index, box, confidence, class_id, zone_id in zip(frame_index.tolist(), records['box'].tolist(), records['confidence'].tolist(),
+                                                         records['class_id'].tolist(), records['zone'].tolist()):
+        detections.setdefault(index, []).append((ZONE_NAMES[zone_id], class_names[class_id], confidence, box))
+    return detections
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the card detector headless over a video file or folder of frames")
+    parser.add_argument('source', help="Video file or folder of .jpg/.png frames")
+    parser.add_argument('--out', help="Detections file (default: <source>_detections.npz)")
+    parser.add_argument('--video-out', help="Also write an annotated video here")
+    parser.add_argument('--batch', type=int, default=OFFLINE_BATCH_SIZE, help="Frames per model call")
+    parser.add_argument('--workers', type=int, default=OFFLINE_DECODE_THREADS, help="Decode threads for image folders")
+    args = parser.parse_args()
+    out_path = args.out or os.path.splitext(os.path.normpath(args.source))[0] + "_detections.npz"
+    summary = process(args.source, out_path, args.video_out, batch_size=args.batch, workers=args.workers)
+    print(f"{summary['frames']} frames, {summary['detections']} detections in {summary['seconds']:.1f} s -> {out_path}")
+    print(f"Throughput {summary['fps']:.1f} frames/s end to end, {summary['detector_fps']:.1f} frames/s in the detector")
+
+# --- END OF FILE offline_processor.py ---
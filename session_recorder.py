@@ -0,0 +1,141 @@
+# --- START OF FILE session_recorder.py ---
+"""
+Records a live session (camera frames + timestamped keypresses) and replays it headless
+through the same detection, game-state and analysis code as CasinoAI.run, as fast as
+the CPU allows, to compare hot-path changes run to run.
+
+Record: set SESSION_RECORD_DIR in config.py and play as usual. The folder gets
+frames.avi (every frame the loop detected on) and events.jsonl, one line per frame
+{"frame": i, "t": seconds} or key {"key": code, "frame": i, "t": seconds}.
+
+Replay: python session_recorder.py sessions/2025-04-05 --report replay_report.json
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import wait
+from config import SESSION_RECORD_FPS, USE_SCENE_GATE
+from explanation_cache import ExplanationCache
+from gemini_integration import GeminiIntegration, StubGeminiModel
+from offline_processor import VideoSink, prefetch_frames
+
+class SessionRecorder:
+    """Appends frames and keys as they happen; frames are encoded on a background thread."""
+    def __init__(self, directory, fps=SESSION_RECORD_FPS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.sink = VideoSink(os.path.join(directory, 'frames.avi'), fps, fourcc='MJPG'); self.sink.start()
+        self.events = open(os.path.join(directory, 'events.jsonl'), 'w')
+        self.frame_index = -1; self.start_time = None
+        print(f"Recording session to {directory}")
+
+    def _time(self, now):
+        if self.start_time is None: self.start_time = now
+        return round(now - self.start_time, 4)
+
+    def record_frame(self, frame, now):
+        self.frame_index += 1
+        self.sink.put(frame.copy())
+        self.events.write(json.dumps({'frame': self.frame_index, 't': self._time(now)}) + "\n")
+
+    def record_key(self, key, now):
+        """Keys are tied to the last recorded frame (-1 = before the first one)."""
+        self.events.write(json.dumps({'key': key, 'frame': self.frame_index, 't': self._time(now)}) + "\n")
+
+    def close(self):
+        self.events.close(); self.sink.close()
+        print(f"Session recorded: {self.frame_index + 1} frames in {self.directory}")
+
+def load_session(directory):
+    """Returns (frame times in seconds, {frame index: [(key, t), ...]}) from events.jsonl."""
+    frame_times = []; keys = defaultdict(list)
+    with open(os.path.join(directory, 'events.jsonl')) as f:
+        for line in f:
+            event = json.loads(line)
+            if 'key' in event: keys[max(event['frame'], 0)].append((event['key'], event['t']))
+            else: frame_times.append(event['t'])
+    return frame_times, keys
+
+class _ReplayGeminiModel(StubGeminiModel):
+    """Instant stub that only answers while replay() holds `release` open, so an answer always arrives on the step after its request."""
+    def __init__(self):
+        super().__init__(delay=0.0); self.release = threading.Event()
+
+    def generate_content(self, prompt):
+        self.release.wait()
+        return super().generate_content(prompt)
+
+def replay(directory, card_detector=None, gemini_integration=None, use_gate=USE_SCENE_GATE, seed=0):
+    """
+    Feeds a recorded session through CasinoAI.detect_frame and CasinoAI.step with no camera
+    or window. Recorded timestamps are used as the loop clock, so time-based behaviour
+    matches the live run. Returns a report with throughput, per-stage latency and final state.
+
+    Runs are reproducible: Gemini defaults to an instant stub with an in-memory explanation
+    cache (no network, no explanation_cache.sqlite3) whose answers are released between steps,
+    the speculator (a timing-dependent background thread) is off, the clock starts at a fixed
+    origin and dealer simulations use a Random seeded with `seed`.
+    """
+    from main import CasinoAI
+    from latency_monitor import LatencyMonitor
+    from frame_gate import SceneChangeGate
+    frame_times, keys = load_session(directory)
+    owns_gemini = gemini_integration is None
+    stub = _ReplayGeminiModel() if owns_gemini else None
+    if owns_gemini: gemini_integration = GeminiIntegration(stub, ExplanationCache(path=None))
+    ai = CasinoAI(card_detector=card_detector, gemini_integration=gemini_integration, open_camera=False)
+    ai.scene_gate = SceneChangeGate() if use_gate else None
+    ai.speculator.enabled = False; ai.blackjack_logic.rng = random.Random(seed)
+    ai.latency = LatencyMonitor(ring_size=max(len(frame_times), 1), export_path=None)  # Keep every sample for the report
+    base_time = 1e6; frames = 0; redraws = 0; quit_requested = False  # Fixed clock origin: the same float rounding (gate refresh, cooldowns) every run
+
+    start = time.perf_counter()
+    for index, frame in prefetch_frames(os.path.join(directory, 'frames.avi')):
+        if index >= len(frame_times): break
+        now = base_time + frame_times[index]
+        ai.latency.begin_frame()
+        frame, new_frame = ai.detect_frame(frame, now)
+        ai.latency.lap('detect')
+        for key, t in keys.get(index) or [(255, frame_times[index])]:
+            final_frame, quit_requested = ai.step(frame, new_frame, key, base_time + t)
+            new_frame = False
+            if ai.gemini_future is not None:
+                # Answer now, between steps: collected by the next step, never mid-step or "still pending"
+                if stub: stub.release.set()
+                wait([ai.gemini_future])
+                if stub: stub.release.clear()
+            if final_frame is not None: redraws += 1
+            if quit_requested: break
+        frames += 1
+        if quit_requested: break
+    elapsed = time.perf_counter() - start
+    if owns_gemini: stub.release.set(); gemini_integration.close()
+
+    recorded = frame_times[frames - 1] if frames else 0.0
+    return {'frames': frames, 'keys': sum(len(k) for k in keys.values()), 'redraws': redraws,
+            'seconds': round(elapsed, 3), 'fps': round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+            'recorded_seconds': recorded, 'speedup': round(recorded / elapsed, 2) if elapsed > 0 else 0.0,
+            'latency': ai.latency.snapshot()['stages'],
+            'final_state': {'game_phase': ai.game_phase, 'dealer_hand': ai.dealer_hand, 'player_hands': ai.all_player_hands,
+                            'recommended_move': ai.last_analysis_state.get('recommended_move'), 'status': ai.status_message}}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded session headless and report timings")
+    parser.add_argument('session', help="Folder written with SESSION_RECORD_DIR")
+    parser.add_argument('--report', help="Write the JSON report here")
+    parser.add_argument('--no-gate', action='store_true', help="Run detection on every frame")
+    args = parser.parse_args()
+    report = replay(args.session, use_gate=USE_SCENE_GATE and not args.no_gate)
+    print(f"{report['frames']} frames, {report['keys']} keys in {report['seconds']:.2f} s "
+          f"({report['fps']:.1f} frames/s, {report['speedup']:.1f}x real time)")
+    for stage, stats in report['latency'].items():
+        print(f"{stage:<9} p50 {stats['p50']:7.2f} ms  p99 {stats['p99']:7.2f} ms  mean {stats['mean']:7.2f} ms")
+    print("Final state:", report['final_state'])
+    if args.report:
+        with open(args.report, 'w') as f: json.dump(report, f, indent=2)
+
+# --- END OF FILE session_recorder.py ---
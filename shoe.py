@@ -0,0 +1,98 @@
+# --- START OF FILE shoe.py ---
+from config import CARD_RANKS, CARD_SUITS
+
+# Fixed slot layout: slot = rank_index * 4 + suit_index, e.g. '2S' -> 0, 'AC' -> 51
+CARD_SLOTS = {rank + suit: r_idx * len(CARD_SUITS) + s_idx for r_idx, rank in enumerate(CARD_RANKS) for s_idx, suit in enumerate(CARD_SUITS)}
+SLOT_KEYS = tuple(sorted(CARD_SLOTS, key=CARD_SLOTS.get))
+RANK_SLOTS = {rank: idx for idx, rank in enumerate(CARD_RANKS)}
+# Composition index by value (2..9, ten-valued, Ace), matching dealer_engine/ev_engine
+RANK_VALUE_INDEX = tuple(8 if rank in ('T', 'J', 'Q', 'K') else 9 if rank == 'A' else int(rank) - 2 for rank in CARD_RANKS)
+SLOT_RANK_INDEX = tuple(slot // len(CARD_SUITS) for slot in range(len(SLOT_KEYS)))
+SLOT_VALUE_INDEX = tuple(RANK_VALUE_INDEX[r_idx] for r_idx in SLOT_RANK_INDEX)
+# Hard totals that bust when this slot's card is drawn, i.e. 22 - value .. 21 (an Ace only ever counts as 1 here)
+RANK_HARD_VALUE = tuple(1 if v_idx == 9 else v_idx + 2 for v_idx in RANK_VALUE_INDEX)
+SLOT_BUST_TOTALS = tuple(range(22 - RANK_HARD_VALUE[r_idx], 22) for r_idx in SLOT_RANK_INDEX)
+
+def parse_card_label(label):
+    """Splits a label ('Ac', '10d', 'TS') into (internal key like 'AC'/'TD', rank). Key is None without a valid suit; both are None for an unknown rank."""
+    if not label or not isinstance(label, str): return None, None
+    label_upper = label.upper()
+    if label_upper.startswith('10'): rank, suit = 'T', label_upper[2:]
+    else: rank, suit = label_upper[0], label_upper[1:]
+    if rank not in CARD_RANKS: return None, None
+    return (rank + suit if suit in CARD_SUITS else None), rank
+
+class Shoe:
+    """
+    Suit-aware card counts for a shoe of any size, stored as fixed-size integer arrays.
+    52 per-card slots are kept alongside 13 rank and 10 value counters so that removal,
+    undo and remaining/tens/aces queries are all O(1). Cards are addressed by internal key ('AS', 'TD').
+    `bust_counts[t]` is the number of remaining cards that bust a hard total t on the next draw;
+    it is updated in place on remove/restore so bust_probability() is a single index.
+    """
+    def __init__(self, num_decks):
+        self.num_decks = num_decks
+        self.reset()
+
+    def reset(self):
+        self.total_cards = self.num_decks * len(SLOT_KEYS)
+        self.card_counts = [self.num_decks] * len(SLOT_KEYS)
+        self.rank_counts = [self.num_decks * len(CARD_SUITS)] * len(CARD_RANKS)
+        self.value_counts = [self.num_decks * len(CARD_SUITS)] * 8 + [self.num_decks * len(CARD_SUITS) * 4, self.num_decks * len(CARD_SUITS)]
+        self.cards_remaining = self.total_cards
+        self.bust_counts = [0] * 22
+        for slot, count in enumerate(self.card_counts):
+            for total in SLOT_BUST_TOTALS[slot]: self.bust_counts[total] += count
+
+    def count(self, card_key):
+        """Copies of a specific card left (0 for unknown keys)."""
+        slot = CARD_SLOTS.get(card_key)
+        return self.card_counts[slot] if slot is not None else 0
+
+    def rank_count(self, rank):
+        slot = RANK_SLOTS.get(rank)
+        return self.rank_counts[slot] if slot is not None else 0
+
+    @property
+    def tens_remaining(self):
+        return self.value_counts[8]
+
+    @property
+    def aces_remaining(self):
+        return self.value_counts[9]
+
+    def bust_probability(self, total, soft):
+        """Probability that the next card busts a hand of this (total, soft) state."""
+        if total > 21: return 1.0
+        if soft or total < 12 or self.cards_remaining <= 0: return 0.0
+        return self.bust_counts[total] / self.cards_remaining
+
+    def composition(self):
+        """Remaining cards by value (2..9, ten-valued, Ace) as the tuple key used by the probability engines."""
+        return tuple(self.value_counts)
+
+    def remove(self, card_key):
+        """Takes one copy of a card out of the shoe. Returns False if the key is unknown or exhausted."""
+        slot = CARD_SLOTS.get(card_key)
+        if slot is None or self.card_counts[slot] <= 0:
+            return False
+        self.card_counts[slot] -= 1
+        self.rank_counts[SLOT_RANK_INDEX[slot]] -= 1
+        self.value_counts[SLOT_VALUE_INDEX[slot]] -= 1
+        self.cards_remaining -= 1
+        for total in SLOT_BUST_TOTALS[slot]: self.bust_counts[total] -= 1
+        return True
+
+    def restore(self, card_key):
+        """Puts one copy of a card back (undo). Returns False if the key is unknown or already full."""
+        slot = CARD_SLOTS.get(card_key)
+        if slot is None or self.card_counts[slot] >= self.num_decks:
+            return False
+        self.card_counts[slot] += 1
+        self.rank_counts[SLOT_RANK_INDEX[slot]] += 1
+        self.value_counts[SLOT_VALUE_INDEX[slot]] += 1
+        self.cards_remaining += 1
+        for total in SLOT_BUST_TOTALS[slot]: self.bust_counts[total] += 1
+        return True
+
+# --- END OF FILE shoe.py ---
@@ -0,0 +1,196 @@
+# --- START OF FILE shoe_simulator.py ---
+"""
+Headless full-shoe simulator for measuring the real edge of the bet ramp
+(BlackjackLogic.get_bet_recommendation), INDEX_PLAYS and SHOE_PENETRATION.
+
+Rules follow config: S17, double any two, DAS, one split (split aces get one card),
+no surrender, blackjack pays 3:2, dealer peeks, insurance taken when the index says so.
+
+Usage: python shoe_simulator.py --shoes 100000 --decks 6 --workers 4
+"""
+import argparse
+import logging
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from config import NUM_DECKS, SHOE_PENETRATION, SIMULATOR_BATCH_SHOES, SIMULATOR_BANKROLL_UNITS
+from blackjack_logic import BlackjackLogic
+from shoe import SLOT_KEYS
+
+class _ShoeExhausted(Exception):
+    """The shoe ran out mid-round (penetration at or near 1.0); the round is abandoned and the shoe ends."""
+
+def _stand_or_hit_for_illegal_double(total):
+    # Table 'D' with 3+ cards: soft/hard 18+ stands (Ds), everything else hits (Dh)
+    return 'S' if total >= 18 else 'H'
+
+def _decide(logic, hand, up_card, use_index, can_double, can_split):
+    # Without index plays the basic move; the TC-0 adjusted move would still apply 0/-1 indices (16vT, 11vA)
+    decision = logic.get_strategy_decision(hand, up_card, logic.get_hi_lo_true_count() if use_index else 0, allow_split=can_split)
+    move = decision[1] if use_index else decision[0]
+    if move == 'D' and not can_double:
+        move = _stand_or_hit_for_illegal_double(logic.get_hand_value(hand))
+    return move
+
+class _Table:
+    """One simulated table: a shuffled physical shoe plus the BlackjackLogic tracking what has been seen."""
+    def __init__(self, num_decks, penetration, rng, use_index, use_ramp):
+        self.logic = BlackjackLogic(num_decks=num_decks)
+        self.num_decks = num_decks; self.penetration = penetration; self.rng = rng
+        self.use_index = use_index; self.use_ramp = use_ramp
+        self.cards = []; self.position = 0
+
+    def shuffle(self):
+        self.cards = list(SLOT_KEYS) * self.num_decks
+        self.rng.shuffle(self.cards)
+        self.position = 0
+        self.logic.reset_shoe()
+
+    def deal(self, seen=True):
+        if self.position >= len(self.cards): raise _ShoeExhausted()
+        card = self.cards[self.position]; self.position += 1
+        if seen: self.logic.remove_card_from_shoe(card)
+        return card
+
+    def needs_shuffle(self):
+        return self.position >= len(self.cards) * self.penetration
+
+    def _play_hand(self, hand, up_card, can_split):
+        """Plays one player hand to completion. Returns list of (hand, stake) results (two after a split)."""
+        logic = self.logic
+        # Pairs by value, like BlackjackLogic._classify_hand: K+Q plays the 'T' pair row and its split indices
+        values = [logic._get_card_value_numeric(logic._get_rank_from_key_or_label(card)) for card in hand]
+        if can_split and values[0] == values[1]:
+            if _decide(logic, hand, up_card, self.use_index, True, True) == 'P':
+                split_hands = []
+                is_aces = logic._get_rank_from_key_or_label(hand[0]) == 'A'
+                for card in hand:
+                    new_hand = [card, self.deal()]
+                    if is_aces: split_hands.append((new_hand, 1))
+                    else: split_hands.extend(self._play_hand(new_hand, up_card, False))
+                return split_hands
+        stake = 1
+        while logic.get_hand_value(hand) < 21:
+            move = _decide(logic, hand, up_card, self.use_index, len(hand) == 2, False)
+            if move == 'D':
+                stake = 2; hand.append(self.deal()); break
+            if move != 'H': break
+            hand.append(self.deal())
+        return [(hand, stake)]
+
+    def play_round(self):
+        """Plays one round and returns (net units won, initial bet)."""
+        logic = self.logic
+        bet = logic.get_bet_recommendation() if self.use_ramp else 1
+        player = [self.deal()]; up_card = self.deal(); player.append(self.deal()); hole_card = self.deal(seen=False)
+        net = 0.0
+        up_rank = logic._get_rank_from_key_or_label(up_card)
+        dealer_ranks = {up_rank, logic._get_rank_from_key_or_label(hole_card)}
+        dealer_bj = 'A' in dealer_ranks and bool(dealer_ranks & {'T', 'J', 'Q', 'K'})
+        player_bj = logic.get_hand_value(player) == 21
+        if up_rank == 'A' and self.use_index and logic.should_take_insurance(logic.get_hi_lo_true_count()):
+            net += bet if dealer_bj else -bet / 2
+        if dealer_bj or player_bj:
+            logic.remove_card_from_shoe(hole_card)
+            if player_bj and not dealer_bj: net += 1.5 * bet
+            elif dealer_bj and not player_bj: net -= bet
+            return net, bet
+        hands = self._play_hand(player, up_card, True)
+        dealer = [up_card, hole_card]
+        logic.remove_card_from_shoe(hole_card)
+        if any(logic.get_hand_value(h) <= 21 for h, _ in hands):
+            while logic.get_hand_value(dealer) < 17: dealer.append(self.deal())
+        dealer_total = logic.get_hand_value(dealer)
+        for hand, stake in hands:
+            total = logic.get_hand_value(hand)
+            if total > 21: net -= stake * bet
+            elif dealer_total > 21 or total > dealer_total: net += stake * bet
+            elif total < dealer_total: net -= stake * bet
+        return net, bet
+
+def _empty_stats():
+    return {'shoes': 0, 'rounds': 0, 'net': 0.0, 'net_sq': 0.0, 'wagered': 0.0, 'seconds': 0.0}
+
+def _merge_stats(total, part):
+    for key in total: total[key] += part[key]
+    return total
+
+def simulate_batch(batch_index, n_shoes, seed_entropy, num_decks, penetration, use_index, use_ramp):
+    """Worker entry point: plays `n_shoes` complete shoes and returns summed statistics."""
+    logging.getLogger().setLevel(logging.WARNING)  # Per-card INFO logs would dominate the run time
+    seed = np.random.SeedSequence(seed_entropy, spawn_key=(batch_index,)).generate_state(2)
+    table = _Table(num_decks, penetration, random.Random(int(seed[0]) << 32 | int(seed[1])), use_index, use_ramp)
+    stats = _empty_stats(); start = time.perf_counter()
+    for _ in range(n_shoes):
+        table.shuffle()
+        while not table.needs_shuffle():
+            try: net, bet = table.play_round()
+            except _ShoeExhausted: break  # Unfinished round is not counted
+            stats['rounds'] += 1; stats['net'] += net; stats['net_sq'] += net * net; stats['wagered'] += bet
+        stats['shoes'] += 1
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+def summarize(stats, elapsed, bankroll_units=SIMULATOR_BANKROLL_UNITS):
+    """EV/round, std/round, EV per unit wagered, N0, risk of ruin and throughput from accumulated stats."""
+    rounds = stats['rounds']
+    if rounds == 0: return {}
+    ev = stats['net'] / rounds
+    variance = max(stats['net_sq'] / rounds - ev * ev, 0.0)
+    n0 = variance / (ev * ev) if ev != 0 else math.inf
+    risk_of_ruin = math.exp(-2 * ev * bankroll_units / variance) if ev > 0 and variance > 0 else 1.0
+    return {
+        'shoes': stats['shoes'], 'rounds': rounds,
+        'ev_per_round': ev, 'std_per_round': math.sqrt(variance),
+        'ev_per_unit_wagered': stats['net'] / stats['wagered'] if stats['wagered'] else 0.0,
+        'ev_stderr': math.sqrt(variance / rounds),
+        'n0_rounds': n0, 'risk_of_ruin': min(risk_of_ruin, 1.0),
+        'rounds_per_second': rounds / elapsed if elapsed > 0 else 0.0,
+    }
+
+def run_simulation(total_shoes, num_decks=NUM_DECKS, penetration=SHOE_PENETRATION, workers=None, seed=0,
+                   batch_shoes=SIMULATOR_BATCH_SHOES, use_index=True, use_ramp=True, bankroll_units=SIMULATOR_BANKROLL_UNITS):
+    """
+    Spreads independent shoe batches over a process pool and yields a cumulative summary
+    each time a batch finishes. Batch seeds depend only on (seed, batch index), so results
+    are reproducible regardless of worker count or completion order.
+    """
+    n_batches = max(1, math.ceil(total_shoes / batch_shoes))
+    totals = _empty_stats(); start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for batch_index in range(n_batches):
+            n_shoes = min(batch_shoes, total_shoes - batch_index * batch_shoes)
+            futures.append(pool.submit(simulate_batch, batch_index, n_shoes, seed, num_decks, penetration, use_index, use_ramp))
+        for done, future in enumerate(as_completed(futures), 1):
+            _merge_stats(totals, future.result())
+            summary = summarize(totals, time.perf_counter() - start, bankroll_units)
+            summary['batches_done'] = done; summary['batches_total'] = n_batches
+            yield summary
+
+def _print_summary(summary):
+    print(f"[{summary['batches_done']}/{summary['batches_total']}] shoes={summary['shoes']} rounds={summary['rounds']} "
+          f"EV/round={summary['ev_per_round']:+.4f} (+/- {1.96 * summary['ev_stderr']:.4f}) EV/unit={summary['ev_per_unit_wagered']:+.4%} "
+          f"SD={summary['std_per_round']:.3f} N0={summary['n0_rounds']:.0f} RoR={summary['risk_of_ruin']:.2%} "
+          f"{summary['rounds_per_second']:.0f} rounds/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Full-shoe blackjack strategy simulator")
+    parser.add_argument('--shoes', type=int, default=10000)
+    parser.add_argument('--decks', type=int, default=NUM_DECKS)
+    parser.add_argument('--penetration', type=float, default=SHOE_PENETRATION, help="Fraction of the shoe dealt before a reshuffle (0-1]")
+    parser.add_argument('--workers', type=int, default=None, help="Process count (default: all cores)")
+    parser.add_argument('--batch-shoes', type=int, default=SIMULATOR_BATCH_SHOES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--bankroll', type=float, default=SIMULATOR_BANKROLL_UNITS, help="Bankroll in base-bet units for risk of ruin")
+    parser.add_argument('--no-index', action='store_true', help="Play basic strategy only")
+    parser.add_argument('--flat', action='store_true', help="Flat bet instead of the count ramp")
+    args = parser.parse_args()
+    if not 0 < args.penetration <= 1: parser.error("--penetration must be in (0, 1]")
+    for summary in run_simulation(args.shoes, args.decks, args.penetration, args.workers, args.seed, args.batch_shoes,
+                                  not args.no_index, not args.flat, args.bankroll):
+        _print_summary(summary)
+
+# --- END OF FILE shoe_simulator.py ---
@@ -0,0 +1,137 @@
+# --- START OF FILE speculation.py ---
+import logging
+import threading
+from collections import deque
+from config import USE_SPECULATION
+from shoe import SLOT_KEYS
+
+class _QuietThreadFilter(logging.Filter):
+    """Drops INFO/DEBUG records logged from one thread; every other thread logs as usual."""
+    def __init__(self, thread_id):
+        super().__init__(); self.thread_id = thread_id
+
+    def filter(self, record):
+        return record.thread != self.thread_id or record.levelno >= logging.WARNING
+
+class Speculator:
+    """
+    Idle-time precomputation for CasinoAI on a background thread. While a hand is waiting on
+    the operator, run() snapshots the shoe and count (BlackjackLogic.snapshot) and queues: the
+    analysis of the current hand ('A'), the analysis after every possible next card ('H' then
+    'A'), and the dealer simulation for every possible hole card ('F'). The worker computes on
+    the snapshot, so the UI thread never waits on an analysis and the live shoe is never
+    touched. Results are keyed on card values ('F': the exact hole card, whose label stays in
+    the simulated hand) plus BlackjackLogic.state_key(), so an entry can only be used for
+    exactly the shoe it was computed on; when the hand or shoe changes the queue is rebuilt
+    from a new snapshot and everything else is discarded. The worker's INFO/DEBUG logging is
+    dropped.
+    """
+    def __init__(self, ai, enabled=USE_SPECULATION):
+        self.ai = ai; self.enabled = enabled
+        self.base = None  # Target (hand, upcard, shoe state) the queue was built for
+        self.logic = None  # Snapshot of the shoe the queue is computed on
+        self.queue = deque(); self.results = {}
+        self.computed = 0; self.hits = 0
+        self.condition = threading.Condition()
+        self.thread = None; self.log_filter = None
+        self._stop_event = threading.Event()
+
+    def _values(self, labels, logic):
+        ranks = [logic._get_rank_from_key_or_label(label) for label in labels]
+        return None if None in ranks else tuple(logic._get_card_value_numeric(rank) for rank in ranks)
+
+    def _key(self, kind, hand, up_card, logic):
+        values = self._values(list(hand) + [up_card], logic)
+        return None if values is None else (kind, values) + logic.state_key()
+
+    def _dealer_key(self, up_card, hole_card, logic):
+        hole_key = logic._get_internal_card_key(hole_card); values = self._values([up_card], logic)
+        return None if hole_key is None or values is None else ('F', hole_key, values) + logic.state_key()
+
+    def _target(self):
+        ai = self.ai
+        if ai.game_phase != "DEALER_INPUT" or not ai.all_player_hands or not ai.all_player_hands[0] or not ai.dealer_hand: return None
+        return tuple(ai.all_player_hands[0]), ai.dealer_hand[0], len(ai.dealer_hand), ai.blackjack_logic.state_key()
+
+    def _rebuild(self, target):
+        """Called with the condition held: new snapshot and queue for `target`."""
+        hand, up_card, dealer_cards, _ = target
+        logic = self.logic = self.ai.blackjack_logic.snapshot()
+        now_key = self._key('A', hand, up_card, logic)
+        self.results = {now_key: self.results[now_key]} if now_key in self.results else {}  # The state just reached may have been foreseen
+        # Analyses need one representative card per value; the dealer turn needs every hole card. Most likely value first
+        shoe = logic.shoe; by_value = {}; value_counts = {}
+        for card_key in SLOT_KEYS:
+            count = shoe.count(card_key)
+            if count <= 0: continue
+            value = self._values([card_key], logic)
+            by_value.setdefault(value, []).append(card_key); value_counts[value] = value_counts.get(value, 0) + count
+        values = sorted(by_value, key=value_counts.get, reverse=True)
+        dealer_work = [('F', card) for value in values for card in by_value[value]] if dealer_cards == 1 else []
+        self.queue = deque([('A', None)] + [('A', by_value[value][0]) for value in values] + dealer_work)
+        self.base = target
+
+    def run(self):
+        """Called on idle UI steps: hands new work to the background thread when the hand or shoe changed. Returns True if it did."""
+        if not self.enabled: return False
+        target = self._target()
+        with self.condition:
+            if target is None: self.base = None; self.logic = None; self.queue.clear(); return False
+            if target == self.base: return False
+            self._rebuild(target); self.condition.notify_all()
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._work, name="Speculator", daemon=True); self.thread.start()
+        return True
+
+    def _work(self):
+        self.log_filter = _QuietThreadFilter(threading.get_ident()); logging.getLogger().addFilter(self.log_filter)
+        try:
+            while True:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.queue or self._stop_event.is_set())
+                    if self._stop_event.is_set(): return
+                    (kind, card), logic, (hand, up_card, _, _) = self.queue.popleft(), self.logic, self.base
+                # Outside the lock: the UI thread only waits to swap in a new snapshot, never on an analysis
+                try:
+                    if card is None: key, result = self._compute('A', list(hand), up_card, logic)
+                    else:
+                        with logic.card_removed(card):  # The snapshot is only touched by this thread
+                            key, result = self._compute(kind, list(hand) + [card] if kind == 'A' else [card], up_card, logic)
+                except Exception as e:
+                    print(f"Speculation error ({kind} {card}): {e}"); continue
+                with self.condition:
+                    if key is not None and logic is self.logic: self.results[key] = result; self.computed += 1  # Else superseded meanwhile
+        finally:
+            logging.getLogger().removeFilter(self.log_filter)
+
+    def _compute(self, kind, cards, up_card, logic):
+        key = self._key(kind, cards, up_card, logic) if kind == 'A' else self._dealer_key(up_card, cards[0], logic)
+        with self.condition:
+            if key is None or key in self.results: return None, None
+        if kind == 'A': return key, self.ai.analyze_hand(cards, up_card, verbose=False, logic=logic)
+        return key, logic.simulate_dealer_turn([up_card, cards[0]])
+
+    def take(self, player_hand, dealer_up_card):
+        """Precomputed CasinoAI.analyze_hand result for this hand on the current shoe, or None."""
+        if not self.enabled: return None
+        key = self._key('A', player_hand, dealer_up_card, self.ai.blackjack_logic)
+        with self.condition: result = self.results.get(key)
+        if result is not None: self.hits += 1
+        return result
+
+    def take_dealer(self, up_card, hole_card):
+        """Precomputed (final hand, outcome) of the dealer turn, for a shoe the hole card was already removed from, or None."""
+        if not self.enabled: return None
+        key = self._dealer_key(up_card, hole_card, self.ai.blackjack_logic)
+        with self.condition: result = self.results.get(key)
+        if result is None: return None
+        self.hits += 1
+        final_hand, outcome = result
+        return [up_card, hole_card] + list(final_hand[2:]), outcome  # Same card, but keep the label spelling main passed in
+
+    def close(self):
+        self._stop_event.set()
+        with self.condition: self.condition.notify_all()
+        if self.thread is not None: self.thread.join(timeout=2.0)
+
+# --- END OF FILE speculation.py ---
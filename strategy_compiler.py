@@ -0,0 +1,126 @@
+# --- START OF FILE strategy_compiler.py ---
+import math
+from config import STRATEGY_TC_BUCKET_STEP, STRATEGY_TC_BUCKET_LIMIT
+
+# Hand classes, in flat-array order: hard 5-21, soft 12-21, then pairs by rank.
+# Soft 12 (A,A when not splitting) has no table row and always hits; hard totals below 5 play as hard 5.
+HARD_TOTALS = tuple(range(5, 22))
+SOFT_TOTALS = tuple(range(12, 22))
+PAIR_RANKS = ('2', '3', '4', '5', '6', '7', '8', '9', 'T', 'A')
+DEALER_VALUES = tuple(range(2, 12))
+VALID_MOVES = ('H', 'S', 'D', 'P')
+_SOFT_BASE = len(HARD_TOTALS)
+_PAIR_BASE = _SOFT_BASE + len(SOFT_TOTALS)
+NUM_HAND_CLASSES = _PAIR_BASE + len(PAIR_RANKS)
+
+def hand_class(total, soft, pair_rank=None):
+    """Integer hand class for a (total, soft) hand, or for a two-card pair of `pair_rank` ('T' for any ten-value)."""
+    if pair_rank is not None: return _PAIR_BASE + PAIR_RANKS.index(pair_rank)
+    if soft: return _SOFT_BASE + min(max(total, 12), 21) - 12
+    return min(max(total, 5), 21) - 5
+
+def _bucket_limit():
+    """Largest bucket: one past +STRATEGY_TC_BUCKET_LIMIT, for counts beyond it."""
+    return 2 * round(STRATEGY_TC_BUCKET_LIMIT / STRATEGY_TC_BUCKET_STEP) + 1
+
+def tc_bucket(true_count):
+    """
+    True count on the bucket grid without rounding: bucket 2k is exactly k steps and 2k+1 lies
+    strictly between k and k+1 steps, so 'ge'/'le' thresholds compare exactly as `tc >= threshold`
+    would. Counts beyond +/- STRATEGY_TC_BUCKET_LIMIT share the outermost bucket.
+    """
+    steps = true_count / STRATEGY_TC_BUCKET_STEP; nearest = round(steps)
+    bucket = 2 * nearest if abs(steps - nearest) < 1e-9 else 2 * math.floor(steps) + 1  # Tolerance for float grid values like 1.4
+    return min(max(bucket, -_bucket_limit()), _bucket_limit())
+
+class CompiledStrategy:
+    """
+    BASIC_STRATEGY and INDEX_PLAYS flattened into one array indexed by
+    (hand class, dealer upcard, true-count bucket). Each entry is a shared
+    (basic move, count-adjusted move, reason) tuple, so lookup is constant time.
+    """
+    def __init__(self, decisions, insurance_from_bucket):
+        self.decisions = decisions
+        self.insurance_from_bucket = insurance_from_bucket  # Lowest TC bucket at which insurance is taken, or None
+        self.bucket_limit = _bucket_limit()
+        self.num_buckets = 2 * self.bucket_limit + 1
+
+    def lookup(self, hand_cls, dealer_value, true_count):
+        return self.decisions[(hand_cls * len(DEALER_VALUES) + dealer_value - 2) * self.num_buckets + tc_bucket(true_count) + self.bucket_limit]
+
+    def take_insurance(self, true_count):
+        return self.insurance_from_bucket is not None and tc_bucket(true_count) >= self.insurance_from_bucket
+
+def _basic_row(basic_strategy, cls, dealer_value, gaps):
+    """Basic-strategy move for a hand class, recording a gap if the table has no entry."""
+    if _SOFT_BASE <= cls < _PAIR_BASE and SOFT_TOTALS[cls - _SOFT_BASE] == 12: return 'H'
+    if cls >= _PAIR_BASE:
+        rank = PAIR_RANKS[cls - _PAIR_BASE]; table, key = 'Pair', (rank, rank)
+    elif cls >= _SOFT_BASE:
+        table, key = 'Soft', SOFT_TOTALS[cls - _SOFT_BASE]
+    else:
+        table, key = 'Hard', HARD_TOTALS[cls]
+    move = basic_strategy.get(table, {}).get(dealer_value, {}).get(key)
+    if move not in VALID_MOVES:
+        gaps.append(f"{table} {key} vs {dealer_value}: {move!r}")
+        return None
+    return move
+
+def _index_class(player_key):
+    """Hand class an INDEX_PLAYS key applies to: numeric keys are hard totals, tuple keys are pairs."""
+    if isinstance(player_key, tuple):
+        rank = player_key[0]
+        if len(player_key) != 2 or player_key[1] != rank or rank not in PAIR_RANKS: return None
+        return hand_class(0, False, rank)
+    if isinstance(player_key, int) and player_key in HARD_TOTALS: return hand_class(player_key, False)
+    return None
+
+def compile_strategy(basic_strategy, index_plays):
+    """
+    Builds a CompiledStrategy, raising ValueError if BASIC_STRATEGY has gaps or an
+    INDEX_PLAYS rule is malformed, so table problems surface at startup rather than mid-hand.
+    """
+    step = STRATEGY_TC_BUCKET_STEP
+    grid_limit = round(STRATEGY_TC_BUCKET_LIMIT / step)
+    buckets = range(-_bucket_limit(), _bucket_limit() + 1)
+    errors = []
+
+    basic = {}
+    for cls in range(NUM_HAND_CLASSES):
+        for dealer_value in DEALER_VALUES:
+            basic[cls, dealer_value] = _basic_row(basic_strategy, cls, dealer_value, errors)
+
+    rules = {}; insurance_from_bucket = None
+    for (player_key, dealer_value), rule in index_plays.items():
+        threshold = rule.get('Threshold'); rule_type = rule.get('Type'); action = rule.get('Action')
+        if rule_type not in ('ge', 'le') or not isinstance(threshold, (int, float)):
+            errors.append(f"Index {player_key} vs {dealer_value}: bad Type/Threshold {rule_type!r}/{threshold!r}"); continue
+        threshold_steps = round(threshold / step); threshold_bucket = 2 * threshold_steps  # Exactly on the grid, see tc_bucket
+        if abs(threshold_steps * step - threshold) > 1e-9 or abs(threshold_steps) > grid_limit:
+            errors.append(f"Index {player_key} vs {dealer_value}: threshold {threshold} not on the {step} TC grid within +/-{STRATEGY_TC_BUCKET_LIMIT}"); continue
+        if player_key == 'Ins':
+            if dealer_value != 11 or rule_type != 'ge': errors.append("Insurance rule must be ('Ins', 11) with Type 'ge'"); continue
+            insurance_from_bucket = threshold_bucket; continue
+        cls = _index_class(player_key)
+        if cls is None or dealer_value not in DEALER_VALUES or action not in VALID_MOVES:
+            errors.append(f"Index {player_key} vs {dealer_value}: unknown hand, upcard or action {action!r}"); continue
+        rules[cls, dealer_value] = (rule_type, threshold_bucket, action, f"Index (TC {'>=' if rule_type == 'ge' else '<='} {threshold:+g})")
+
+    if errors:
+        raise ValueError("Strategy tables failed to compile:\n  " + "\n  ".join(errors))
+
+    shared = {}
+    decisions = []
+    for cls in range(NUM_HAND_CLASSES):
+        for dealer_value in DEALER_VALUES:
+            move = basic[cls, dealer_value]; rule = rules.get((cls, dealer_value))
+            for bucket in buckets:
+                entry = (move, move, "")
+                if rule is not None:
+                    rule_type, threshold_bucket, action, reason = rule
+                    triggered = bucket >= threshold_bucket if rule_type == 'ge' else bucket <= threshold_bucket
+                    if triggered and action != move: entry = (move, action, reason)
+                decisions.append(shared.setdefault(entry, entry))
+    return CompiledStrategy(decisions, insurance_from_bucket)
+
+# --- END OF FILE strategy_compiler.py ---
@@ -0,0 +1,111 @@
+# --- START OF FILE test_gemini_integration.py ---
+"""
+Background Gemini path against StubGeminiModel, no network or API key needed.
+
+    python -m pytest -q test_gemini_integration.py     (or: python -m unittest test_gemini_integration)
+"""
+import importlib.util
+import time
+import unittest
+from concurrent.futures import CancelledError
+from explanation_cache import ExplanationCache
+from gemini_integration import GeminiIntegration, StubGeminiModel, is_error_response
+
+# (hand, upcard, true count, basic move, final move, bust %, total, upcard value, composition, override reason)
+SITUATION = (['TD', '6C'], '9H', 0.5, 'H', 'H', 0.62, 16, 9, "Rem Cards: 40. Rem Aces/Tens: 3/12.", "")
+OTHER_SITUATION = (['TD', '2C'], '4H', -1.0, 'S', 'S', 0.31, 12, 4, "Rem Cards: 40. Rem Aces/Tens: 3/12.", "")
+
+def make_integration(delay=0.0, failures=0):
+    return GeminiIntegration(StubGeminiModel(delay=delay, failures=failures), ExplanationCache(path=None))
+
+class GeminiAsyncTest(unittest.TestCase):
+    def setUp(self):
+        self.integration = None
+
+    def tearDown(self):
+        if self.integration: self.integration.close()
+
+    def test_future_resolves_with_answer_and_caches_it(self):
+        self.integration = make_integration()
+        future = self.integration.explain_strategy_enhanced_async(*SITUATION, channel='table')
+        answer = future.result(timeout=5)
+        self.assertIn("H (Hit) is the recommended move", answer)
+        self.assertFalse(is_error_response(answer))
+        self.assertEqual(self.integration.cached_explanation(*SITUATION), answer)
+
+    def test_queued_request_is_cancelled_by_newer_one(self):
+        self.integration = make_integration(delay=0.3)
+        running = self.integration.explain_strategy_enhanced_async(*SITUATION, channel='table')
+        time.sleep(0.05)  # Let the single worker pick it up
+        queued = self.integration.explain_strategy_enhanced_async(*OTHER_SITUATION, channel='table')
+        newest = self.integration.explain_strategy_enhanced_async(*SITUATION, channel='table')
+        self.assertTrue(queued.cancelled())
+        with self.assertRaises(CancelledError): queued.result(timeout=5)
+        self.assertIsNotNone(newest.result(timeout=5))
+        running.result(timeout=5)  # Already inside generate_content: finishes, but main ignores it (not the newest)
+
+    def test_superseded_request_stops_during_retry_backoff(self):
+        # Every call fails, so the first request sits in its 1 s backoff until the cancel event interrupts it
+        self.integration = make_integration(failures=10)
+        first = self.integration.explain_strategy_enhanced_async(*SITUATION, channel='table')
+        time.sleep(0.1)
+        start = time.perf_counter()
+        self.integration.explain_strategy_enhanced_async(*OTHER_SITUATION, channel='table')
+        self.assertIsNone(first.result(timeout=5))
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_cancel_pending_resolves_running_request_to_none(self):
+        self.integration = make_integration(failures=10)
+        future = self.integration.explain_strategy_enhanced_async(*SITUATION, channel='table')
+        time.sleep(0.1)
+        self.integration.cancel_pending('table')
+        self.assertIsNone(future.result(timeout=5))
+
+    def test_error_after_retries_is_an_error_response(self):
+        self.integration = make_integration(failures=3)
+        answer = self.integration.explain_strategy_enhanced_async(*SITUATION).result(timeout=10)
+        self.assertTrue(is_error_response(answer))
+        self.assertIsNone(self.integration.cached_explanation(*SITUATION))  # Errors are not cached
+
+    def test_cache_ignores_live_numbers_in_the_override_reason(self):
+        self.integration = make_integration()
+        ev_situation = SITUATION[:4] + ('S',) + SITUATION[5:9] + ("EV +0.013",)
+        answer = self.integration.explain_strategy_enhanced_async(*ev_situation).result(timeout=5)
+        self.assertEqual(self.integration.cached_explanation(*ev_situation[:9], "EV +0.011"), answer)
+        self.assertIsNone(self.integration.cached_explanation(*ev_situation[:9], "High Bust% (62.0%)"))
+
+@unittest.skipUnless(importlib.util.find_spec('ultralytics'), "main.py needs ultralytics")
+class CollectGeminiResponseTest(unittest.TestCase):
+    def make_ai(self, integration):
+        from main import CasinoAI
+        ai = CasinoAI(card_detector=object(), gemini_integration=integration, open_camera=False)
+        self.addCleanup(integration.close)
+        return ai
+
+    def test_answer_replaces_local_explanation(self):
+        ai = self.make_ai(make_integration())
+        ai.last_gemini_response = "local text"; ai.explanation_source = "Local, Gemini pending"
+        ai.gemini_future = ai.gemini_integration.explain_strategy_enhanced_async(*SITUATION); ai.gemini_future.result(timeout=5)
+        self.assertTrue(ai.collect_gemini_response())
+        self.assertEqual(ai.explanation_source, "Gemini"); self.assertIn("recommended move", ai.last_gemini_response)
+        self.assertIsNone(ai.gemini_future)
+
+    def test_error_keeps_local_explanation(self):
+        ai = self.make_ai(make_integration(failures=3))
+        ai.last_gemini_response = "local text"; ai.explanation_source = "Local, Gemini pending"
+        ai.gemini_future = ai.gemini_integration.explain_strategy_enhanced_async(*SITUATION); ai.gemini_future.result(timeout=10)
+        self.assertTrue(ai.collect_gemini_response())  # Redraw: the "pending" label goes away
+        self.assertEqual(ai.last_gemini_response, "local text"); self.assertEqual(ai.explanation_source, "Local")
+
+    def test_superseded_answer_changes_nothing(self):
+        ai = self.make_ai(make_integration(failures=10))
+        ai.last_gemini_response = "local text"; ai.explanation_source = "Local, Gemini pending"
+        ai.gemini_future = future = ai.gemini_integration.explain_strategy_enhanced_async(*SITUATION, channel=ai.window_name)
+        time.sleep(0.1); ai.gemini_integration.cancel_pending(ai.window_name); future.result(timeout=5)
+        self.assertFalse(ai.collect_gemini_response())
+        self.assertEqual(ai.last_gemini_response, "local text")
+
+if __name__ == "__main__":
+    unittest.main()
+
+# --- END OF FILE test_gemini_integration.py ---
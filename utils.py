@@ -1,6 +1,7 @@
 # --- START OF FILE utils.py ---
 import cv2
 from config import *
+from shoe import parse_card_label # Re-exported for the CV side; defined with the OpenCV-free card logic
 
 def draw_hud_element(frame, text, position, color=HUD_COLOR_TEXT):
     cv2.putText(frame, text, position, HUD_FONT, HUD_SCALE, color, HUD_THICKNESS, cv2.LINE_AA)
@@ -13,6 +14,19 @@ def draw_bounding_box(frame, box, label, color):
     cv2.rectangle(frame, (x1, y1_label_bg - label_size[1] - 5), (x1 + label_size[0], y1_label_bg - base_line + 5), color, cv2.FILLED)
     cv2.putText(frame, label, (x1 + 2, y1_label_bg - 3), HUD_FONT, HUD_SCALE, (0,0,0), HUD_THICKNESS, cv2.LINE_AA)
 
+def downscale_gray(frame, width=TRACKER_DOWNSCALE_WIDTH):
+    """Greyscale copy of a BGR frame shrunk to `width` pixels wide. Returns (image, scale) where scale = original/small."""
+    height, frame_width = frame.shape[:2]
+    scale = frame_width / width if frame_width > width else 1.0
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if scale != 1.0: gray = cv2.resize(gray, (width, int(round(height / scale))), interpolation=cv2.INTER_AREA)
+    return gray, scale
+
+def frame_difference(gray_a, gray_b):
+    """Mean absolute grey-level difference between two same-size images (0-255)."""
+    if gray_a is None or gray_b is None or gray_a.shape != gray_b.shape: return 255.0
+    return float(cv2.absdiff(gray_a, gray_b).mean())
+
 def format_hand(hand):
     return ", ".join(hand) if hand else "None"
 